@@ -1,8 +1,8 @@
 from __future__ import annotations
 
 import sys
-import inspect
 import re
+import time
 from pathlib import Path
 from typing import Any, Dict, List, Tuple
 
@@ -15,7 +15,13 @@ PROJECT_ROOT = Path(__file__).resolve().parents[1]  # .../ragnroll
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-from core.rag import rag_answer  # type: ignore
+from core import client, metrics  # type: ignore
+from core.rag import RERANK, RETRIEVAL_MODE, WARMUP, rag_answer_stream, warm_up  # type: ignore
+from core.context import CONTEXT_TOKEN_BUDGET  # type: ignore
+from core.keywords import keyword_set, query_terms  # type: ignore
+from core.rerank import RERANK_CANDIDATES  # type: ignore
+from core.retrieve import RETRIEVAL_MODES, Retriever, get_retriever  # type: ignore
+from core.scheduler import RefreshScheduler, format_status  # type: ignore
 
 Doc = Dict[str, Any]
 
@@ -30,6 +36,7 @@ def _normalize_doc(d: Doc) -> Doc:
     source = meta.get("source") or d.get("source") or d.get("Source")
     url = meta.get("url") or d.get("url") or d.get("URL")
     published = meta.get("published") or d.get("published")  # ✅ NEW
+    links = meta.get("links") or []  # near-duplicate copies from other outlets
 
     snippet = d.get("snippet") or d.get("Snippet") or d.get("text") or d.get("content") or d.get("chunk")
     score = d.get("score") or d.get("Score") or d.get("similarity") or d.get("distance")
@@ -44,6 +51,7 @@ def _normalize_doc(d: Doc) -> Doc:
     nd["source"] = source
     nd["url"] = url
     nd["published"] = published  # ✅ NEW
+    nd["links"] = links
     nd["snippet"] = snippet
     nd["score"] = score
     return nd
@@ -71,36 +79,43 @@ def clean_snippet(snippet: str) -> str:
     snippet = re.sub(r"\s+", " ", snippet).strip()
     return snippet
 
-def _call_rag_answer(question: str, top_k: int) -> Tuple[str, List[Doc]]:
-    candidates = ["top_k", "k", "topk", "top_n", "topK", "K"]
+@st.cache_resource(show_spinner="Loading FAISS index...")
+def _shared_retriever() -> Retriever:
+    """One retriever (model + index + chunks) shared by every session and rerun."""
+    return get_retriever()
 
-    try:
-        sig = inspect.signature(rag_answer)
-        params = sig.parameters
 
-        for name in candidates:
-            if name in params:
-                ans, docs = rag_answer(question, **{name: top_k})
-                return ans, docs
+@st.cache_resource(show_spinner=False)
+def _refresh_scheduler() -> RefreshScheduler:
+    """One background refresher per server process (interval from RAGNROLL_REFRESH_HOURS)."""
+    return RefreshScheduler().start()
 
-        if len(params) >= 2:
-            ans, docs = rag_answer(question, top_k)
-            return ans, docs
 
-        ans, docs = rag_answer(question)
-        return ans, docs
+@st.cache_resource(show_spinner=False)
+def _start_warm_up() -> Any:
+    """Load the encoder / cross-encoder in the background once per process, while the user types."""
+    return warm_up(_shared_retriever(), rerank=RERANK)
 
-    except TypeError:
-        try:
-            ans, docs = rag_answer(question, top_k)
-            return ans, docs
-        except Exception:
-            ans, docs = rag_answer(question)
-            return ans, docs
 
+@st.cache_data(ttl=30, show_spinner=False)
+def _api_status() -> Dict[str, Any] | None:
+    """core.api status if the server is up (re-checked every 30s), else None -> answer in-process."""
+    return client.health()
 
-def _tokenize(text: str) -> set[str]:
-    return set(re.findall(r"[a-z0-9]+", (text or "").lower()))
+
+def _stage_rows(snap: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "stage": name,
+            "count": s["count"],
+            "p50 ms": round(s["p50_s"] * 1000, 1),
+            "p95 ms": round(s["p95_s"] * 1000, 1),
+            "p99 ms": round(s["p99_s"] * 1000, 1),
+            "max ms": round(s["max_s"] * 1000, 1),
+            "total s": round(s["sum_s"], 2),
+        }
+        for name, s in snap.get("stages", {}).items()
+    ]
 
 
 def _relevance_at_k(question: str, docs: List[Doc], k: int) -> float:
@@ -111,7 +126,7 @@ def _relevance_at_k(question: str, docs: List[Doc], k: int) -> float:
     if k <= 0 or not docs:
         return 0.0
 
-    q = _tokenize(question)
+    q = set(query_terms(question))
     if not q:
         return 0.0
 
@@ -119,7 +134,7 @@ def _relevance_at_k(question: str, docs: List[Doc], k: int) -> float:
     used = 0
     for d in docs[:k]:
         snippet = d.get("snippet") or ""
-        s = _tokenize(snippet)
+        s = keyword_set(snippet)
         if not s:
             continue
         overlap = len(q & s) / float(len(q))
@@ -135,50 +150,71 @@ def _relevance_at_k(question: str, docs: List[Doc], k: int) -> float:
 st.set_page_config(page_title="RAG’n’Roll", page_icon="🎸", layout="wide")
 
 st.title("🎸 RAG’n’Roll")
-st.caption("Local RAG: FAISS + Sentence-Transformers + Ollama")
+st.caption("Local RAG: FAISS + Sentence-Transformers + Ollama (streaming)")
 
 st.sidebar.header("Settings")
 top_k = st.sidebar.slider("Top-k sources", min_value=1, max_value=10, value=5, step=1)
+mode = st.sidebar.selectbox(
+    "Retrieval mode",
+    RETRIEVAL_MODES,
+    index=RETRIEVAL_MODES.index(RETRIEVAL_MODE),
+    help="dense = embeddings (FAISS), lexical = keywords (BM25), hybrid = both with rank fusion",
+)
+api = _api_status()
+try:
+    known_sources = api["sources"] if api else _shared_retriever().sources()
+except Exception:
+    known_sources = []
+if WARMUP and not api:
+    _start_warm_up()
+sources = st.sidebar.multiselect("Sources", known_sources, help="Empty = all sources")
+window_days = st.sidebar.selectbox(
+    "Published within",
+    [None, 1, 7, 30],
+    format_func=lambda d: "Any time (auto for 'today' questions)" if d is None else f"Last {d} day(s)",
+)
+rerank = st.sidebar.checkbox(
+    "Re-rank with cross-encoder",
+    value=RERANK,
+    help="Retrieve more candidates and keep the top-k best by a cross-encoder score",
+)
+candidates = st.sidebar.slider(
+    "Re-rank candidates", min_value=10, max_value=100, value=RERANK_CANDIDATES, step=10, disabled=not rerank
+)
+context_budget = st.sidebar.slider(
+    "Context budget (tokens)",
+    min_value=300,
+    max_value=4000,
+    value=CONTEXT_TOKEN_BUDGET,
+    step=100,
+    help="Sources are merged per article and trimmed to the sentences closest to the question",
+)
+use_cache = st.sidebar.checkbox("Reuse answers for repeated questions", value=True)
 
 st.sidebar.write("")
+st.sidebar.caption(
+    f"Answering via API at {client.API_URL}" if api
+    else "API not running (python -m core.api); answering in-process"
+)
 rebuild = st.sidebar.button("🔄 Refresh News (Rebuild RAG)")
 
+# Refreshes run in the background (ingest -> embed into a new index snapshot);
+# the retriever switches to the new snapshot on its next query.
+refresher = _refresh_scheduler()
 if rebuild:
-    import subprocess
-
-    with st.sidebar:
-        with st.spinner("Refreshing daily snapshot (ingest → embed)..."):
-            p1 = subprocess.run(
-                [sys.executable, "-m", "core.ingest"],
-                cwd=str(PROJECT_ROOT),
-                capture_output=True,
-                text=True,
-                encoding="utf-8",
-                errors="replace",
-            )
-
-            p2 = None
-            if p1.returncode == 0:
-                p2 = subprocess.run(
-                    [sys.executable, "-m", "core.embed"],
-                    cwd=str(PROJECT_ROOT),
-                    capture_output=True,
-                    text=True,
-                    encoding="utf-8",
-                    errors="replace",
-                )
-
-        if p1.returncode != 0:
-            st.error("❌ Ingest failed")
-        elif p2 and p2.returncode != 0:
-            st.error("❌ Embed failed")
-        else:
-            st.success("✅ Refresh complete! New FAISS index built.")
+    if refresher.trigger():
+        st.sidebar.info("Refresh started in the background; answers keep using the current index.")
+    else:
+        st.sidebar.info("A refresh is already running.")
 
-        with st.expander("Show logs"):
-            st.code("INGEST OUTPUT:\n" + (p1.stdout or "") + "\n" + (p1.stderr or ""))
-            if p2 is not None:
-                st.code("EMBED OUTPUT:\n" + (p2.stdout or "") + "\n" + (p2.stderr or ""))
+refresh_status = refresher.status()
+st.sidebar.caption("  \n".join(format_status(refresh_status)))
+if refresh_status["last_ok"] is False:
+    st.sidebar.error(f"❌ {refresh_status['last_error']}")
+if refresh_status["logs"]:
+    with st.sidebar.expander("Show refresh logs"):
+        for step, log in refresh_status["logs"].items():
+            st.code(f"{step.upper()} OUTPUT:\n{log}")
 
 # Keep state
 if "last_answer" not in st.session_state:
@@ -187,6 +223,8 @@ if "last_docs" not in st.session_state:
     st.session_state.last_docs = []
 if "last_question" not in st.session_state:
     st.session_state.last_question = ""
+if "last_stats" not in st.session_state:
+    st.session_state.last_stats = {}
 
 st.subheader("Ask a question")
 question = st.text_input(
@@ -197,35 +235,89 @@ question = st.text_input(
 
 ask = st.button("Ask 🚀")
 
+streamed = False
 if ask:
     if not question.strip():
         st.warning("Type a question first.")
     else:
-        with st.spinner("Running RAG..."):
-            try:
-                answer, docs = _call_rag_answer(question.strip(), top_k)
-                docs = docs or []
-                norm_docs = [_normalize_doc(d) for d in docs]
+        try:
+            opts = dict(
+                top_k=top_k,
+                use_cache=use_cache,
+                mode=mode,
+                sources=sources or None,
+                since=(time.time() - window_days * 86400) if window_days else None,
+                rerank=rerank,
+                candidates=candidates,
+                context_budget=context_budget,
+            )
+            with st.spinner("Retrieving sources..."):
+                if api:
+                    tokens, docs, stats = client.ask_stream(question.strip(), **opts)
+                else:
+                    tokens, docs, stats = rag_answer_stream(
+                        question.strip(), retriever=_shared_retriever(), **opts
+                    )
+
+            st.header("Question")
+            st.write(question.strip())
+
+            st.header("Answer")
+            answer = st.write_stream(tokens)
+            streamed = True
+
+            st.session_state.last_answer = answer if isinstance(answer, str) else ""
+            st.session_state.last_docs = [_normalize_doc(d) for d in (docs or [])]
+            st.session_state.last_question = question.strip()
+            st.session_state.last_stats = dict(stats)
+
+        except Exception as e:
+            st.error("RAG execution failed (see error below):")
+            st.exception(e)
 
-                st.session_state.last_answer = answer or ""
-                st.session_state.last_docs = norm_docs
-                st.session_state.last_question = question.strip()
+if st.session_state.last_question:
+    if not streamed:
+        st.header("Question")
+        st.write(st.session_state.last_question)
 
-            except Exception as e:
-                st.error("RAG execution failed (see error below):")
-                st.exception(e)
+        st.header("Answer")
+        st.write(st.session_state.last_answer or "No answer returned.")
 
-if st.session_state.last_question:
-    st.metric(
+    stats = st.session_state.last_stats or {}
+    c1, c2, c3 = st.columns(3)
+    c1.metric(
         label=f"Relevance@{top_k}",
         value=f"{_relevance_at_k(st.session_state.last_question, st.session_state.last_docs, top_k):.2f}",
     )
-
-    st.header("Question")
-    st.write(st.session_state.last_question)
-
-    st.header("Answer")
-    st.write(st.session_state.last_answer or "No answer returned.")
+    c2.metric(label="Time to first token", value=f"{stats.get('ttft_s', 0.0):.2f}s")
+    c3.metric(label="Total time", value=f"{stats.get('total_s', 0.0):.2f}s")
+    if stats.get("cache_hit"):
+        st.caption(
+            f"⚡ Served from the answer cache (question similarity {stats.get('cache_similarity', 1.0):.3f})"
+        )
+    elif "search_s" in stats:
+        stages = [
+            f"encode {stats['encode_s'] * 1000:.0f} ms",
+            f"search {stats['search_s'] * 1000:.0f} ms",
+        ]
+        if "rerank_s" in stats:
+            stages.append(
+                f"re-rank {stats['rerank_s'] * 1000:.0f} ms "
+                f"({stats['rerank_scored']:.0f}/{stats['rerank_candidates']:.0f} candidates scored)"
+            )
+        if "pack_s" in stats:
+            stages.append(f"context packing {stats['pack_s'] * 1000:.0f} ms")
+        if "ttft_s" in stats:
+            stages.append(f"LLM first token {(stats['ttft_s'] - stats['retrieve_s']):.2f} s")
+        if "generate_s" in stats:
+            stages.append(f"generation {stats['generate_s']:.2f} s")
+        st.caption("⏱️ " + " · ".join(stages))
+        if "prompt_tokens" in stats:
+            before, after = stats.get("prompt_tokens_before", 0.0), stats["prompt_tokens"]
+            st.caption(
+                f"📦 Prompt: ~{after:.0f} tokens (~{before:.0f} before packing, "
+                f"{1 - after / max(before, 1.0):.0%} smaller)"
+            )
 
     st.header("Sources")
     docs = st.session_state.last_docs or []
@@ -239,6 +331,7 @@ if st.session_state.last_question:
             url = d.get("url", None)
             snippet = d.get("snippet", None)
             published = d.get("published")  # ✅ NEW
+            links = d.get("links") or []
 
             score_txt = ""
             if isinstance(score, (int, float)):
@@ -253,7 +346,37 @@ if st.session_state.last_question:
             if isinstance(published, str) and published.strip():
                 st.caption(f"Published: {published.strip()}")
 
+            if links:
+                also = ", ".join(
+                    f"[{l.get('source') or 'link'}]({l['url']})" for l in links if l.get("url")
+                )
+                st.caption(f"Also reported by: {also}")
+
             if isinstance(snippet, str) and snippet.strip():
                 st.caption(clean_snippet(snippet))
 
             st.divider()
+
+with st.expander("📈 Latency breakdown"):
+    try:
+        snap = client.metrics() if api else metrics.snapshot()
+    except Exception:
+        snap = metrics.snapshot()
+    mem = snap.get("memory_rss_bytes")
+    st.caption(
+        f"{'API server' if api else 'This process'} · up {snap.get('uptime_s', 0) / 60:.0f} min"
+        + (f" · RSS {mem / 2**20:.0f} MiB" if mem else "")
+    )
+    rows = _stage_rows(snap)
+    if rows:
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+    else:
+        st.info("No requests measured yet.")
+    if snap.get("counters"):
+        st.json(snap["counters"], expanded=False)
+
+    for job in ("ingest", "embed"):
+        dumped = metrics.load_dump(job)
+        if dumped:
+            st.caption(f"Last {job} run · {time.strftime('%Y-%m-%d %H:%M', time.localtime(dumped['finished']))}")
+            st.dataframe(_stage_rows(dumped), hide_index=True, use_container_width=True)
@@ -0,0 +1,180 @@
+"""
+FAISS index types for the chunk vectors: exact (flat) or approximate
+(IVF-Flat, IVF-PQ, HNSW). All indexes are inner-product over normalized
+embeddings and are addressed by stable chunk ids.
+
+faiss is imported on first use, so importing this module (and core.retrieve /
+core.rag through it) stays cheap.
+"""
+import json
+import math
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import faiss
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# Automatic choice by corpus size (number of chunk vectors)
+FLAT_MAX = 20_000        # brute force is fast enough below this
+IVF_FLAT_MAX = 500_000   # beyond this, compress vectors with PQ
+PQ_MIN_TRAIN = 256 * 39  # 8-bit PQ codebooks need ~39 points per centroid
+
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 64
+FILTERED_EF_SEARCH = 512
+
+
+def choose_index_type(n: int) -> str:
+    if n < FLAT_MAX:
+        return "flat"
+    if n < IVF_FLAT_MAX:
+        return "ivf_flat"
+    return "ivf_pq"
+
+
+def resolve_index_type(index_type: str, n: int) -> str:
+    """Concrete index type for `index_type` ("auto" or one of INDEX_TYPES) at corpus size n."""
+    if index_type == "auto":
+        index_type = choose_index_type(n)
+    if index_type == "ivf_pq" and n < PQ_MIN_TRAIN:
+        index_type = "ivf_flat"
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; expected one of {INDEX_TYPES} or 'auto'")
+    return index_type
+
+
+def fits(params: Dict, index_type: str, n: int) -> bool:
+    """Can an existing index (described by params) keep taking vectors at size n?"""
+    if resolve_index_type(index_type, n) != params.get("type", "flat"):
+        return False
+    # IVF centroids were trained on a smaller corpus; retrain once it has grown 4x
+    if "nlist" in params and n > 4 * params.get("trained_on", n):
+        return False
+    return True
+
+
+def _nlist_for(n: int) -> int:
+    # ~4*sqrt(n) lists, but keep >= 39 training points per list
+    return max(1, min(int(4 * math.sqrt(n)), n // 39))
+
+
+def _pq_m_for(dim: int) -> int:
+    for m in (64, 48, 32, 24, 16, 8):
+        if dim % m == 0 and dim // m >= 4:
+            return m
+    return 1
+
+
+def make_index(index_type: str, dim: int, n: int) -> Tuple["faiss.Index", Dict]:
+    """
+    Create an empty (untrained) index and its search params.
+    IVF types must be trained with train_index() before vectors are added.
+    """
+    import faiss
+
+    index_type = resolve_index_type(index_type, n)
+    params: Dict = {"type": index_type, "dim": dim, "trained_on": n}
+
+    if index_type == "flat":
+        index = faiss.IndexIDMap(faiss.IndexFlatIP(dim))
+    elif index_type in ("ivf_flat", "ivf_pq"):
+        nlist = _nlist_for(n)
+        quantizer = faiss.IndexFlatIP(dim)
+        if index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            m = _pq_m_for(dim)
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, m, 8, faiss.METRIC_INNER_PRODUCT)
+            params["pq_m"] = m
+        params["nlist"] = nlist
+        params["nprobe"] = min(nlist, max(8, nlist // 16))
+    elif index_type == "hnsw":
+        hnsw = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        hnsw.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index = faiss.IndexIDMap(hnsw)
+        params["M"] = HNSW_M
+        params["efSearch"] = HNSW_EF_SEARCH
+
+    return index, params
+
+
+def train_index(index: "faiss.Index", embeddings: np.ndarray) -> None:
+    if not index.is_trained:
+        index.train(embeddings)
+
+
+def supports_remove(params: Dict) -> bool:
+    return params.get("type") != "hnsw"
+
+
+def apply_search_params(index: "faiss.Index", params: Dict) -> None:
+    """Set persisted nprobe / efSearch on a loaded index."""
+    import faiss
+
+    ps = faiss.ParameterSpace()
+    if "nprobe" in params:
+        ps.set_index_parameter(index, "nprobe", int(params["nprobe"]))
+    if "efSearch" in params:
+        ps.set_index_parameter(index, "efSearch", int(params["efSearch"]))
+
+
+def filtered_search_params(index: "faiss.Index", allowed_ids: np.ndarray) -> "faiss.SearchParameters":
+    """
+    SearchParameters restricting a search to `allowed_ids`.
+
+    IVF probes every list: the selector is checked before any distance is
+    computed, so this is an exact search over the allowed slice. HNSW widens
+    efSearch since the graph walk also visits filtered-out nodes.
+    """
+    import faiss
+
+    sel = faiss.IDSelectorBatch(np.ascontiguousarray(allowed_ids, dtype="int64"))
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        params = faiss.SearchParametersIVF(sel=sel, nprobe=ivf.nlist)
+    else:
+        inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+        if isinstance(inner, faiss.IndexHNSW):
+            params = faiss.SearchParametersHNSW(sel=sel, efSearch=max(inner.hnsw.efSearch, FILTERED_EF_SEARCH))
+        else:
+            params = faiss.SearchParameters(sel=sel)
+    params._selector = sel  # keep the selector alive as long as the params object
+    return params
+
+
+def load_params(path: Path) -> Dict:
+    """Index params saved next to faiss.index ({"type": "flat"} if missing)."""
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {"type": "flat"}
+
+
+def save_params(path: Path, params: Dict) -> None:
+    Path(path).write_text(json.dumps(params, indent=2), encoding="utf-8")
+
+
+def read_index(index_path: Path, params_path: Optional[Path] = None, mmap: bool = False) -> "faiss.Index":
+    """
+    Load an index. mmap=True maps the file instead of reading it into memory
+    (pages are shared between processes and loaded on demand); the file must
+    not change while mapped. Index types that can't be mapped are read normally.
+    """
+    import faiss
+
+    index = None
+    if mmap:
+        try:
+            index = faiss.read_index(str(index_path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            pass
+    if index is None:
+        index = faiss.read_index(str(index_path))
+    if params_path is not None:
+        apply_search_params(index, load_params(params_path))
+    return index
@@ -0,0 +1,137 @@
+"""
+Semantic answer cache: questions whose normalized embedding is close enough to
+a previously answered one (against the same index version) are served the
+cached answer and sources without retrieval or generation.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+SIMILARITY_THRESHOLD = 0.95  # cosine similarity of normalized question embeddings
+TTL_SECONDS = 30 * 60        # "today" answers go stale as news comes in
+MAX_ENTRIES = 256
+
+
+def normalize_question(q: str) -> str:
+    q = re.sub(r"\s+", " ", (q or "").lower()).strip()
+    return q.rstrip("?!. ")
+
+
+class AnswerCache:
+    """In-memory LRU + TTL cache, cleared whenever the index version changes."""
+
+    def __init__(
+        self,
+        threshold: float = SIMILARITY_THRESHOLD,
+        ttl_seconds: float = TTL_SECONDS,
+        max_entries: int = MAX_ENTRIES,
+    ):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, int, str], Dict]" = OrderedDict()
+        self._version: Optional[Tuple] = None
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _sync(self, version: Optional[Tuple]) -> None:
+        # New index -> every cached answer may cite chunks that no longer exist
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+        now = time.time()
+        expired = [k for k, e in self._entries.items() if now - e["created"] > self.ttl_seconds]
+        for k in expired:
+            del self._entries[k]
+
+    def lookup(
+        self,
+        question: str,
+        q_emb: np.ndarray,
+        top_k: int,
+        version: Optional[Tuple],
+        scope: str = "",
+    ) -> Optional[Dict]:
+        """
+        Best cached entry for this question (exact or similar), or None.
+        `scope` identifies the retrieval settings (mode, filters) the answer used.
+        """
+        key = (normalize_question(question), top_k, scope)
+        with self._lock:
+            self._sync(version)
+
+            entry = self._entries.get(key)
+            if entry is None:
+                candidates = [(k, e) for k, e in self._entries.items() if k[1:] == key[1:]]
+                if candidates:
+                    mat = np.vstack([e["emb"] for _, e in candidates])
+                    sims = mat @ np.asarray(q_emb, dtype="float32").ravel()
+                    best = int(np.argmax(sims))
+                    if sims[best] >= self.threshold:
+                        key, entry = candidates[best]
+                        entry = dict(entry, similarity=float(sims[best]))
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def store(
+        self,
+        question: str,
+        q_emb: np.ndarray,
+        top_k: int,
+        version: Optional[Tuple],
+        answer: str,
+        docs: List[Dict],
+        scope: str = "",
+    ) -> None:
+        key = (normalize_question(question), top_k, scope)
+        with self._lock:
+            self._sync(version)
+            self._entries[key] = {
+                "question": question,
+                "emb": np.asarray(q_emb, dtype="float32").ravel(),
+                "answer": answer,
+                "docs": docs,
+                "created": time.time(),
+                "similarity": 1.0,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+_ANSWER_CACHE: Optional[AnswerCache] = None
+
+def get_answer_cache() -> AnswerCache:
+    """Process-wide shared answer cache."""
+    global _ANSWER_CACHE
+    if _ANSWER_CACHE is None:
+        _ANSWER_CACHE = AnswerCache()
+    return _ANSWER_CACHE
@@ -0,0 +1,378 @@
+"""
+Async HTTP API over one shared, loaded retriever.
+
+    POST /retrieve     {"query", "top_k", "mode", "since", "sources"} -> {"docs"}
+    POST /ask          {"question", ...}                               -> {"answer", "docs", "stats"}
+    POST /ask/stream   same body; NDJSON lines:
+                       {"docs", "stats"}, then {"token"} ..., then {"done": true, "stats"}
+    GET  /health
+    GET  /metrics      Prometheus text (?format=json for the JSON snapshot)
+
+Concurrent requests are micro-batched: queries arriving within BATCH_WINDOW_MS
+are encoded in one model call and searched in one FAISS call per distinct
+(top_k, mode, filters) set, for /retrieve and /ask alike. LLM generation is bounded to LLM_CONCURRENCY
+streams; up to LLM_QUEUE_LIMIT more wait their turn, beyond that /ask returns 503.
+
+Run from the project root:
+    python -m core.api --port 8000
+"""
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from starlette.concurrency import iterate_in_threadpool
+
+from core import metrics
+from core.answer_cache import normalize_question
+from core.context import CONTEXT_TOKEN_BUDGET
+from core.rag import RERANK, RETRIEVAL_MODE, WARMUP, rag_answer_stream, warm_up
+from core.rerank import RERANK_CANDIDATES
+from core.retrieve import RETRIEVAL_MODES, get_retriever
+
+BATCH_WINDOW_MS = 5      # how long the first query in a batch waits for company
+MAX_BATCH = 64
+LLM_CONCURRENCY = int(os.environ.get("RAGNROLL_LLM_CONCURRENCY", "2"))
+LLM_QUEUE_LIMIT = 32
+
+
+class RetrieveRequest(BaseModel):
+    query: str
+    top_k: int = 5
+    mode: str = RETRIEVAL_MODE
+    since: Optional[float] = None
+    sources: Optional[List[str]] = None
+
+
+class AskRequest(BaseModel):
+    question: str
+    top_k: int = 5
+    mode: str = RETRIEVAL_MODE
+    since: Optional[float] = None
+    sources: Optional[List[str]] = None
+    use_cache: bool = True
+    rerank: bool = RERANK
+    candidates: int = RERANK_CANDIDATES
+    context_budget: Optional[int] = CONTEXT_TOKEN_BUDGET
+
+
+# -----------------------------
+# Micro-batching
+# -----------------------------
+class MicroBatcher:
+    """
+    Collects items submitted from concurrent requests and runs fn(items) ->
+    results once per batch in its own worker thread (not the shared default
+    pool, whose threads may all be blocked waiting on this batcher). A batch closes after
+    window_s or max_batch items; items queued while a batch runs form the next.
+    If fn raises for a batch, its items are retried one by one so that only
+    the callers whose item fails get the exception.
+    """
+
+    def __init__(self, name: str, fn: Callable[[List[Any]], List[Any]], max_batch: int = MAX_BATCH,
+                 window_s: float = BATCH_WINDOW_MS / 1000):
+        self.name = name
+        self.fn = fn
+        self.max_batch = max_batch
+        self.window_s = window_s
+        self.batches = 0
+        self.items = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"batch-{self.name}")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    async def submit(self, item: Any) -> Any:
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, fut))
+        return await fut
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window_s
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                results = await self._call([item for item, _ in batch])
+            except Exception as e:
+                if len(batch) == 1:
+                    if not batch[0][1].done():
+                        batch[0][1].set_exception(e)
+                    continue
+                # One bad item must not fail its neighbours: rerun each on its own
+                metrics.incr(f"api.{self.name}.batch_errors")
+                for item, fut in batch:
+                    await self._run_one(item, fut)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            metrics.incr(f"api.{self.name}.batches")
+            metrics.incr(f"api.{self.name}.items", len(batch))
+            for (_, fut), res in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(res)
+
+    async def _call(self, items: List[Any]) -> List[Any]:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.fn, items)
+
+    async def _run_one(self, item: Any, fut: asyncio.Future) -> None:
+        try:
+            (res,) = await self._call([item])
+        except Exception as e:
+            if not fut.done():
+                fut.set_exception(e)
+            return
+        if not fut.done():
+            fut.set_result(res)
+
+
+def _encode_batch(texts: List[str]) -> List[Any]:
+    return list(get_retriever().encode(texts))
+
+
+class _Search(NamedTuple):
+    """One query for _search_batch; q_emb is its embedding row (None for lexical)."""
+    q_emb: Optional[np.ndarray]
+    query: str
+    top_k: int
+    mode: str
+    since: Optional[float]
+    sources: Tuple[str, ...]
+
+
+def _search_batch(items: List[_Search]) -> List[List[Dict]]:
+    """One retriever.search (one FAISS call) per distinct (top_k, mode, filters)."""
+    retriever = get_retriever()
+    groups: Dict[Tuple, List[int]] = {}
+    for i, s in enumerate(items):
+        groups.setdefault((s.top_k, s.mode, s.since, s.sources), []).append(i)
+
+    out: List[List[Dict]] = [[] for _ in items]
+    for (top_k, mode, since, sources), idx in groups.items():
+        emb = np.stack([items[i].q_emb for i in idx]) if mode != "lexical" else None
+        results = retriever.search(
+            emb,
+            top_k=top_k,
+            queries=[items[i].query for i in idx],
+            mode=mode,
+            since=since,
+            sources=list(sources) or None,
+        )
+        for i, docs in zip(idx, results):
+            out[i] = docs
+    return out
+
+
+def _retrieve_batch(reqs: List[RetrieveRequest]) -> List[List[Dict]]:
+    """One encode for the whole batch, then _search_batch."""
+    dense = [i for i, r in enumerate(reqs) if r.mode != "lexical"]
+    q_emb = get_retriever().encode([reqs[i].query for i in dense]) if dense else None
+    row = {i: j for j, i in enumerate(dense)}
+    return _search_batch([
+        _Search(
+            q_emb[row[i]] if i in row else None,
+            r.query, r.top_k, r.mode, r.since, tuple(sorted(r.sources or [])),
+        )
+        for i, r in enumerate(reqs)
+    ])
+
+
+# -----------------------------
+# LLM admission
+# -----------------------------
+class LLMGate:
+    """At most `concurrency` generations at once; at most `queue_limit` waiting."""
+
+    def __init__(self, concurrency: int = LLM_CONCURRENCY, queue_limit: int = LLM_QUEUE_LIMIT):
+        self.queue_limit = queue_limit
+        self.waiting = 0
+        self.active = 0
+        self._sem = asyncio.Semaphore(concurrency)
+
+    def check(self) -> None:
+        if self.waiting >= self.queue_limit:
+            raise HTTPException(status_code=503, detail="LLM queue is full; try again shortly")
+
+    @asynccontextmanager
+    async def slot(self):
+        self.check()
+        self.waiting += 1
+        t0 = time.perf_counter()
+        try:
+            await self._sem.acquire()
+        finally:
+            self.waiting -= 1
+        metrics.observe("api.llm_queue_wait", time.perf_counter() - t0)
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._sem.release()
+
+
+encode_batcher = MicroBatcher("encode", _encode_batch)
+retrieve_batcher = MicroBatcher("retrieve", _retrieve_batch)
+search_batcher = MicroBatcher("search", _search_batch)
+llm_gate: Optional[LLMGate] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global llm_gate
+    await asyncio.to_thread(get_retriever().current_version)  # load index + chunks up front
+    if WARMUP:
+        await asyncio.to_thread(warm_up, rerank=RERANK, background=False)  # encoder, cross-encoder
+    llm_gate = LLMGate()
+    encode_batcher.start()
+    retrieve_batcher.start()
+    search_batcher.start()
+    yield
+    await encode_batcher.stop()
+    await retrieve_batcher.stop()
+    await search_batcher.stop()
+
+
+app = FastAPI(title="RAG'n'Roll API", lifespan=lifespan)
+
+
+def _check_mode(mode: str) -> None:
+    if mode not in RETRIEVAL_MODES:
+        raise HTTPException(status_code=422, detail=f"mode must be one of {RETRIEVAL_MODES}")
+
+
+async def _prepare(req: AskRequest):
+    """
+    Batched question encode, then retrieval / re-rank / packing in a worker
+    thread, whose index searches go through search_batcher.
+    """
+    _check_mode(req.mode)
+    row = await encode_batcher.submit(normalize_question(req.question) or req.question)
+    loop = asyncio.get_running_loop()
+
+    def search(q_emb, top_k=5, queries=None, mode=RETRIEVAL_MODE, since=None, sources=None):
+        # Called from the worker thread: hand the query to the event loop's batcher
+        item = _Search(q_emb[0], queries[0], top_k, mode, since, tuple(sorted(sources or [])))
+        return [asyncio.run_coroutine_threadsafe(search_batcher.submit(item), loop).result()]
+
+    return await asyncio.to_thread(
+        rag_answer_stream,
+        req.question,
+        top_k=req.top_k,
+        use_cache=req.use_cache,
+        mode=req.mode,
+        sources=req.sources,
+        since=req.since,
+        rerank=req.rerank,
+        candidates=req.candidates,
+        context_budget=req.context_budget,
+        q_emb=row[None, :],
+        search=search,
+    )
+
+
+@app.get("/health")
+async def health() -> Dict:
+    retriever = get_retriever()
+    # Both may reload a newly published snapshot from disk: keep that off the event loop
+    version = await asyncio.to_thread(retriever.current_version)
+    sources = await asyncio.to_thread(retriever.sources)
+    return {
+        "status": "ok",
+        "index_version": version,
+        "sources": sources,
+        "llm_active": llm_gate.active if llm_gate else 0,
+        "llm_waiting": llm_gate.waiting if llm_gate else 0,
+        "batches": {
+            "encode": [encode_batcher.batches, encode_batcher.items],
+            "retrieve": [retrieve_batcher.batches, retrieve_batcher.items],
+            "search": [search_batcher.batches, search_batcher.items],
+        },
+    }
+
+
+@app.get("/metrics")
+async def get_metrics(format: str = "prometheus"):
+    if format == "json":
+        return metrics.snapshot()
+    return PlainTextResponse(metrics.prometheus_text(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/retrieve")
+async def retrieve(req: RetrieveRequest) -> Dict:
+    _check_mode(req.mode)
+    with metrics.timer("api.retrieve"):
+        return {"docs": await retrieve_batcher.submit(req)}
+
+
+@app.post("/ask")
+async def ask(req: AskRequest) -> Dict:
+    tokens, docs, stats = await _prepare(req)
+    if stats.get("cache_hit"):
+        answer = "".join(tokens)
+    else:
+        async with llm_gate.slot():
+            answer = await asyncio.to_thread(lambda: "".join(tokens))
+    return {"answer": answer.strip(), "docs": docs, "stats": stats}
+
+
+@app.post("/ask/stream")
+async def ask_stream(req: AskRequest) -> StreamingResponse:
+    tokens, docs, stats = await _prepare(req)
+    if not stats.get("cache_hit"):
+        llm_gate.check()  # reject before the response starts, not mid-stream
+
+    async def lines():
+        yield json.dumps({"docs": docs, "stats": stats}) + "\n"
+        if stats.get("cache_hit"):
+            for token in tokens:
+                yield json.dumps({"token": token}) + "\n"
+        else:
+            async with llm_gate.slot():
+                async for token in iterate_in_threadpool(tokens):
+                    yield json.dumps({"token": token}) + "\n"
+        yield json.dumps({"done": True, "stats": stats}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import uvicorn
+
+    ap = argparse.ArgumentParser(description="Serve the RAG'n'Roll HTTP API.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    args = ap.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,254 @@
+"""
+Raw page archive: every downloaded article body, gzip-compressed and stored
+under the SHA-256 of its content, so a change to the extractor or to
+clean_text() can be applied to the whole corpus without downloading it again.
+
+    data/raw/ab/ab12...ef.html.gz      one file per distinct body
+    raw_pages(url, fetched_at, sha256)  SQLite: which body each fetch returned
+    raw_entries(url, title, ...)        SQLite: the feed entry each URL came from
+
+Identical bodies (re-fetches of an unchanged page, syndicated copies) are
+stored once. `reprocess` re-extracts the newest archived body of every article
+on a process pool and rewrites only the texts that came out different. Pages
+that were archived but never stored (their text was too short at the time)
+are re-extracted too, and become new articles once they pass MIN_TEXT_CHARS.
+The next `core.embed --incremental` embeds exactly the changed and new articles.
+
+Run from the project root:
+    python -m core.archive stats
+    python -m core.archive reprocess --workers 8
+"""
+import gzip
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from core import metrics
+from core.db import get_conn, load_texts
+
+BASE_DIR = Path(__file__).resolve().parents[1]  # project root
+ARCHIVE_DIR = BASE_DIR / "data" / "raw"
+ARCHIVE_RAW = os.environ.get("RAGNROLL_ARCHIVE_RAW", "1") != "0"
+COMPRESS_LEVEL = 6
+
+
+def _root(root: Optional[Path]) -> Path:
+    # Looked up per call, not bound as a default, so ARCHIVE_DIR can be redirected
+    return Path(root) if root is not None else ARCHIVE_DIR
+
+
+def object_path(sha: str, root: Optional[Path] = None) -> Path:
+    return _root(root) / sha[:2] / f"{sha}.html.gz"
+
+
+def put(body: str, root: Optional[Path] = None) -> str:
+    """Store a response body (once per distinct content); returns its SHA-256."""
+    data = body.encode("utf-8")
+    sha = hashlib.sha256(data).hexdigest()
+    path = object_path(sha, root)
+    if path.exists():
+        return sha
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{time.monotonic_ns()}.tmp")
+    tmp.write_bytes(gzip.compress(data, COMPRESS_LEVEL))
+    os.replace(tmp, path)  # readers never see a partial object
+    return sha
+
+
+def get(sha: str, root: Optional[Path] = None) -> str:
+    return gzip.decompress(object_path(sha, root).read_bytes()).decode("utf-8")
+
+
+def record(conn, results: Iterable[Dict], entries: Optional[Iterable[Dict]] = None) -> None:
+    """
+    Index archived bodies of fetch results (those with a "sha256") by URL and
+    fetch time. entries, the feed entries the results were fetched for (same
+    order), are kept in raw_entries so reprocess() can store pages later.
+    """
+    results = list(results)
+    rows = [
+        (r["url"], r["fetched_at"], r["sha256"], r["size"])
+        for r in results
+        if r.get("sha256")
+    ]
+    conn.executemany(
+        "INSERT OR IGNORE INTO raw_pages(url, fetched_at, sha256, size) VALUES (?, ?, ?, ?)",
+        rows,
+    )
+    if entries is not None:
+        conn.executemany(
+            "INSERT OR REPLACE INTO raw_entries(url, title, source, published) VALUES (?, ?, ?, ?)",
+            [
+                (r["url"], e["title"], e["source"], e["published"])
+                for r, e in zip(results, entries)
+                if r.get("sha256")
+            ],
+        )
+
+
+def latest_pages(conn) -> List[Tuple[int, str]]:
+    """(article_id, sha256) of the newest archived fetch of each article."""
+    return conn.execute(
+        """
+        SELECT a.id, r.sha256
+        FROM articles a
+        JOIN raw_pages r ON r.url = a.url
+        WHERE r.fetched_at = (SELECT MAX(fetched_at) FROM raw_pages WHERE url = a.url)
+        ORDER BY a.id
+        """
+    ).fetchall()
+
+
+def unstored_pages(conn) -> List[Tuple[Dict, str]]:
+    """
+    (entry, sha256) of the newest archived fetch of each URL that is neither
+    an article nor a collapsed source link, e.g. because its text was too
+    short when it was downloaded. Only URLs with a raw_entries row qualify.
+    """
+    rows = conn.execute(
+        """
+        SELECT e.url, e.title, e.source, e.published, r.sha256
+        FROM raw_entries e
+        JOIN raw_pages r ON r.url = e.url
+        WHERE r.fetched_at = (SELECT MAX(fetched_at) FROM raw_pages WHERE url = e.url)
+          AND NOT EXISTS (SELECT 1 FROM articles a WHERE a.url = e.url)
+          AND NOT EXISTS (SELECT 1 FROM article_links l WHERE l.url = e.url)
+        ORDER BY r.fetched_at
+        """
+    ).fetchall()
+    return [
+        ({"url": url, "title": title, "source": source, "published": published}, sha)
+        for url, title, source, published, sha in rows
+    ]
+
+
+def _reextract(path: str) -> str:
+    """Extract + clean one archived body. Top-level so it can run in a process pool."""
+    from core.ingest import extract_clean
+
+    try:
+        html = gzip.decompress(Path(path).read_bytes()).decode("utf-8")
+    except (OSError, ValueError):
+        return ""
+    return extract_clean(html)
+
+
+def reprocess(workers: Optional[int] = None, dry_run: bool = False, root: Optional[Path] = None) -> Dict[str, int]:
+    """
+    Re-run extraction + cleaning over the archive on `workers` processes
+    (default: all cores) and update the articles whose text changed.
+    Extractions shorter than core.ingest.MIN_TEXT_CHARS keep the old text.
+    Archived pages that were never stored are stored as new articles (via
+    ArticleWriter, so near-duplicates still collapse) once they are long enough.
+    """
+    from core.dedup import simhash, to_signed
+    from core.ingest import MIN_TEXT_CHARS, ArticleWriter
+
+    conn = get_conn()
+    pages = latest_pages(conn)
+    unstored = unstored_pages(conn)
+    current = load_texts(conn, [aid for aid, _ in pages])
+    paths = [str(object_path(sha, root)) for _, sha in pages + unstored]
+    workers = workers or os.cpu_count() or 1
+
+    with metrics.timer("archive.reextract"):
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            texts = list(pool.map(_reextract, paths, chunksize=max(1, len(paths) // (workers * 8))))
+    texts, new_texts = texts[:len(pages)], texts[len(pages):]
+
+    counts = {
+        "articles": len(pages), "changed": 0, "unchanged": 0, "too_short": 0,
+        "unstored": len(unstored), "inserted": 0, "collapsed": 0,
+    }
+    text_updates = []
+    hash_updates = []
+    for (aid, _), text in zip(pages, texts):
+        if len(text) < MIN_TEXT_CHARS:
+            counts["too_short"] += 1
+        elif text == current.get(aid):
+            counts["unchanged"] += 1
+        else:
+            counts["changed"] += 1
+            text_updates.append((text, aid))
+            hash_updates.append((to_signed(simhash(text)), aid))
+
+    recovered = [(e, text) for (e, _), text in zip(unstored, new_texts) if len(text) >= MIN_TEXT_CHARS]
+    if dry_run:
+        counts["inserted"] = len(recovered)  # upper bound: some may collapse into links
+    elif text_updates or recovered:
+        with metrics.timer("archive.write"):
+            with conn:
+                conn.executemany("UPDATE article_texts SET text = ? WHERE article_id = ?", text_updates)
+                conn.executemany("UPDATE articles SET simhash = ? WHERE id = ?", hash_updates)
+            if recovered:
+                writer = ArticleWriter(conn)
+                writer.begin()
+                for e, text in recovered:
+                    writer.add_new(e, text)
+                written = writer.flush()
+                counts["inserted"] = written["inserted"]
+                counts["collapsed"] = written["collapsed"]
+    metrics.incr("archive.reprocessed", counts["articles"] + counts["unstored"])
+    metrics.incr("archive.changed", counts["changed"])
+    metrics.incr("archive.inserted", counts["inserted"])
+    return counts
+
+
+def stats(conn=None, root: Optional[Path] = None) -> Dict[str, int]:
+    conn = conn or get_conn()
+    root = _root(root)
+    pages, objects, raw_bytes = conn.execute(
+        "SELECT COUNT(*), COUNT(DISTINCT sha256), COALESCE(SUM(size), 0) FROM raw_pages"
+    ).fetchone()
+    (archived,) = conn.execute(
+        "SELECT COUNT(*) FROM articles a WHERE EXISTS (SELECT 1 FROM raw_pages r WHERE r.url = a.url)"
+    ).fetchone()
+    (articles,) = conn.execute("SELECT COUNT(*) FROM articles").fetchone()
+    disk = sum(f.stat().st_size for f in Path(root).rglob("*.html.gz")) if Path(root).is_dir() else 0
+    return {
+        "fetches": pages,
+        "objects": objects,
+        "articles": articles,
+        "articles_archived": archived,
+        "unstored": len(unstored_pages(conn)),
+        "raw_bytes": raw_bytes,
+        "disk_bytes": disk,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Inspect or re-extract the raw page archive.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("stats")
+    rp = sub.add_parser("reprocess", help="re-run extraction + cleaning over archived pages")
+    rp.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    rp.add_argument("--dry-run", action="store_true", help="count changes without writing them")
+    args = ap.parse_args()
+
+    if args.cmd == "stats":
+        s = stats()
+        print(
+            f"Fetches: {s['fetches']} | distinct bodies: {s['objects']} | "
+            f"articles with a raw copy: {s['articles_archived']}/{s['articles']} | "
+            f"archived but not stored: {s['unstored']}"
+        )
+        print(f"Raw: {s['raw_bytes'] / 2**20:.1f} MiB | on disk: {s['disk_bytes'] / 2**20:.1f} MiB ({ARCHIVE_DIR})")
+    else:
+        t0 = time.perf_counter()
+        c = reprocess(workers=args.workers, dry_run=args.dry_run)
+        print(
+            f"Reprocessed {c['articles']} archived articles in {time.perf_counter() - t0:.1f}s | "
+            f"changed: {c['changed']} | unchanged: {c['unchanged']} | too short (kept old text): {c['too_short']}"
+        )
+        print(
+            f"Archived pages never stored: {c['unstored']} | now stored: {c['inserted']} | "
+            f"collapsed into source links: {c['collapsed']}"
+        )
+        if (c["changed"] or c["inserted"]) and not args.dry_run:
+            print("Run `python -m core.embed --incremental` to embed the changed and new articles.")
+        print(f"Metrics: {metrics.dump('reprocess')}")
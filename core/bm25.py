@@ -0,0 +1,137 @@
+"""
+On-disk BM25 inverted index over chunk texts (data/bm25.npz), built next to
+faiss.index by core.embed. Postings are stored CSR-style so a query is scored
+with a handful of numpy operations per query term.
+"""
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.keywords import query_terms, tokenize
+
+K1 = 1.2
+B = 0.75
+
+
+class BM25Index:
+    def __init__(
+        self,
+        terms: np.ndarray,
+        indptr: np.ndarray,
+        postings: np.ndarray,
+        tfs: np.ndarray,
+        doc_len: np.ndarray,
+        chunk_ids: np.ndarray,
+    ):
+        self.terms = terms
+        self.indptr = indptr        # int64[V + 1] slice of postings per term
+        self.postings = postings    # int32 document positions
+        self.tfs = tfs              # float32 term frequencies
+        self.doc_len = doc_len      # float32[N]
+        self.chunk_ids = chunk_ids  # int64[N] doc position -> chunk id
+
+        self.vocab: Dict[str, int] = {t: i for i, t in enumerate(terms.tolist())}
+        n = len(chunk_ids)
+        df = np.diff(indptr).astype("float32")
+        self.idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype("float32")
+        avgdl = float(doc_len.mean()) if n else 1.0
+        # Per-document length normalization, precomputed once
+        self.norm = (K1 * (1 - B + B * doc_len / max(avgdl, 1e-9))).astype("float32")
+
+    def __len__(self) -> int:
+        return int(self.chunk_ids.shape[0])
+
+    @classmethod
+    def build(cls, chunk_ids: Sequence[int], texts: Sequence[str]) -> "BM25Index":
+        vocab: Dict[str, int] = {}
+        rows: List[int] = []
+        cols: List[int] = []
+        counts: List[int] = []
+        doc_len = np.zeros(len(texts), dtype="float32")
+
+        for d, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_len[d] = len(tokens)
+            tf: Dict[int, int] = {}
+            for t in tokens:
+                tid = vocab.setdefault(t, len(vocab))
+                tf[tid] = tf.get(tid, 0) + 1
+            rows.extend(tf.keys())
+            cols.extend([d] * len(tf))
+            counts.extend(tf.values())
+
+        term_ids = np.asarray(rows, dtype="int64")
+        order = np.argsort(term_ids, kind="stable")
+        indptr = np.zeros(len(vocab) + 1, dtype="int64")
+        np.cumsum(np.bincount(term_ids, minlength=len(vocab)), out=indptr[1:])
+
+        terms = np.array(sorted(vocab, key=vocab.get)) if vocab else np.array([], dtype="<U1")
+        return cls(
+            terms=terms,
+            indptr=indptr,
+            postings=np.asarray(cols, dtype="int32")[order],
+            tfs=np.asarray(counts, dtype="float32")[order],
+            doc_len=doc_len,
+            chunk_ids=np.asarray(chunk_ids, dtype="int64"),
+        )
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        with tmp.open("wb") as f:
+            np.savez(
+                f,
+                terms=self.terms,
+                indptr=self.indptr,
+                postings=self.postings,
+                tfs=self.tfs,
+                doc_len=self.doc_len,
+                chunk_ids=self.chunk_ids,
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        with np.load(path) as z:
+            return cls(**{k: z[k] for k in ("terms", "indptr", "postings", "tfs", "doc_len", "chunk_ids")})
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every document for `query` (float32[N])."""
+        s = np.zeros(len(self), dtype="float32")
+        for t in set(query_terms(query)):
+            tid = self.vocab.get(t)
+            if tid is None:
+                continue
+            lo, hi = self.indptr[tid], self.indptr[tid + 1]
+            docs = self.postings[lo:hi]
+            tf = self.tfs[lo:hi]
+            s[docs] += self.idf[tid] * tf * (K1 + 1) / (tf + self.norm[docs])
+        return s
+
+    def search(self, query: str, top_n: int, mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(scores, chunk_ids) of the top_n matching documents, best first."""
+        s = self.scores(query)
+        if mask is not None:
+            s = np.where(mask, s, 0.0)
+        hits = np.flatnonzero(s > 0)
+        if len(hits) > top_n:
+            hits = hits[np.argpartition(-s[hits], top_n - 1)[:top_n]]
+        hits = hits[np.argsort(-s[hits], kind="stable")]
+        return s[hits], self.chunk_ids[hits]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], top_k: int, k: int = 60) -> Tuple[np.ndarray, np.ndarray]:
+    """Fuse ranked id lists: score(id) = sum 1 / (k + rank). Returns (scores, ids) best first."""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, cid in enumerate(ranking):
+            if cid < 0:
+                continue
+            fused[int(cid)] = fused.get(int(cid), 0.0) + 1.0 / (k + rank + 1)
+    best = sorted(fused.items(), key=lambda kv: -kv[1])[:top_k]
+    return (
+        np.asarray([v for _, v in best], dtype="float32"),
+        np.asarray([cid for cid, _ in best], dtype="int64"),
+    )
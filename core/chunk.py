@@ -1,5 +1,8 @@
 import re
-from typing import List
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import numpy as np
 
 def normalize_whitespace(text: str) -> str:
     text = text.replace("\u00a0", " ")
@@ -27,3 +30,124 @@ def chunk_text(text: str, chunk_size: int = 1200, overlap: int = 200) -> List[st
         start += max(chunk_size - overlap, 1)
 
     return chunks
+
+
+# ---------------------------------------------------------------------------
+# Sentence / token-aware chunking
+# ---------------------------------------------------------------------------
+
+# Split after . ! ? (optionally followed by a closing quote/bracket) before an
+# uppercase letter, digit or opening quote. Keeps "U.S. officials" style
+# abbreviations mostly intact because the next word must start a sentence.
+_SENTENCE_END = re.compile(r"(?<=[.!?])[\"'”’)\]]?\s+(?=[\"'“‘(\[]?[A-Z0-9])")
+
+
+def split_sentences(text: str) -> List[str]:
+    text = normalize_whitespace(text)
+    if not text:
+        return []
+    return [s for s in (p.strip() for p in _SENTENCE_END.split(text)) if s]
+
+
+@lru_cache(maxsize=None)
+def load_tokenizer(model_name: str):
+    """
+    The embedding model's own (fast) tokenizer, without loading the model
+    weights. Loaded once per process; callers share it.
+    """
+    from transformers import AutoTokenizer
+
+    return AutoTokenizer.from_pretrained(model_name)
+
+
+def _token_lengths(tokenizer, pieces: List[str], batch_size: int = 4096) -> np.ndarray:
+    """Token counts (no special tokens) for many strings, tokenized in large batches."""
+    lengths = np.zeros(len(pieces), dtype=np.int64)
+    for i in range(0, len(pieces), batch_size):
+        ids = tokenizer(pieces[i:i + batch_size], add_special_tokens=False)["input_ids"]
+        lengths[i:i + batch_size] = [len(x) for x in ids]
+    return lengths
+
+
+def _split_long(sentence: str, n_tokens: int, budget: int) -> List[str]:
+    """
+    Cut a sentence longer than the budget into roughly equal word runs (a
+    single over-long word is cut into character runs).
+    """
+    words = sentence.split()
+    parts = max(2, int(np.ceil(n_tokens / budget)) + 1)  # +1: word/token ratio is uneven
+    if len(words) == 1:
+        size = max(1, int(np.ceil(len(sentence) / parts)))
+        return [sentence[i:i + size] for i in range(0, len(sentence), size)]
+    size = max(1, int(np.ceil(len(words) / parts)))
+    return [" ".join(words[i:i + size]) for i in range(0, len(words), size)]
+
+
+def _fit_budget(tokenizer, sentence: str, n_tokens: int, budget: int) -> List[Tuple[str, int]]:
+    """(piece, token count) runs of the sentence, split again until each fits the budget."""
+    parts = _split_long(sentence, n_tokens, budget)
+    if len(parts) == 1:
+        return [(sentence, n_tokens)]  # a single character; nothing left to cut
+    out: List[Tuple[str, int]] = []
+    for part, n in zip(parts, _token_lengths(tokenizer, parts)):
+        out.extend([(part, int(n))] if n <= budget else _fit_budget(tokenizer, part, int(n), budget))
+    return out
+
+
+def _pack(lengths: np.ndarray, budget: int, overlap: int) -> List[Tuple[int, int]]:
+    """
+    Greedy sentence packing: (start, end) sentence ranges whose token sum fits
+    the budget. Each chunk repeats the last `overlap` sentences of the previous
+    one when that still leaves room to make progress.
+    """
+    n = len(lengths)
+    cum = np.concatenate(([0], np.cumsum(lengths)))
+    spans = []
+    start = 0
+    while start < n:
+        end = int(np.searchsorted(cum, cum[start] + budget, side="right")) - 1
+        end = min(max(end, start + 1), n)
+        spans.append((start, end))
+        if end >= n:
+            break
+        start = max(end - overlap, start + 1)
+    return spans
+
+
+def chunk_corpus_by_tokens(
+    texts: List[str],
+    tokenizer,
+    max_tokens: int = 256,
+    overlap_sentences: int = 1,
+) -> List[List[str]]:
+    """
+    Chunk many documents at once: split into sentences, tokenize every
+    sentence of the corpus in batches, then pack whole sentences per document
+    up to max_tokens (including the model's [CLS]/[SEP]) so nothing is cut off
+    by the encoder's truncation.
+    """
+    budget = max(8, max_tokens - 2)
+    doc_sents = [split_sentences(t) for t in texts]
+    flat = [s for sents in doc_sents for s in sents]
+    lengths = _token_lengths(tokenizer, flat)
+
+    # Re-split the (rare) sentences that alone exceed the budget
+    split: Dict[int, List[Tuple[str, int]]] = {
+        int(i): _fit_budget(tokenizer, flat[i], int(lengths[i]), budget)
+        for i in np.flatnonzero(lengths > budget)
+    }
+
+    out: List[List[str]] = []
+    pos = 0
+    for sents in doc_sents:
+        seq: List[str] = []
+        seq_lengths: List[int] = []
+        for j, s in enumerate(sents, start=pos):
+            for piece, n in split.get(j, [(s, int(lengths[j]))]):
+                seq.append(piece)
+                seq_lengths.append(n)
+        pos += len(sents)
+
+        spans = _pack(np.asarray(seq_lengths, dtype=np.int64), budget, overlap_sentences)
+        out.append([" ".join(seq[a:b]) for a, b in spans])
+    return out
@@ -0,0 +1,231 @@
+"""
+Compact, memory-mapped chunk store (replaces data/chunks.jsonl).
+
+Layout of a store directory:
+    text.bin         all chunk texts, UTF-8, back to back
+    offsets.npy      int64[n + 1] byte offsets into text.bin
+    chunk_ids.npy    int64[n] stable chunk ids, sorted ascending
+    article_ids.npy  int64[n]
+    chunk_idx.npy    int32[n]
+    published.npy    int64[n] article publish time, unix seconds (0 = unknown)
+    source_ids.npy   int32[n] index into sources.json
+    sources.json     distinct source names
+    articles.json    per-article metadata (title/url/source/published), stored once
+    store.json       {"count", "created"}; rewritten on every build (used as version)
+"""
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parents[1]  # project root
+STORE_DIR = BASE_DIR / "data" / "chunkstore"
+LEGACY_CHUNKS_PATH = BASE_DIR / "data" / "chunks.jsonl"
+
+# Keys kept per chunk; everything else in "meta" is per-article metadata
+CHUNK_KEYS = ("article_id", "chunk_idx", "chunk_id")
+
+
+def parse_published(value: Optional[str]) -> int:
+    """RSS (RFC 822) or ISO-8601 date string -> unix seconds (0 if missing/unparseable)."""
+    value = (value or "").strip()
+    if not value:
+        return 0
+    dt = None
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        try:
+            dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return 0
+    if dt is None:
+        return 0
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def _filter_columns(article_ids: np.ndarray, articles: Dict[str, Dict]):
+    """published / source_ids arrays aligned with article_ids, plus the source list."""
+    sources = sorted({a.get("source") or "" for a in articles.values()})
+    source_index = {name: i for i, name in enumerate(sources)}
+    per_article = {
+        aid: (parse_published(a.get("published")), source_index[a.get("source") or ""])
+        for aid, a in articles.items()
+    }
+    published = np.asarray([per_article.get(str(a), (0, 0))[0] for a in article_ids], dtype="int64")
+    source_ids = np.asarray([per_article.get(str(a), (0, 0))[1] for a in article_ids], dtype="int32")
+    return published, source_ids, sources
+
+
+def write_store(records: Iterable[Dict], path: Path = STORE_DIR) -> int:
+    """
+    Write {"meta", "text"} records (meta must carry article_id/chunk_idx/chunk_id)
+    into a new store directory and swap it in place of `path`.
+    """
+    path = Path(path)
+    records = sorted(records, key=lambda r: int(r["meta"]["chunk_id"]))
+
+    blobs = [r["text"].encode("utf-8") for r in records]
+    offsets = np.zeros(len(blobs) + 1, dtype="int64")
+    if blobs:
+        np.cumsum([len(b) for b in blobs], out=offsets[1:])
+
+    articles: Dict[str, Dict] = {}
+    for r in records:
+        aid = str(r["meta"]["article_id"])
+        if aid not in articles:
+            articles[aid] = {k: v for k, v in r["meta"].items() if k not in CHUNK_KEYS}
+
+    tmp = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    (tmp / "text.bin").write_bytes(b"".join(blobs))
+    np.save(tmp / "offsets.npy", offsets)
+    np.save(tmp / "chunk_ids.npy", np.asarray([r["meta"]["chunk_id"] for r in records], dtype="int64"))
+    np.save(tmp / "article_ids.npy", np.asarray([r["meta"]["article_id"] for r in records], dtype="int64"))
+    np.save(tmp / "chunk_idx.npy", np.asarray([r["meta"]["chunk_idx"] for r in records], dtype="int32"))
+    published, source_ids, sources = _filter_columns(
+        np.asarray([r["meta"]["article_id"] for r in records], dtype="int64"), articles
+    )
+    np.save(tmp / "published.npy", published)
+    np.save(tmp / "source_ids.npy", source_ids)
+    (tmp / "sources.json").write_text(json.dumps(sources, ensure_ascii=False), encoding="utf-8")
+    (tmp / "articles.json").write_text(json.dumps(articles, ensure_ascii=False), encoding="utf-8")
+    (tmp / "store.json").write_text(
+        json.dumps({"count": len(records), "created": time.time()}), encoding="utf-8"
+    )
+
+    old = path.with_name(path.name + ".old")
+    shutil.rmtree(old, ignore_errors=True)
+    if path.exists():
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+    return len(records)
+
+
+def store_exists(path: Path = STORE_DIR) -> bool:
+    return (Path(path) / "store.json").exists()
+
+
+class ChunkStore:
+    """Read-only view over a store directory; arrays and text are memory-mapped."""
+
+    def __init__(self, path: Path = STORE_DIR):
+        self.path = Path(path)
+        if not store_exists(self.path):
+            raise FileNotFoundError(f"No chunk store at {self.path}. Run: python -m core.embed")
+
+        self.info = json.loads((self.path / "store.json").read_text(encoding="utf-8"))
+        self.offsets = np.load(self.path / "offsets.npy", mmap_mode="r")
+        self.chunk_ids = np.load(self.path / "chunk_ids.npy", mmap_mode="r")
+        self.article_ids = np.load(self.path / "article_ids.npy", mmap_mode="r")
+        self.chunk_idx = np.load(self.path / "chunk_idx.npy", mmap_mode="r")
+        self.articles: Dict[str, Dict] = json.loads(
+            (self.path / "articles.json").read_text(encoding="utf-8")
+        )
+
+        if (self.path / "published.npy").exists():
+            self.published = np.load(self.path / "published.npy", mmap_mode="r")
+            self.source_ids = np.load(self.path / "source_ids.npy", mmap_mode="r")
+            self.sources: List[str] = json.loads((self.path / "sources.json").read_text(encoding="utf-8"))
+        else:
+            # Stores written before filter columns existed
+            self.published, self.source_ids, self.sources = _filter_columns(
+                np.asarray(self.article_ids), self.articles
+            )
+
+        text_path = self.path / "text.bin"
+        if text_path.stat().st_size:
+            self._blob = np.memmap(text_path, dtype="uint8", mode="r")
+        else:
+            self._blob = np.zeros(0, dtype="uint8")
+
+    def __len__(self) -> int:
+        return int(self.chunk_ids.shape[0])
+
+    def _record(self, pos: int) -> Dict:
+        aid = int(self.article_ids[pos])
+        meta = dict(self.articles.get(str(aid), {}))
+        meta.update({
+            "article_id": aid,
+            "chunk_idx": int(self.chunk_idx[pos]),
+            "chunk_id": int(self.chunk_ids[pos]),
+        })
+        start, end = int(self.offsets[pos]), int(self.offsets[pos + 1])
+        text = self._blob[start:end].tobytes().decode("utf-8")
+        return {"meta": meta, "text": text}
+
+    def positions(self, chunk_ids) -> np.ndarray:
+        """Row positions for chunk ids (-1 where the id is not in the store)."""
+        ids = np.asarray(chunk_ids, dtype="int64")
+        if not len(self):
+            return np.full(ids.shape, -1, dtype="int64")
+        pos = np.searchsorted(self.chunk_ids, ids)
+        pos = np.minimum(pos, len(self) - 1)
+        return np.where(self.chunk_ids[pos] == ids, pos, -1)
+
+    def get_many(self, chunk_ids) -> List[Optional[Dict]]:
+        """Fetch only the requested records (None for unknown ids)."""
+        return [self._record(int(p)) if p >= 0 else None for p in self.positions(chunk_ids)]
+
+    def get(self, chunk_id: int) -> Optional[Dict]:
+        return self.get_many([chunk_id])[0]
+
+    def latest_published(self) -> int:
+        return int(self.published.max()) if len(self) else 0
+
+    def select(self, since: Optional[float] = None, sources: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Chunk ids published at/after `since` (unix seconds) and/or from `sources`."""
+        mask = np.ones(len(self), dtype=bool)
+        if since is not None:
+            mask &= np.asarray(self.published) >= int(since)
+        if sources:
+            wanted = [i for i, name in enumerate(self.sources) if name in set(sources)]
+            mask &= np.isin(self.source_ids, wanted)
+        return np.asarray(self.chunk_ids)[mask]
+
+    def records(self) -> Iterator[Dict]:
+        for pos in range(len(self)):
+            yield self._record(pos)
+
+
+def migrate_jsonl(jsonl_path: Path = LEGACY_CHUNKS_PATH, path: Path = STORE_DIR) -> int:
+    """Convert a legacy chunks.jsonl into a chunk store (chunk_id defaults to line number)."""
+    records = []
+    with Path(jsonl_path).open("r", encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            rec = json.loads(line)
+            meta = dict(rec.get("meta", {}))
+            meta.setdefault("chunk_id", i)
+            meta.setdefault("article_id", -1)
+            meta.setdefault("chunk_idx", 0)
+            records.append({"meta": meta, "text": rec.get("text", "")})
+    return write_store(records, path)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Chunk store utilities.")
+    ap.add_argument("command", choices=["migrate", "stats"])
+    ap.add_argument("--jsonl", type=Path, default=LEGACY_CHUNKS_PATH)
+    ap.add_argument("--store", type=Path, default=STORE_DIR)
+    args = ap.parse_args()
+
+    if args.command == "migrate":
+        n = migrate_jsonl(args.jsonl, args.store)
+        print(f"Migrated {n} chunks from {args.jsonl} -> {args.store}")
+    else:
+        store = ChunkStore(args.store)
+        size = sum(p.stat().st_size for p in args.store.iterdir())
+        print(f"Chunks: {len(store)} | Articles: {len(store.articles)} | On disk: {size / 1024:.1f} KiB")
@@ -0,0 +1,71 @@
+"""
+Thin HTTP client for core.api, mirroring the in-process calls the app makes.
+
+    tokens, docs, stats = ask_stream(question, top_k=5, ...)
+
+behaves like core.rag.rag_answer_stream: docs/stats are available right away,
+tokens stream in, and stats is updated in place when the stream finishes.
+"""
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+API_URL = os.environ.get("RAGNROLL_API_URL", "http://127.0.0.1:8000")
+TIMEOUT = (3, 600)  # connect, read (generation can be slow)
+
+
+def health(url: str = API_URL, timeout: float = 1.0) -> Optional[Dict]:
+    """Server status, or None when the API isn't reachable."""
+    try:
+        r = requests.get(f"{url}/health", timeout=timeout)
+        r.raise_for_status()
+        return r.json()
+    except (requests.RequestException, ValueError):
+        return None
+
+
+def metrics(url: str = API_URL) -> Dict:
+    """The server's metrics snapshot (see core.metrics.snapshot)."""
+    r = requests.get(f"{url}/metrics", params={"format": "json"}, timeout=TIMEOUT)
+    r.raise_for_status()
+    return r.json()
+
+
+def retrieve(query: str, url: str = API_URL, **opts) -> List[Dict]:
+    r = requests.post(f"{url}/retrieve", json={"query": query, **opts}, timeout=TIMEOUT)
+    r.raise_for_status()
+    return r.json()["docs"]
+
+
+def ask(question: str, url: str = API_URL, **opts) -> Tuple[str, List[Dict], Dict]:
+    r = requests.post(f"{url}/ask", json={"question": question, **opts}, timeout=TIMEOUT)
+    r.raise_for_status()
+    body = r.json()
+    return body["answer"], body["docs"], body["stats"]
+
+
+def ask_stream(question: str, url: str = API_URL, **opts) -> Tuple[Iterator[str], List[Dict], Dict]:
+    r = requests.post(
+        f"{url}/ask/stream", json={"question": question, **opts}, stream=True, timeout=TIMEOUT
+    )
+    r.raise_for_status()
+    lines = r.iter_lines(decode_unicode=True)
+    head = json.loads(next(lines))
+    stats: Dict = dict(head["stats"])
+
+    def tokens() -> Iterator[str]:
+        try:
+            for line in lines:
+                if not line:
+                    continue
+                msg = json.loads(line)
+                if "token" in msg:
+                    yield msg["token"]
+                elif msg.get("done"):
+                    stats.update(msg.get("stats") or {})
+        finally:
+            r.close()
+
+    return tokens(), head["docs"], stats
@@ -0,0 +1,121 @@
+"""
+Prompt context packing.
+
+Turns the retrieved chunks into the source blocks that go into the prompt,
+within a token budget:
+
+- chunks of the same article are merged into one source (one header; the
+  sentences repeated by chunk overlap are kept once),
+- sentences with low similarity to the question are dropped, best-first
+  selection fills the budget, and each source keeps at least its best sentence,
+- kept sentences stay in article order.
+
+Token counts are estimates (word and punctuation pieces), close enough to the
+LLM's BPE count for budgeting.
+"""
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.chunk import split_sentences
+
+CONTEXT_TOKEN_BUDGET = 1200   # tokens of source text (headers included) per prompt
+MIN_SENTENCE_SIMILARITY = 0.2  # cosine to the question; lower sentences are dropped
+HEADER_TOKENS = 40             # rough cost of one Title/Source/URL/Published header
+
+_PIECE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(_PIECE.findall(text or ""))
+
+
+def merge_by_article(docs: List[Dict]) -> List[Dict]:
+    """
+    One source per article, in order of its best-ranked chunk. Chunks are put
+    back in chunk order and their sentences de-duplicated.
+    """
+    groups: Dict[object, List[Dict]] = {}
+    for d in docs:
+        meta = d.get("meta", {}) if isinstance(d.get("meta"), dict) else {}
+        key = meta.get("article_id", meta.get("url") or id(d))
+        groups.setdefault(key, []).append(d)
+
+    merged = []
+    for ranked in groups.values():
+        best = ranked[0]  # docs arrive best-first
+        chunks = sorted(ranked, key=lambda d: d.get("meta", {}).get("chunk_idx", 0))
+        seen = set()
+        sentences = []
+        for d in chunks:
+            for s in split_sentences(d.get("text", "")):
+                if s not in seen:
+                    seen.add(s)
+                    sentences.append(s)
+        out = dict(best)
+        out["meta"] = dict(best.get("meta", {}))
+        out["sentences"] = sentences
+        out["text"] = " ".join(sentences)
+        out["merged_chunks"] = len(chunks)
+        merged.append(out)
+    return merged
+
+
+def pack_context(
+    docs: List[Dict],
+    q_emb: Optional[np.ndarray] = None,
+    encode_fn: Optional[Callable[[List[str]], np.ndarray]] = None,
+    budget: int = CONTEXT_TOKEN_BUDGET,
+    min_similarity: float = MIN_SENTENCE_SIMILARITY,
+) -> Tuple[List[Dict], Dict[str, float]]:
+    """
+    Merge + compress docs into at most `budget` (estimated) tokens.
+
+    With q_emb (1 x dim, normalized) and encode_fn (texts -> normalized
+    vectors), sentences are scored by similarity to the question; without
+    them, sentences are kept in order until the budget runs out.
+    Returns (sources, {"sentences_kept", "sentences_total", "sources"}).
+    """
+    sources = merge_by_article(docs)
+    items: List[Tuple[int, int, int]] = []  # (source, position, tokens)
+    for si, src in enumerate(sources):
+        for pi, s in enumerate(src["sentences"]):
+            items.append((si, pi, estimate_tokens(s)))
+
+    if q_emb is not None and encode_fn is not None and items:
+        texts = [sources[si]["sentences"][pi] for si, pi, _ in items]
+        scores = encode_fn(texts) @ np.asarray(q_emb, dtype=np.float32).reshape(-1)
+    else:
+        # No similarity signal: earlier sources and earlier sentences first
+        scores = -np.arange(len(items), dtype=np.float32)
+        min_similarity = -np.inf
+
+    keep = set()
+    used = HEADER_TOKENS * len(sources)
+    # Every source keeps its best sentence so its citation number stays meaningful
+    for si in range(len(sources)):
+        idx = [i for i, it in enumerate(items) if it[0] == si]
+        if idx:
+            best = max(idx, key=lambda i: scores[i])
+            keep.add(best)
+            used += items[best][2]
+    for i in np.argsort(-scores, kind="stable"):
+        i = int(i)
+        if i in keep or scores[i] < min_similarity:
+            continue
+        if used + items[i][2] > budget:
+            continue
+        keep.add(i)
+        used += items[i][2]
+
+    for si, src in enumerate(sources):
+        kept = [src["sentences"][items[i][1]] for i in sorted(keep) if items[i][0] == si]
+        src["text"] = " ".join(kept)
+        del src["sentences"]
+
+    return sources, {
+        "sentences_kept": float(len(keep)),
+        "sentences_total": float(len(items)),
+        "sources": float(len(sources)),
+    }
@@ -1,11 +1,32 @@
 import sqlite3
+import threading
+import time
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from core.chunkstore import parse_published
 
 DB_PATH = Path("data/ragnroll.db")
 
-def get_conn() -> sqlite3.Connection:
-    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
+# One connection per thread (sqlite3 connections must not be shared across
+# threads by default); schema/migrations run once per process and path.
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready: set = set()
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",        # readers don't block the ingest writer
+    "PRAGMA synchronous=NORMAL",      # safe with WAL; no fsync per commit
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-32000",       # ~32 MB page cache
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA busy_timeout=5000",
+)
+
+
+def _create_schema(conn: sqlite3.Connection) -> None:
+    # Metadata only; bodies live in article_texts so scans over
+    # title/source/published never page through article text.
     conn.execute("""
     CREATE TABLE IF NOT EXISTS articles (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -13,8 +34,231 @@ def get_conn() -> sqlite3.Connection:
         title TEXT,
         source TEXT,
         published TEXT,
-        text TEXT,
+        added_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        simhash INTEGER,
+        published_ts INTEGER
+    );
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS article_texts (
+        article_id INTEGER PRIMARY KEY,
+        text TEXT
+    );
+    """)
+    # HTTP validators (ETag / Last-Modified) per feed and per article URL
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS http_cache (
+        url TEXT PRIMARY KEY,
+        etag TEXT,
+        last_modified TEXT,
+        checked_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    """)
+    # Feed links (e.g. Google News redirects) -> canonical article URL. Failed
+    # lookups map to the link itself and are retried after checked_at expires.
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS url_aliases (
+        alias TEXT PRIMARY KEY,
+        url TEXT,
+        checked_at INTEGER
+    );
+    """)
+    # Near-duplicate copies collapsed into a canonical article (core.dedup)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS article_links (
+        article_id INTEGER,
+        url TEXT UNIQUE,
+        title TEXT,
+        source TEXT,
+        published TEXT,
         added_at TEXT DEFAULT CURRENT_TIMESTAMP
     );
     """)
+    # Raw response bodies archived by core.archive (content-addressed files)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS raw_pages (
+        url TEXT,
+        fetched_at REAL,
+        sha256 TEXT,
+        size INTEGER,
+        PRIMARY KEY (url, fetched_at)
+    );
+    """)
+    # Feed metadata of archived URLs, so `core.archive reprocess` can insert
+    # pages whose text was too short to store when they were downloaded
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS raw_entries (
+        url TEXT PRIMARY KEY,
+        title TEXT,
+        source TEXT,
+        published TEXT
+    );
+    """)
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    """Bring databases created by older versions up to the current schema."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(articles)")}
+    if "simhash" not in columns:
+        conn.execute("ALTER TABLE articles ADD COLUMN simhash INTEGER")
+    if "published_ts" not in columns:
+        conn.execute("ALTER TABLE articles ADD COLUMN published_ts INTEGER")
+    if "checked_at" not in {row[1] for row in conn.execute("PRAGMA table_info(url_aliases)")}:
+        conn.execute("ALTER TABLE url_aliases ADD COLUMN checked_at INTEGER")
+    if "text" in columns:
+        print("Migrating article text into article_texts...")
+        conn.execute(
+            "INSERT OR IGNORE INTO article_texts(article_id, text) "
+            "SELECT id, text FROM articles WHERE text IS NOT NULL"
+        )
+        try:
+            conn.execute("ALTER TABLE articles DROP COLUMN text")
+        except sqlite3.OperationalError:
+            conn.execute("UPDATE articles SET text = NULL")  # SQLite < 3.35
+
+    missing = conn.execute(
+        "SELECT id, published, added_at FROM articles WHERE published_ts IS NULL"
+    ).fetchall()
+    if missing:
+        conn.executemany(
+            "UPDATE articles SET published_ts = ? WHERE id = ?",
+            [(published_ts(published, added_at), aid) for aid, published, added_at in missing],
+        )
+
+
+def _create_indexes(conn: sqlite3.Connection) -> None:
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_published ON articles(published_ts)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_source ON articles(source, published_ts)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_article_links_article ON article_links(article_id)")
+
+
+def _create_fts(conn: sqlite3.Connection) -> bool:
+    """FTS5 over article_texts (external content, kept in sync by triggers)."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'article_fts'"
+    ).fetchone()
+    try:
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS article_fts "
+            "USING fts5(text, content='article_texts', content_rowid='article_id')"
+        )
+    except sqlite3.OperationalError:
+        return False  # SQLite built without FTS5
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS article_texts_ai AFTER INSERT ON article_texts BEGIN
+        INSERT INTO article_fts(rowid, text) VALUES (new.article_id, new.text);
+    END;
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS article_texts_ad AFTER DELETE ON article_texts BEGIN
+        INSERT INTO article_fts(article_fts, rowid, text) VALUES ('delete', old.article_id, old.text);
+    END;
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS article_texts_au AFTER UPDATE ON article_texts BEGIN
+        INSERT INTO article_fts(article_fts, rowid, text) VALUES ('delete', old.article_id, old.text);
+        INSERT INTO article_fts(rowid, text) VALUES (new.article_id, new.text);
+    END;
+    """)
+    if not exists:
+        conn.execute("INSERT INTO article_fts(article_fts) VALUES ('rebuild')")
+    return True
+
+
+def _prepare(conn: sqlite3.Connection) -> None:
+    key = str(DB_PATH.resolve())
+    if key in _schema_ready:
+        return
+    with _schema_lock:
+        if key in _schema_ready:
+            return
+        with conn:
+            _create_schema(conn)
+            _migrate(conn)
+            _create_indexes(conn)
+            _create_fts(conn)
+        _schema_ready.add(key)
+
+
+def _is_open(conn: sqlite3.Connection) -> bool:
+    try:
+        conn.execute("SELECT 1")
+        return True
+    except sqlite3.ProgrammingError:
+        return False
+
+
+def get_conn() -> sqlite3.Connection:
+    """
+    This thread's cached connection to DB_PATH (opened, tuned and migrated on
+    first use). Closing it is allowed; the next call reopens.
+    """
+    conn = getattr(_local, "conn", None)
+    path = getattr(_local, "path", None)
+    if conn is not None and path == DB_PATH and _is_open(conn):
+        return conn
+
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(DB_PATH)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    _prepare(conn)
+    _local.conn = conn
+    _local.path = DB_PATH
     return conn
+
+
+def published_ts(published: Optional[str], added_at: Optional[str] = None) -> int:
+    """Unix seconds for ordering: feed date, else ingest time, else now."""
+    ts = parse_published(published)
+    if not ts and added_at:
+        ts = parse_published(added_at)
+    return ts or int(time.time())
+
+
+def load_texts(conn: sqlite3.Connection, article_ids: List[int]) -> Dict[int, str]:
+    out: Dict[int, str] = {}
+    for i in range(0, len(article_ids), 500):
+        batch = article_ids[i:i + 500]
+        marks = ",".join("?" * len(batch))
+        out.update(
+            conn.execute(
+                f"SELECT article_id, text FROM article_texts WHERE article_id IN ({marks})", batch
+            ).fetchall()
+        )
+    return out
+
+
+def search_text(conn: sqlite3.Connection, query: str, limit: int = 20) -> List[Tuple[int, str, float]]:
+    """Full-text search over article bodies: (article_id, title, bm25 rank), best first."""
+    return conn.execute(
+        "SELECT a.id, a.title, bm25(article_fts) AS rank "
+        "FROM article_fts JOIN articles a ON a.id = article_fts.rowid "
+        "WHERE article_fts MATCH ? ORDER BY rank LIMIT ?",
+        (query, limit),
+    ).fetchall()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Query the article store.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sp = sub.add_parser("search", help="full-text search over article bodies (FTS5)")
+    sp.add_argument("query", nargs="+")
+    sp.add_argument("--limit", type=int, default=20)
+    sp.add_argument("--raw", action="store_true", help="pass the query through as FTS5 syntax")
+    args = ap.parse_args()
+
+    query = " ".join(args.query)
+    if not args.raw:
+        # Plain words: quote each so punctuation (e.g. "U.S.") isn't read as FTS5 syntax
+        query = " ".join('"' + w.replace('"', '""') + '"' for w in query.split())
+    try:
+        rows = search_text(get_conn(), query, limit=args.limit)
+    except sqlite3.OperationalError as e:
+        raise SystemExit(f"Search failed: {e}")
+    for aid, title, rank in rows:
+        print(f"{rank:8.2f}  [{aid}] {title}")
+    if not rows:
+        print("No matches.")
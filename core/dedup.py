@@ -0,0 +1,177 @@
+"""
+Near-duplicate detection.
+
+- Articles (core.ingest): 64-bit SimHash over word 3-shingles of the cleaned
+  text; signatures within a small Hamming distance are the same story, and
+  the later copy is stored as an extra source link of the first one.
+- Chunks (core.embed): greedy clustering on embedding cosine similarity; a
+  chunk too close to one already indexed is not added, and the article it
+  duplicated is recorded so the chunk comes back if that article is evicted.
+"""
+import hashlib
+import re
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+SIMHASH_MAX_DISTANCE = 3      # bits out of 64
+CHUNK_DUP_THRESHOLD = 0.95    # cosine similarity between normalized chunk embeddings
+RECENT_ARTICLES = 5000        # how far back ingest looks for near-duplicates
+DEDUP_BLOCK = 1024            # chunk embeddings compared with each other at once
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash of word 3-shingles (unsigned int)."""
+    words = re.findall(r"\w+", (text or "").lower())
+    if not words:
+        return 0
+    shingles = [" ".join(words[i:i + 3]) for i in range(max(1, len(words) - 2))]
+    hashes = np.fromiter(
+        (
+            int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+            for s in shingles
+        ),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(hashes)
+    return int(np.packbits((votes > 0).astype(np.uint8), bitorder="little").view(np.uint64)[0])
+
+
+def to_signed(h: int) -> int:
+    """SQLite INTEGER is signed 64-bit."""
+    return h - (1 << 64) if h >= (1 << 63) else h
+
+
+def to_unsigned(h: int) -> int:
+    return h + (1 << 64) if h < 0 else h
+
+
+def hamming(sigs: np.ndarray, sig: int) -> np.ndarray:
+    """Hamming distance between one signature and an array of uint64 signatures."""
+    x = np.bitwise_xor(sigs, np.uint64(sig))
+    return np.unpackbits(x.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+class SimHashIndex:
+    """Signatures of recent articles; match() finds the canonical article for a near-duplicate."""
+
+    def __init__(self, max_distance: int = SIMHASH_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.ids: List[int] = []
+        self._sigs = np.zeros(0, dtype=np.uint64)
+
+    def add(self, article_id: int, sig: int) -> None:
+        self.ids.append(int(article_id))
+        self._sigs = np.append(self._sigs, np.uint64(sig))
+
+    def extend(self, items: Iterable[Tuple[int, int]]) -> None:
+        items = list(items)
+        self.ids.extend(int(a) for a, _ in items)
+        self._sigs = np.concatenate([self._sigs, np.asarray([s for _, s in items], dtype=np.uint64)])
+
+    def match(self, sig: int) -> Optional[int]:
+        if not self.ids or sig == 0:
+            return None
+        dist = hamming(self._sigs, sig)
+        best = int(np.argmin(dist))
+        return self.ids[best] if dist[best] <= self.max_distance else None
+
+
+def load_simhash_index(conn, limit: int = RECENT_ARTICLES) -> SimHashIndex:
+    """Signatures of the newest `limit` articles, backfilling rows ingested before SimHash."""
+    from core.db import load_texts
+
+    rows = conn.execute("SELECT id, simhash FROM articles ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+    texts = load_texts(conn, [aid for aid, sig in rows if sig is None])  # bodies only when needed
+    backfill = []
+    items = []
+    for aid, sig in rows:
+        if sig is None:
+            sig = to_signed(simhash(texts.get(aid) or ""))
+            backfill.append((sig, aid))
+        items.append((aid, to_unsigned(sig)))
+    if backfill:
+        conn.executemany("UPDATE articles SET simhash = ? WHERE id = ?", backfill)
+    index = SimHashIndex()
+    index.extend(reversed(items))  # oldest first so the earliest copy is canonical
+    return index
+
+
+def near_duplicate_matches(
+    new_emb: np.ndarray,
+    existing_index=None,
+    threshold: float = CHUNK_DUP_THRESHOLD,
+    ids: Optional[Sequence[int]] = None,
+    block: int = DEDUP_BLOCK,
+) -> np.ndarray:
+    """
+    For each row of new_emb, the id of the vector it near-duplicates
+    (cosine >= threshold; embeddings must be normalized), or -1 to keep it.
+    Matches come from existing_index (its ids) or from an earlier kept row of
+    new_emb (ids[row]; default the row number).
+
+    Rows are compared a block at a time against a flat index of the rows kept
+    so far, so memory is O(block^2 + kept) rather than a dense n x n matrix.
+    """
+    import faiss
+
+    emb = np.ascontiguousarray(new_emb, dtype="float32")
+    n = len(emb)
+    ids = np.arange(n, dtype="int64") if ids is None else np.asarray(ids, dtype="int64")
+    match = np.full(n, -1, dtype="int64")
+    if not n:
+        return match
+
+    if existing_index is not None and existing_index.ntotal:
+        for start in range(0, n, block):
+            scores, labels = existing_index.search(emb[start:start + block], 1)
+            hit = np.flatnonzero(scores[:, 0] >= threshold)
+            match[start + hit] = labels[hit, 0]
+
+    kept = faiss.IndexFlatIP(emb.shape[1])
+    kept_rows = np.zeros(0, dtype="int64")  # row of new_emb behind each vector in `kept`
+    for start in range(0, n, block):
+        rows = start + np.flatnonzero(match[start:start + block] < 0)
+        if kept.ntotal and len(rows):
+            scores, labels = kept.search(emb[rows], 1)
+            hit = scores[:, 0] >= threshold
+            match[rows[hit]] = ids[kept_rows[labels[hit, 0]]]
+            rows = rows[~hit]
+        # Greedy within the block: a row duplicates an earlier kept row
+        sims = emb[rows] @ emb[rows].T
+        keep: List[int] = []
+        for j in range(len(rows)):
+            if keep:
+                best = keep[int(np.argmax(sims[j, keep]))]
+                if sims[j, best] >= threshold:
+                    match[rows[j]] = ids[rows[best]]
+                    continue
+            keep.append(j)
+        kept.add(emb[rows[keep]])
+        kept_rows = np.concatenate([kept_rows, rows[keep]])
+    return match
+
+
+if __name__ == "__main__":
+    from core.chunk import chunk_text
+    from core.db import get_conn
+
+    conn = get_conn()
+    index = SimHashIndex()
+    dups = []
+    for aid, text in conn.execute("SELECT article_id, text FROM article_texts ORDER BY article_id ASC"):
+        sig = simhash(text or "")
+        canonical = index.match(sig)
+        if canonical is None:
+            index.add(aid, sig)
+        else:
+            dups.append((aid, canonical, len(chunk_text(text or ""))))
+    (links,) = conn.execute("SELECT COUNT(*) FROM article_links").fetchone()
+
+    chunks = sum(c for _, _, c in dups)
+    print(f"Near-duplicate articles still in the store: {len(dups)} ({chunks} chunks, ~{chunks * 384 * 4 / 1024:.0f} KiB of vectors)")
+    print(f"Duplicates already collapsed into extra source links: {links}")
+    for aid, canonical, _ in dups[:20]:
+        print(f"  article {aid} ~ article {canonical}")
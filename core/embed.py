@@ -1,45 +1,246 @@
+import argparse
+import hashlib
 import json
+import shutil
 import sqlite3
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
-from core.db import DB_PATH
-from core.chunk import chunk_text
-
-CHUNKS_PATH = Path("data/chunks.jsonl")
-FAISS_PATH = Path("data/faiss.index")
+from core import metrics, snapshots
+from core.ann import INDEX_TYPES, fits, load_params, make_index, save_params, supports_remove, train_index
+from core.bm25 import BM25Index
+from core.db import get_conn
+from core.dedup import near_duplicate_matches
+from core.embed_cache import EmbeddingCache
+from core.encoder import ENCODER_BACKEND, ENCODER_BACKENDS, cache_key, get_encoder
+from core.chunk import chunk_corpus_by_tokens, chunk_text, load_tokenizer
+from core.chunkstore import ChunkStore, store_exists, write_store
 
 EMBED_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+EMBED_MAX_TOKENS = 256  # MiniLM's max_seq_length; the encoder truncates beyond it
+
+CHUNKERS = ("tokens", "chars")
+OVERLAP_SENTENCES = 1
+
+# Stable chunk ids: article_id * MAX_CHUNKS_PER_ARTICLE + chunk_idx
+MAX_CHUNKS_PER_ARTICLE = 10_000
 
 
 def load_articles(conn: sqlite3.Connection, limit: int = 200) -> List[Tuple]:
+    """Newest `limit` articles by publication time (served by idx_articles_published)."""
     cur = conn.cursor()
     rows = cur.execute(
-        "SELECT id, title, url, source, published, text FROM articles ORDER BY id DESC LIMIT ?",
+        "SELECT a.id, a.title, a.url, a.source, a.published, t.text "
+        "FROM (SELECT * FROM articles ORDER BY published_ts DESC, id DESC LIMIT ?) a "
+        "LEFT JOIN article_texts t ON t.article_id = a.id "
+        "ORDER BY a.published_ts DESC, a.id DESC",
         (limit,),
     ).fetchall()
     return rows
 
 
-def build_index(article_limit: int = 200, chunk_size: int = 1200, overlap: int = 200):
+def load_links(conn: sqlite3.Connection, article_ids: List[int]) -> Dict[int, List[Dict]]:
+    """Extra source links of articles that absorbed near-duplicates (see core.ingest)."""
+    links: Dict[int, List[Dict]] = {}
+    for i in range(0, len(article_ids), 500):
+        batch = article_ids[i:i + 500]
+        marks = ",".join("?" * len(batch))
+        rows = conn.execute(
+            f"SELECT article_id, url, title, source, published FROM article_links "
+            f"WHERE article_id IN ({marks}) ORDER BY rowid",
+            batch,
+        )
+        for aid, url, title, source, published in rows:
+            links.setdefault(aid, []).append(
+                {"url": url, "title": title, "source": source, "published": published}
+            )
+    return links
+
+
+def chunk_id_for(article_id: int, chunk_idx: int) -> int:
+    return int(article_id) * MAX_CHUNKS_PER_ARTICLE + int(chunk_idx)
+
+
+def article_hash(
+    title: str, url: str, source: str, published: str, text: str, links: Optional[List[Dict]] = None
+) -> str:
+    h = hashlib.sha1()
+    for part in (title, url, source, published, text):
+        h.update((part or "").encode("utf-8"))
+        h.update(b"\x00")
+    for link in links or []:
+        h.update(link["url"].encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def chunk_articles(
+    texts: List[str],
+    chunker: str = "tokens",
+    chunk_size: int = 1200,
+    overlap: int = 200,
+    max_tokens: int = EMBED_MAX_TOKENS,
+) -> List[List[str]]:
+    """Chunks of each article text, exactly as build_index() indexes them."""
+    if chunker == "tokens" and texts:
+        return chunk_corpus_by_tokens(
+            texts,
+            load_tokenizer(EMBED_MODEL_NAME),
+            max_tokens=max_tokens,
+            overlap_sentences=OVERLAP_SENTENCES,
+        )
+    return [chunk_text(t, chunk_size, overlap) for t in texts]
+
+
+def _load_manifest(snap: snapshots.Snapshot) -> Optional[Dict]:
+    if not snap.manifest_path.exists() or not snap.faiss_path.exists() or not store_exists(snap.store_path):
+        return None
+    try:
+        return json.loads(snap.manifest_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _load_records(snap: snapshots.Snapshot) -> List[Dict]:
+    return list(ChunkStore(snap.store_path).records())
+
+
+def build_index(
+    article_limit: int = 200,
+    chunk_size: int = 1200,
+    overlap: int = 200,
+    incremental: bool = False,
+    index_type: str = "auto",
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    use_cache: bool = True,
+    dedup: bool = True,
+    chunker: str = "tokens",
+    max_tokens: int = EMBED_MAX_TOKENS,
+    encoder: str = ENCODER_BACKEND,
+    keep_versions: int = snapshots.KEEP_VERSIONS,
+):
+    """
+    Chunk + embed the newest `article_limit` articles into a new index snapshot
+    (see core.snapshots) and publish it; keeps the newest keep_versions.
+
+    incremental=True reuses the existing index: only new or changed articles are
+    embedded, and articles outside the retention window are evicted. Falls back
+    to a full rebuild when no compatible index exists.
+
+    index_type is one of core.ann.INDEX_TYPES or "auto" (chosen by corpus size);
+    nprobe / ef_search override the persisted search settings.
+    use_cache looks chunk embeddings up in data/embed_cache.db first.
+    dedup drops chunks that are near-duplicates of an already indexed chunk.
+
+    chunker="tokens" packs whole sentences up to max_tokens of the embedding
+    model's tokenizer; "chars" is the old fixed-size character window
+    (chunk_size / overlap in characters).
+
+    encoder is a core.encoder backend ("torch", "onnx", "onnx-int8"); switching
+    backends forces a full rebuild so fp32 and int8 vectors never share an index.
+    """
     Path("data").mkdir(parents=True, exist_ok=True)
+    base = snapshots.current()
+
+    conn = get_conn()
+    with metrics.timer("embed.load_articles"):
+        articles = load_articles(conn, article_limit)
+        links = load_links(conn, [a[0] for a in articles])
+
+    model_key = cache_key(EMBED_MODEL_NAME, encoder)
+    if chunker == "tokens":
+        settings = {
+            "model": model_key,
+            "chunker": chunker,
+            "max_tokens": max_tokens,
+            "overlap_sentences": OVERLAP_SENTENCES,
+        }
+    else:
+        settings = {"model": model_key, "chunker": chunker, "chunk_size": chunk_size, "overlap": overlap}
+    hashes = {
+        aid: article_hash(title, url, source, published, text, links.get(aid))
+        for aid, title, url, source, published, text in articles
+    }
+
+    manifest = _load_manifest(base) if incremental else None
+    if incremental and (manifest is None or manifest.get("settings") != settings):
+        print("No compatible index found; doing a full rebuild.")
+        manifest = None
+
+    index = None
+    params: Dict = {}
+    records: List[Dict] = []
+    indexed: Dict[str, str] = {}
+    stale: set = set()
+    duplicate_of: Dict[str, List[int]] = {}  # article -> articles its dropped chunks duplicated
+    evicted = 0
+    duplicates = 0
+
+    if manifest is not None:
+        params = load_params(base.params_path)
+        indexed = manifest.get("articles", {})
+        stale = {
+            int(aid) for aid, h in indexed.items()
+            if hashes.get(int(aid)) != h
+        }
+        # Articles whose chunks were dropped as duplicates of a stale article's
+        # chunks are re-embedded too, or those chunks would be lost with it
+        duplicate_of = manifest.get("duplicate_of", {})
+        while True:
+            dependents = {
+                int(aid) for aid, canon in duplicate_of.items()
+                if int(aid) not in stale and aid in indexed and stale.intersection(canon)
+            }
+            if not dependents:
+                break
+            stale |= dependents
+        counts = manifest.get("chunk_counts", {})
+        kept_chunks = sum(n for aid, n in counts.items() if int(aid) not in stale)
+        per_article = (sum(counts.values()) / len(counts)) if counts else 1.0
+        new_articles = sum(1 for aid in hashes if str(aid) not in indexed or aid in stale)
+        expected = int(kept_chunks + new_articles * per_article)
+
+        if stale and not supports_remove(params):
+            print(f"{params.get('type')} index cannot evict vectors; doing a full rebuild.")
+            manifest = None
+        elif not fits(params, index_type, expected):
+            print(
+                f"Existing {params.get('type')} index doesn't fit index_type={index_type!r} "
+                f"at ~{expected} chunks; doing a full rebuild."
+            )
+            manifest = None
+
+        if manifest is None:
+            indexed, stale, duplicate_of = {}, set(), {}
 
-    print("Loading embedding model...")
-    model = SentenceTransformer(EMBED_MODEL_NAME)
+    if manifest is not None:
+        with metrics.timer("embed.load_existing"):
+            index = faiss.read_index(str(base.faiss_path))
+            records = [r for r in _load_records(base) if r["meta"]["article_id"] not in stale]
+        stale_ids = [
+            chunk_id_for(aid, i)
+            for aid in stale
+            for i in range(manifest.get("chunk_counts", {}).get(str(aid), 0))
+        ]
+        if stale_ids:
+            index.remove_ids(np.asarray(stale_ids, dtype="int64"))
+        evicted = sum(1 for aid in stale if aid not in hashes)
+        indexed = {aid: h for aid, h in indexed.items() if int(aid) not in stale}
+        duplicate_of = {aid: canon for aid, canon in duplicate_of.items() if int(aid) not in stale}
 
-    conn = sqlite3.connect(DB_PATH)
-    articles = load_articles(conn, article_limit)
-    conn.close()
+    todo = [a for a in articles if str(a[0]) not in indexed]
 
     texts = []
     metas = []
 
-    for aid, title, url, source, published, text in articles:
-        chunks = chunk_text(text, chunk_size, overlap)
+    with metrics.timer("embed.chunk"):
+        chunked = chunk_articles([a[5] or "" for a in todo], chunker, chunk_size, overlap, max_tokens)
+
+    for (aid, title, url, source, published, text), chunks in zip(todo, chunked):
         for i, ch in enumerate(chunks):
             texts.append(ch)
             metas.append(
@@ -50,36 +251,167 @@ def build_index(article_limit: int = 200, chunk_size: int = 1200, overlap: int =
                     "url": url,
                     "source": source,
                     "published": published,   # ✅ NEW
+                    "chunk_id": chunk_id_for(aid, i),
                 }
             )
+            if aid in links:
+                metas[-1]["links"] = links[aid]
 
-    if not texts:
+    if not texts and not records:
         print("No chunks found to embed.")
         return
 
-    print(f"Embedding {len(texts)} chunks...")
-    embeddings = model.encode(
-        texts,
-        batch_size=32,
-        show_progress_bar=True,
-        normalize_embeddings=True
-    ).astype("float32")
+    if texts:
+        def encode(batch: List[str]) -> np.ndarray:
+            print(f"Loading embedding model ({encoder})...")
+            with metrics.timer("embed.model_load"):
+                model = get_encoder(encoder, EMBED_MODEL_NAME)
+
+            print(f"Embedding {len(batch)} chunks...")
+            with metrics.timer("embed.model_encode"):
+                return model.encode(batch, batch_size=32, show_progress_bar=True)
+
+        with metrics.timer("embed.encode"):
+            if use_cache:
+                cache = EmbeddingCache(model_key)
+                embeddings = cache.encode(texts, encode)
+                print(cache.format_stats())
+                cache.close()
+            else:
+                embeddings = encode(texts)
+        metrics.incr("embed.chunks_encoded", len(texts))
+
+        if dedup:
+            with metrics.timer("embed.dedup"):
+                match = near_duplicate_matches(
+                    embeddings, index, ids=[m["chunk_id"] for m in metas]
+                )
+            dup = match >= 0
+            for i in np.flatnonzero(dup):
+                aid = metas[i]["article_id"]
+                canonical = int(match[i]) // MAX_CHUNKS_PER_ARTICLE
+                if canonical != aid and canonical not in duplicate_of.setdefault(str(aid), []):
+                    duplicate_of[str(aid)].append(canonical)
+            if dup.any():
+                keep = np.flatnonzero(~dup)
+                duplicates = int(dup.sum())
+                embeddings = embeddings[keep]
+                metas = [metas[i] for i in keep]
+                texts = [texts[i] for i in keep]
+
+        if index is None:
+            index, params = make_index(index_type, embeddings.shape[1], len(embeddings))
+            if not index.is_trained:
+                print(f"Training {params['type']} index on {len(embeddings)} vectors...")
+            with metrics.timer("embed.train"):
+                train_index(index, embeddings)
+        ids = np.asarray([m["chunk_id"] for m in metas], dtype="int64")
+        with metrics.timer("embed.index_add"):
+            index.add_with_ids(embeddings, ids)
+
+        records.extend({"meta": meta, "text": text} for meta, text in zip(metas, texts))
+
+    # Chunk id slots per article (max chunk_idx + 1). Dropped near-duplicates
+    # leave gaps, so this is what eviction has to cover, not the chunk count.
+    chunk_counts: Dict[str, int] = {}
+    for r in records:
+        aid = str(r["meta"]["article_id"])
+        chunk_counts[aid] = max(chunk_counts.get(aid, 0), r["meta"]["chunk_idx"] + 1)
+    # Also record articles that produced no chunks, so they aren't re-chunked every run
+    done = set(indexed) | {str(a[0]) for a in todo}
+
+    def write_manifest(path: Path):
+        path.write_text(
+            json.dumps(
+                {
+                    "settings": settings,
+                    "articles": {aid: hashes[int(aid)] for aid in sorted(done, key=int)},
+                    "chunk_counts": chunk_counts,
+                    "duplicate_of": {
+                        aid: canon for aid, canon in duplicate_of.items()
+                        if aid in done and canon
+                    },
+                },
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
 
-    index = faiss.IndexFlatIP(embeddings.shape[1])
-    index.add(embeddings)
+    if nprobe is not None and "nprobe" in params:
+        params["nprobe"] = min(nprobe, params["nlist"])
+    if ef_search is not None and "efSearch" in params:
+        params["efSearch"] = ef_search
 
-    with CHUNKS_PATH.open("w", encoding="utf-8") as f:
-        for i, (meta, text) in enumerate(zip(metas, texts)):
-            meta["chunk_id"] = i
-            f.write(json.dumps({"meta": meta, "text": text}, ensure_ascii=False) + "\n")
+    # Everything goes into a new snapshot directory; readers keep serving the
+    # current one until publish() switches the pointer.
+    snap = snapshots.begin()
+    try:
+        with metrics.timer("embed.write_store"):
+            write_store(records, snap.store_path)
+        # Lexical index is rebuilt from all chunk texts (cheap next to embedding)
+        with metrics.timer("embed.bm25_build"):
+            BM25Index.build(
+                [r["meta"]["chunk_id"] for r in records], [r["text"] for r in records]
+            ).save(snap.bm25_path)
+        with metrics.timer("embed.write_index"):
+            faiss.write_index(index, str(snap.faiss_path))
+            save_params(snap.params_path, params)
+            write_manifest(snap.manifest_path)
+    except BaseException:
+        shutil.rmtree(snap.root, ignore_errors=True)
+        raise
+    snapshots.publish(
+        snap,
+        {"chunks": len(records), "articles": len(chunk_counts), "index_type": params.get("type"), "base": base.version},
+    )
+    pruned = snapshots.prune(keep_versions)
 
-    faiss.write_index(index, str(FAISS_PATH))
+    metrics.incr("embed.articles_embedded", len(todo))
+    metrics.incr("embed.articles_evicted", evicted)
+    metrics.incr("embed.duplicate_chunks", duplicates)
+    metrics.set_gauge("index.vectors", index.ntotal)
+    metrics.set_gauge("index.articles", len(chunk_counts))
 
-    print(f"Built FAISS index | Articles: {len(articles)} | Chunks: {len(texts)}")
-    print("Saved files:")
-    print(f"- {FAISS_PATH}")
-    print(f"- {CHUNKS_PATH}")
+    mode = "Incremental update" if manifest is not None else "Built FAISS index"
+    print(
+        f"{mode} ({params.get('type')}) | Articles: {len(chunk_counts)} | Chunks: {len(records)} | "
+        f"Embedded: {len(texts)} chunks from {len(todo)} articles | Evicted: {evicted} articles"
+    )
+    if duplicates:
+        print(
+            f"Near-duplicate chunks dropped: {duplicates} "
+            f"(~{duplicates * index.d * 4 / 1024:.0f} KiB of raw vectors kept out of the index)"
+        )
+    print(f"Published snapshot {snap.version} -> {snap.root}")
+    if pruned:
+        print(f"Removed old snapshots: {', '.join(pruned)}")
+    print(f"Metrics: {metrics.dump('embed')}")
 
 
 if __name__ == "__main__":
-    build_index(article_limit=200)
+    ap = argparse.ArgumentParser(description="Chunk + embed articles into the FAISS index.")
+    ap.add_argument("--limit", type=int, default=200, help="retention window: newest N articles")
+    ap.add_argument("--incremental", action="store_true", help="only embed new/changed articles")
+    ap.add_argument("--index-type", default="auto", choices=("auto",) + INDEX_TYPES)
+    ap.add_argument("--nprobe", type=int, default=None, help="IVF lists probed per query")
+    ap.add_argument("--ef-search", type=int, default=None, help="HNSW search depth")
+    ap.add_argument("--no-cache", action="store_true", help="don't use the embedding cache")
+    ap.add_argument("--chunker", default="tokens", choices=CHUNKERS)
+    ap.add_argument("--max-tokens", type=int, default=EMBED_MAX_TOKENS, help="token budget per chunk")
+    ap.add_argument("--keep-duplicates", action="store_true", help="index near-duplicate chunks too")
+    ap.add_argument("--encoder", default=ENCODER_BACKEND, choices=ENCODER_BACKENDS)
+    ap.add_argument("--keep", type=int, default=snapshots.KEEP_VERSIONS, help="index snapshots kept for rollback")
+    args = ap.parse_args()
+    build_index(
+        article_limit=args.limit,
+        incremental=args.incremental,
+        index_type=args.index_type,
+        nprobe=args.nprobe,
+        ef_search=args.ef_search,
+        use_cache=not args.no_cache,
+        dedup=not args.keep_duplicates,
+        chunker=args.chunker,
+        max_tokens=args.max_tokens,
+        encoder=args.encoder,
+        keep_versions=args.keep,
+    )
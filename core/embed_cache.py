@@ -0,0 +1,219 @@
+"""
+Persistent embedding cache: SQLite table of float32 vectors keyed by
+(model name, hash of the whitespace-normalized chunk text). Rebuilds only
+encode cache misses; least-recently-used rows are evicted past `max_entries`.
+"""
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from core.chunk import normalize_whitespace
+
+BASE_DIR = Path(__file__).resolve().parents[1]  # project root
+CACHE_PATH = BASE_DIR / "data" / "embed_cache.db"
+MAX_ENTRIES = 200_000  # ~300 MB of 384-d float32 vectors
+
+EncodeFn = Callable[[List[str]], np.ndarray]
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(normalize_whitespace(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, model_name: str, path: Optional[Path] = None, max_entries: int = MAX_ENTRIES):
+        self.model_name = model_name
+        self.path = Path(path) if path is not None else CACHE_PATH
+        self.max_entries = max_entries
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS embeddings (
+            model TEXT,
+            hash TEXT,
+            dim INTEGER,
+            vec BLOB,
+            last_used REAL,
+            PRIMARY KEY (model, hash)
+        );
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used);")
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS cache_stats (
+            model TEXT PRIMARY KEY,
+            hits INTEGER DEFAULT 0,
+            misses INTEGER DEFAULT 0,
+            encode_seconds REAL DEFAULT 0,
+            saved_seconds REAL DEFAULT 0
+        );
+        """)
+        self.conn.commit()
+
+        # Stats for this process
+        self.hits = 0
+        self.misses = 0
+        self.encode_seconds = 0.0
+        self.saved_seconds = 0.0
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def get_many(self, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        unique = list(dict.fromkeys(hashes))
+        for i in range(0, len(unique), 500):
+            batch = unique[i:i + 500]
+            marks = ",".join("?" * len(batch))
+            rows = self.conn.execute(
+                f"SELECT hash, vec FROM embeddings WHERE model = ? AND hash IN ({marks})",
+                [self.model_name, *batch],
+            ).fetchall()
+            for h, blob in rows:
+                found[h] = np.frombuffer(blob, dtype="float32")
+        if found:
+            now = time.time()
+            self.conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND hash = ?",
+                [(now, self.model_name, h) for h in found],
+            )
+        return found
+
+    def put_many(self, hashes: Sequence[str], vecs: np.ndarray) -> None:
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO embeddings(model, hash, dim, vec, last_used) VALUES (?, ?, ?, ?, ?)",
+            [
+                (self.model_name, h, int(v.shape[0]), np.ascontiguousarray(v, dtype="float32").tobytes(), now)
+                for h, v in zip(hashes, vecs)
+            ],
+        )
+
+    def evict(self) -> int:
+        """Drop least-recently-used vectors beyond max_entries (all models)."""
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        extra = count - self.max_entries
+        if extra <= 0:
+            return 0
+        self.conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN "
+            "(SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+            (extra,),
+        )
+        return extra
+
+    def encode(self, texts: List[str], encode_fn: EncodeFn) -> np.ndarray:
+        """
+        Embeddings for `texts`, calling encode_fn only on cache misses.
+        encode_fn must return normalized float32 vectors, one row per text.
+        """
+        hashes = [text_hash(t) for t in texts]
+        cached = self.get_many(hashes)
+
+        missing: Dict[str, str] = {}
+        for h, t in zip(hashes, texts):
+            if h not in cached and h not in missing:
+                missing[h] = t
+
+        run_encode_s = 0.0
+        if missing:
+            t0 = time.perf_counter()
+            vecs = np.asarray(encode_fn(list(missing.values())), dtype="float32")
+            run_encode_s = time.perf_counter() - t0
+            self.put_many(list(missing), vecs)
+            cached.update(zip(missing, vecs))
+
+        hits = len(texts) - len(missing)
+        per_text = self._seconds_per_text(run_encode_s, len(missing))
+        saved = hits * per_text
+
+        self.hits += hits
+        self.misses += len(missing)
+        self.encode_seconds += run_encode_s
+        self.saved_seconds += saved
+        self.conn.execute(
+            "INSERT INTO cache_stats(model, hits, misses, encode_seconds, saved_seconds) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(model) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses, "
+            "encode_seconds = encode_seconds + excluded.encode_seconds, "
+            "saved_seconds = saved_seconds + excluded.saved_seconds",
+            (self.model_name, hits, len(missing), run_encode_s, saved),
+        )
+        self.evict()
+        self.conn.commit()
+
+        if not texts:
+            return np.zeros((0, 0), dtype="float32")
+        return np.vstack([cached[h] for h in hashes]).astype("float32")
+
+    def _seconds_per_text(self, run_encode_s: float, n_encoded: int) -> float:
+        if n_encoded:
+            return run_encode_s / n_encoded
+        row = self.conn.execute(
+            "SELECT encode_seconds, misses FROM cache_stats WHERE model = ?", (self.model_name,)
+        ).fetchone()
+        return (row[0] / row[1]) if row and row[1] else 0.0
+
+    def stats(self) -> Dict:
+        """This run's counters plus cumulative totals for the model."""
+        total = self.hits + self.misses
+        (entries,) = self.conn.execute(
+            "SELECT COUNT(*) FROM embeddings WHERE model = ?", (self.model_name,)
+        ).fetchone()
+        row = self.conn.execute(
+            "SELECT hits, misses, encode_seconds, saved_seconds FROM cache_stats WHERE model = ?",
+            (self.model_name,),
+        ).fetchone() or (0, 0, 0.0, 0.0)
+        all_total = row[0] + row[1]
+        return {
+            "model": self.model_name,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "encode_seconds": self.encode_seconds,
+            "saved_seconds": self.saved_seconds,
+            "total_hits": row[0],
+            "total_misses": row[1],
+            "total_hit_rate": row[0] / all_total if all_total else 0.0,
+            "total_saved_seconds": row[3],
+        }
+
+    def format_stats(self) -> str:
+        s = self.stats()
+        return (
+            f"Embedding cache | hits: {s['hits']} | misses: {s['misses']} | "
+            f"hit rate: {s['hit_rate']:.1%} | encode: {s['encode_seconds']:.1f}s | "
+            f"saved: ~{s['saved_seconds']:.1f}s | entries: {s['entries']}/{s['max_entries']}"
+        )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from core.embed import EMBED_MODEL_NAME
+
+    ap = argparse.ArgumentParser(description="Embedding cache utilities.")
+    ap.add_argument("command", choices=["stats", "clear"])
+    ap.add_argument("--model", default=EMBED_MODEL_NAME)
+    args = ap.parse_args()
+
+    cache = EmbeddingCache(args.model)
+    if args.command == "clear":
+        cache.conn.execute("DELETE FROM embeddings WHERE model = ?", (args.model,))
+        cache.conn.execute("DELETE FROM cache_stats WHERE model = ?", (args.model,))
+        cache.conn.commit()
+        print(f"Cleared embedding cache for {args.model}")
+    else:
+        s = cache.stats()
+        print(
+            f"Model: {s['model']}\n"
+            f"Entries: {s['entries']} (max {s['max_entries']} across models)\n"
+            f"Lifetime hits: {s['total_hits']} | misses: {s['total_misses']} | "
+            f"hit rate: {s['total_hit_rate']:.1%} | time saved: ~{s['total_saved_seconds']:.1f}s"
+        )
+    cache.close()
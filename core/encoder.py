@@ -0,0 +1,234 @@
+"""
+Pluggable sentence encoders for all-MiniLM-L6-v2 (or another sentence-transformers
+model with mean pooling).
+
+    torch      SentenceTransformer, full precision (default)
+    onnx       ONNX Runtime export of the same transformer, fp32
+    onnx-int8  the export with int8 dynamically quantized weights
+
+The ONNX backends tokenize once, sort texts by token length and cut batches
+by a padded-token budget (short texts go in large batches, long texts in
+small ones), then mean-pool and L2-normalize like the sentence-transformers
+pipeline. Exports are cached under data/onnx/.
+
+Backend and threads come from RAGNROLL_ENCODER / RAGNROLL_ENCODER_THREADS
+unless passed explicitly. Check agreement and speed with
+`python -m eval.bench_encoder`.
+
+Run from the project root:
+    python -m core.encoder export --int8
+"""
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core import metrics
+
+BASE_DIR = Path(__file__).resolve().parents[1]  # project root
+ONNX_DIR = BASE_DIR / "data" / "onnx"
+
+EMBED_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+ENCODER_BACKENDS = ("torch", "onnx", "onnx-int8")
+ENCODER_BACKEND = os.environ.get("RAGNROLL_ENCODER", "torch")
+ENCODER_THREADS = int(os.environ.get("RAGNROLL_ENCODER_THREADS", "0")) or None  # None = library default
+
+MAX_SEQ_LENGTH = 256
+BATCH_TOKEN_BUDGET = 8192  # padded tokens per ONNX batch
+
+
+def cache_key(model_name: str, backend: str) -> str:
+    """Embedding-cache / manifest key: quantized vectors must not mix with fp32 ones."""
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+
+class TorchEncoder:
+    backend = "torch"
+
+    def __init__(self, model_name: str = EMBED_MODEL_NAME, threads: Optional[int] = None):
+        from sentence_transformers import SentenceTransformer
+
+        if threads:
+            import torch
+
+            torch.set_num_threads(threads)
+        with metrics.timer("encoder.load.torch"):
+            self.model = SentenceTransformer(model_name, device="cpu")
+        self.model_name = model_name
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str], batch_size: int = 32, show_progress_bar: bool = False) -> np.ndarray:
+        # SentenceTransformer already sorts each call by length before batching
+        return self.model.encode(
+            texts,
+            batch_size=batch_size,
+            show_progress_bar=show_progress_bar,
+            normalize_embeddings=True,
+        ).astype("float32")
+
+
+def _model_dir(model_name: str) -> Path:
+    return ONNX_DIR / model_name.replace("/", "__")
+
+
+def export_onnx(model_name: str = EMBED_MODEL_NAME, quantize: bool = False) -> Path:
+    """Export the transformer to ONNX (and optionally int8-quantize it); cached on disk."""
+    out_dir = _model_dir(model_name)
+    fp32 = out_dir / "model.onnx"
+    int8 = out_dir / "model-int8.onnx"
+
+    if not fp32.exists():
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        print(f"Exporting {model_name} to {fp32} ...")
+        out_dir.mkdir(parents=True, exist_ok=True)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModel.from_pretrained(model_name).eval()
+        sample = tokenizer(["an example sentence"], return_tensors="pt")
+        tmp = fp32.with_name(fp32.name + ".tmp")
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+                str(tmp),
+                input_names=["input_ids", "attention_mask", "token_type_ids"],
+                output_names=["last_hidden_state"],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "seq"},
+                    "attention_mask": {0: "batch", 1: "seq"},
+                    "token_type_ids": {0: "batch", 1: "seq"},
+                    "last_hidden_state": {0: "batch", 1: "seq"},
+                },
+                opset_version=14,
+            )
+        os.replace(tmp, fp32)
+        tokenizer.save_pretrained(out_dir)
+
+    if not quantize:
+        return fp32
+    if not int8.exists():
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        print(f"Quantizing {fp32.name} -> {int8.name} (int8 weights) ...")
+        tmp = int8.with_name(int8.name + ".tmp")
+        quantize_dynamic(str(fp32), str(tmp), weight_type=QuantType.QInt8)
+        os.replace(tmp, int8)
+    return int8
+
+
+class OnnxEncoder:
+    def __init__(
+        self,
+        model_name: str = EMBED_MODEL_NAME,
+        quantized: bool = False,
+        threads: Optional[int] = None,
+        token_budget: int = BATCH_TOKEN_BUDGET,
+    ):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.backend = "onnx-int8" if quantized else "onnx"
+        self.model_name = model_name
+        self.token_budget = token_budget
+        path = export_onnx(model_name, quantize=quantized)
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            opts.intra_op_num_threads = threads
+            opts.inter_op_num_threads = 1
+        with metrics.timer(f"encoder.load.{self.backend}"):
+            self.session = ort.InferenceSession(str(path), opts, providers=["CPUExecutionProvider"])
+            self.tokenizer = AutoTokenizer.from_pretrained(path.parent)
+        self._inputs = {i.name for i in self.session.get_inputs()}
+        self.dim = int(self.session.get_outputs()[0].shape[-1])
+
+    def _batches(self, lengths: np.ndarray, max_batch: int) -> List[np.ndarray]:
+        """Length-sorted index batches whose padded size stays under the token budget."""
+        order = np.argsort(lengths, kind="stable")
+        batches = []
+        start = 0
+        while start < len(order):
+            end = start + 1
+            # Sorted ascending, so the last item sets the padded length
+            while (
+                end < len(order)
+                and end - start < max_batch
+                and (end - start + 1) * lengths[order[end]] <= self.token_budget
+            ):
+                end += 1
+            batches.append(order[start:end])
+            start = end
+        return batches
+
+    def encode(self, texts: List[str], batch_size: int = 32, show_progress_bar: bool = False) -> np.ndarray:
+        """batch_size caps items per batch; the token budget usually decides first for long texts."""
+        out = np.zeros((len(texts), self.dim), dtype="float32")
+        if not texts:
+            return out
+        enc = self.tokenizer(list(texts), truncation=True, max_length=MAX_SEQ_LENGTH)
+        ids: List[List[int]] = enc["input_ids"]
+        lengths = np.asarray([len(x) for x in ids], dtype=np.int64)
+        # Items per batch: at least batch_size for short texts, more if the budget allows
+        max_batch = max(batch_size, self.token_budget // max(1, int(lengths.min())))
+
+        for batch in self._batches(lengths, max_batch):
+            width = int(lengths[batch].max())
+            input_ids = np.zeros((len(batch), width), dtype=np.int64)
+            mask = np.zeros((len(batch), width), dtype=np.int64)
+            for row, i in enumerate(batch):
+                input_ids[row, : lengths[i]] = ids[i]
+                mask[row, : lengths[i]] = 1
+            feeds = {"input_ids": input_ids, "attention_mask": mask}
+            if "token_type_ids" in self._inputs:
+                feeds["token_type_ids"] = np.zeros_like(input_ids)
+            hidden = self.session.run(None, feeds)[0]
+
+            # Mean pooling over real tokens, then L2 normalize (same as the ST pipeline)
+            m = mask[:, :, None].astype(np.float32)
+            pooled = (hidden * m).sum(axis=1) / np.clip(m.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            out[batch] = pooled
+        return out
+
+
+_encoders: Dict[Tuple[str, str, Optional[int]], object] = {}
+_encoders_lock = threading.Lock()
+
+
+def get_encoder(
+    backend: Optional[str] = None,
+    model_name: str = EMBED_MODEL_NAME,
+    threads: Optional[int] = None,
+):
+    """Process-wide encoder per (backend, model, threads)."""
+    backend = backend or ENCODER_BACKEND
+    threads = threads or ENCODER_THREADS
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend {backend!r}; expected one of {ENCODER_BACKENDS}")
+    key = (backend, model_name, threads)
+    enc = _encoders.get(key)
+    if enc is None:
+        with _encoders_lock:
+            enc = _encoders.get(key)
+            if enc is None:
+                if backend == "torch":
+                    enc = TorchEncoder(model_name, threads=threads)
+                else:
+                    enc = OnnxEncoder(model_name, quantized=backend == "onnx-int8", threads=threads)
+                _encoders[key] = enc
+    return enc
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Export the embedding model for the ONNX backends.")
+    ap.add_argument("cmd", choices=("export",))
+    ap.add_argument("--model", default=EMBED_MODEL_NAME)
+    ap.add_argument("--int8", action="store_true", help="also write the int8-quantized model")
+    args = ap.parse_args()
+    print(f"Saved {export_onnx(args.model, quantize=args.int8)}")
@@ -3,6 +3,8 @@ from __future__ import annotations
 import re
 from typing import Dict, List
 
+from core.keywords import keyword_set, query_terms
+
 
 def _keywords(text: str) -> List[str]:
     # keep simple, robust tokens
@@ -16,6 +18,10 @@ def precision_at_k(question: str, docs: List[Dict], k: int = 5) -> float:
     Lightweight Precision@K heuristic:
     A retrieved chunk is "relevant" if it contains ANY keyword from the question.
     This is not perfect, but it's a valid baseline for a class project.
+
+    Keywords are 3+ character tokens matched as substrings of the chunk
+    ("chip" matches "chipmaker"). Kept as-is so scores stay comparable with
+    earlier runs; see keyword_precision_at_k for whole-keyword matching.
     """
     keys = set(_keywords(question))
     if not keys:
@@ -29,3 +35,18 @@ def precision_at_k(question: str, docs: List[Dict], k: int = 5) -> float:
             rel += 1
 
     return rel / max(1, len(top))
+
+
+def keyword_precision_at_k(question: str, docs: List[Dict], k: int = 5) -> float:
+    """
+    Like precision_at_k, but with the shared keyword tokenizer (core.keywords)
+    that BM25 uses: whole keywords only, stopwords and intent words ("latest",
+    "news") ignored. "ai" no longer matches "said", and "AI" counts as a keyword.
+    """
+    keys = set(query_terms(question))
+    if not keys:
+        return 0.0
+
+    top = docs[:k]
+    rel = sum(1 for d in top if keys & keyword_set(d.get("text") or ""))
+    return rel / max(1, len(top))
@@ -1,8 +1,21 @@
+import itertools
+import os
 import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
 import feedparser
 import requests
+from requests.adapters import HTTPAdapter
 from trafilatura import extract
-from core.db import get_conn
+from core import archive, metrics
+from core.chunk import chunk_text
+from core.db import get_conn, published_ts
+from core.dedup import load_simhash_index, simhash, to_signed
 
 FEEDS = [
     "https://news.google.com/rss?hl=en-US&gl=US&ceid=US:en",
@@ -10,15 +23,380 @@ FEEDS = [
     "https://www.theverge.com/rss/index.xml",
 ]
 
+USER_AGENT = "RAGnRoll/1.0"
+REQUEST_TIMEOUT = 15
+
+MAX_WORKERS = 16        # concurrent downloads overall
+PER_HOST_LIMIT = 4      # concurrent downloads per host (be polite to publishers)
+EXTRACT_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+# Query params that only track the click and never change the article
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid",
+    "ocid", "cmpid", "smid", "smtyp", "partner", "ref", "ref_src", "taid",
+    "guccounter", "guce_referrer", "guce_referrer_sig", "_hsenc", "_hsmi",
+}
+GOOGLE_NEWS_HOST = "news.google.com"
+ALIAS_RETRY_S = 24 * 3600  # re-try links that could not be resolved after this long
+SQL_BATCH = 500  # stay well below SQLite's host-parameter limit
+
 def fetch_article_text(url: str) -> str:
     try:
-        r = requests.get(url, timeout=15, headers={"User-Agent": "RAGnRoll/1.0"})
+        r = requests.get(url, timeout=REQUEST_TIMEOUT, headers={"User-Agent": USER_AGENT})
         r.raise_for_status()
         text = extract(r.text)
         return text or ""
     except Exception:
         return ""
 
+# -----------------------------
+# CONCURRENT FETCHING
+# -----------------------------
+def make_session(pool_size: int = MAX_WORKERS) -> requests.Session:
+    """Pooled keep-alive session shared by all download workers."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+class HostLimiter:
+    """Caps the number of in-flight requests per host."""
+
+    def __init__(self, per_host: int = PER_HOST_LIMIT):
+        self.per_host = per_host
+        self._lock = threading.Lock()
+        self._sems: Dict[str, threading.Semaphore] = {}
+
+    @contextmanager
+    def slot(self, url: str):
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            sem = self._sems.setdefault(host, threading.Semaphore(self.per_host))
+        with sem:
+            yield
+
+
+def conditional_get(
+    session: requests.Session,
+    url: str,
+    validators: Optional[Tuple[Optional[str], Optional[str]]] = None,
+    limiter: Optional[HostLimiter] = None,
+) -> Dict:
+    """
+    GET with If-None-Match / If-Modified-Since when validators are known.
+    Returns {"url", "status", "body", "etag", "last_modified"}; status 0 on error.
+    """
+    headers = {}
+    if validators:
+        etag, last_modified = validators
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+    res = {"url": url, "status": 0, "body": "", "etag": None, "last_modified": None}
+    t0 = time.perf_counter()
+    try:
+        if limiter is None:
+            r = session.get(url, timeout=REQUEST_TIMEOUT, headers=headers)
+        else:
+            with limiter.slot(url):
+                r = session.get(url, timeout=REQUEST_TIMEOUT, headers=headers)
+        res["status"] = r.status_code
+        if r.status_code == 304:
+            return res
+        r.raise_for_status()
+        res["body"] = r.text
+        res["etag"] = r.headers.get("ETag")
+        res["last_modified"] = r.headers.get("Last-Modified")
+    except Exception:
+        res["status"] = 0
+    metrics.observe("ingest.http_get", time.perf_counter() - t0)
+    metrics.incr(f"ingest.http_status.{res['status']}")
+    return res
+
+
+def download(session: requests.Session, url: str, limiter: Optional[HostLimiter] = None) -> str:
+    return conditional_get(session, url, limiter=limiter)["body"]
+
+
+def extract_clean(html: str) -> str:
+    """trafilatura extraction + cleaning. Top-level so it can run in a process pool."""
+    if not html:
+        return ""
+    try:
+        return clean_text(extract(html) or "")
+    except Exception:
+        return ""
+
+
+def fetch_iter(
+    urls: List[str],
+    validators: Optional[Dict[str, Tuple[Optional[str], Optional[str]]]] = None,
+    max_workers: int = MAX_WORKERS,
+    per_host: int = PER_HOST_LIMIT,
+    extract_workers: int = EXTRACT_WORKERS,
+    session: Optional[requests.Session] = None,
+    max_pending: Optional[int] = None,
+    archive_raw: bool = archive.ARCHIVE_RAW,
+) -> Iterator[Tuple[int, Dict]]:
+    """
+    Download + extract many URLs concurrently, yielding (position in `urls`,
+    result) as each one finishes. Downloads run on a bounded thread pool;
+    extraction runs on a process pool so trafilatura's CPU work doesn't hold
+    the GIL. At most max_pending (default 2 * max_workers) URLs are in flight,
+    so a slow consumer slows the downloads down instead of piling up pages.
+
+    Each result is a conditional_get() result with the raw body replaced by
+    the cleaned "text" ("" on failure/304). With archive_raw, bodies are also
+    saved to core.archive; index them with archive.record().
+    """
+    if not urls:
+        return
+
+    session = session or make_session(max_workers)
+    limiter = HostLimiter(per_host)
+    validators = validators or {}
+    max_pending = max_pending or 2 * max_workers
+
+    extract_pool: Executor
+    if extract_workers > 1:
+        extract_pool = ProcessPoolExecutor(max_workers=extract_workers)
+    else:
+        extract_pool = ThreadPoolExecutor(max_workers=1)
+
+    def work(url: str) -> Tuple[Dict, Optional[Future]]:
+        # Extraction is handed back as a future so this download thread is free
+        # for the next URL while the page is being parsed.
+        res = conditional_get(session, url, validators.get(url), limiter)
+        html = res.pop("body")
+        if html and archive_raw:
+            res["sha256"] = archive.put(html)
+            res["fetched_at"] = time.time()
+            res["size"] = len(html.encode("utf-8"))
+        res["text"] = ""
+        return res, extract_pool.submit(extract_clean, html) if html else None
+
+    with extract_pool, ThreadPoolExecutor(max_workers=max_workers) as pool:
+        todo = iter(enumerate(urls))
+        downloads: Dict[Future, int] = {}
+        extracts: Dict[Future, Tuple[int, Dict]] = {}
+        for i, url in itertools.islice(todo, max_pending):
+            downloads[pool.submit(work, url)] = i
+        while downloads or extracts:
+            done, _ = wait([*downloads, *extracts], return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut in downloads:
+                    i = downloads.pop(fut)
+                    res, extract = fut.result()
+                    if extract is not None:
+                        extracts[extract] = (i, res)  # still counts towards max_pending
+                        continue
+                else:
+                    i, res = extracts.pop(fut)
+                    res["text"] = fut.result()
+                yield i, res
+                for j, url in itertools.islice(todo, 1):
+                    downloads[pool.submit(work, url)] = j
+
+
+def fetch_all(
+    urls: List[str],
+    validators: Optional[Dict[str, Tuple[Optional[str], Optional[str]]]] = None,
+    max_workers: int = MAX_WORKERS,
+    per_host: int = PER_HOST_LIMIT,
+    extract_workers: int = EXTRACT_WORKERS,
+    session: Optional[requests.Session] = None,
+    archive_raw: bool = archive.ARCHIVE_RAW,
+) -> List[Dict]:
+    """fetch_iter() collected into a list in `urls` order."""
+    results: List[Dict] = [{} for _ in urls]
+    for i, res in fetch_iter(
+        urls, validators, max_workers, per_host, extract_workers, session, archive_raw=archive_raw
+    ):
+        results[i] = res
+    return results
+
+
+def fetch_many(
+    urls: List[str],
+    max_workers: int = MAX_WORKERS,
+    per_host: int = PER_HOST_LIMIT,
+    extract_workers: int = EXTRACT_WORKERS,
+    session: Optional[requests.Session] = None,
+) -> List[str]:
+    """Like fetch_all() but returns only the cleaned texts, in `urls` order."""
+    results = fetch_all(
+        urls,
+        max_workers=max_workers,
+        per_host=per_host,
+        extract_workers=extract_workers,
+        session=session,
+        archive_raw=False,  # nothing records them
+    )
+    return [r["text"] for r in results]
+
+# -----------------------------
+# URL CANONICALIZATION + DEDUP
+# -----------------------------
+def canonicalize_url(url: str) -> str:
+    """
+    Normalize a link so the same article maps to one URL: lowercase scheme/host,
+    drop fragments, default ports, tracking params (utm_*, fbclid, ...) and
+    unwrap google.com/url?q=... style redirects.
+    """
+    url = (url or "").strip()
+    parts = urlsplit(url)
+    if not parts.scheme or not parts.netloc:
+        return url
+
+    host = parts.netloc.lower()
+    query = parse_qsl(parts.query, keep_blank_values=True)
+
+    # https://www.google.com/url?q=<target>&... -> <target>
+    if host.endswith("google.com") and parts.path == "/url":
+        for key, value in query:
+            if key in ("q", "url") and value.startswith("http"):
+                return canonicalize_url(value)
+
+    scheme = parts.scheme.lower()
+    if (scheme == "http" and host.endswith(":80")) or (scheme == "https" and host.endswith(":443")):
+        host = host.rsplit(":", 1)[0]
+
+    kept = sorted(
+        (k, v) for k, v in query
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    )
+    path = parts.path or "/"
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/")
+
+    return urlunsplit((scheme, host, path, urlencode(kept), ""))
+
+
+def is_google_news_link(url: str) -> bool:
+    return urlsplit(url).netloc.lower() == GOOGLE_NEWS_HOST and "/articles/" in urlsplit(url).path
+
+
+def resolve_redirect(session: requests.Session, url: str) -> str:
+    """Follow HTTP redirects (e.g. Google News article links) without downloading bodies."""
+    try:
+        r = session.head(url, allow_redirects=True, timeout=REQUEST_TIMEOUT)
+        final = r.url or url
+        if urlsplit(final).netloc.lower() != GOOGLE_NEWS_HOST:
+            return canonicalize_url(final)
+    except Exception:
+        pass
+    return canonicalize_url(url)
+
+
+def _batched(items: List[str], size: int = SQL_BATCH) -> Iterable[List[str]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def known_urls(conn, urls: Iterable[str]) -> Set[str]:
+    """Batch-query which of `urls` are already stored (as articles or collapsed duplicates)."""
+    urls = list(dict.fromkeys(urls))
+    found: Set[str] = set()
+    for batch in _batched(urls):
+        marks = ",".join("?" * len(batch))
+        for table in ("articles", "article_links"):
+            found.update(
+                row[0] for row in conn.execute(f"SELECT url FROM {table} WHERE url IN ({marks})", batch)
+            )
+    return found
+
+
+def load_aliases(conn, links: Iterable[str], retry_s: float = ALIAS_RETRY_S) -> Dict[str, str]:
+    """Known link -> URL mappings; failed lookups count as known until retry_s has passed."""
+    links = list(dict.fromkeys(links))
+    expired = time.time() - retry_s
+    aliases: Dict[str, str] = {}
+    for batch in _batched(links):
+        marks = ",".join("?" * len(batch))
+        for alias, url, checked_at in conn.execute(
+            f"SELECT alias, url, checked_at FROM url_aliases WHERE alias IN ({marks})", batch
+        ):
+            if url == canonicalize_url(alias) and (checked_at or 0) < expired:
+                continue  # unresolved last time; try again
+            aliases[alias] = url
+    return aliases
+
+
+def load_validators(conn, urls: Iterable[str]) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+    urls = list(dict.fromkeys(urls))
+    out: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+    for batch in _batched(urls):
+        marks = ",".join("?" * len(batch))
+        for url, etag, lm in conn.execute(
+            f"SELECT url, etag, last_modified FROM http_cache WHERE url IN ({marks})", batch
+        ):
+            out[url] = (etag, lm)
+    return out
+
+
+def save_validators(conn, results: Iterable[Dict]) -> None:
+    rows = [
+        (r["url"], r["etag"], r["last_modified"])
+        for r in results
+        if r.get("etag") or r.get("last_modified")
+    ]
+    conn.executemany(
+        "INSERT OR REPLACE INTO http_cache(url, etag, last_modified, checked_at) "
+        "VALUES (?, ?, ?, CURRENT_TIMESTAMP)",
+        rows,
+    )
+
+
+def dedup_entries(
+    conn,
+    entries: List[Dict],
+    session: requests.Session,
+    max_workers: int = MAX_WORKERS,
+) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Canonicalize entry URLs (resolving Google News links) and split them into
+    (new, already_ingested) before anything is downloaded. Duplicates within the
+    batch keep their first occurrence.
+    """
+    links = [e["url"] for e in entries]
+    aliases = load_aliases(conn, links)
+
+    unresolved = [u for u in dict.fromkeys(links) if is_google_news_link(u) and u not in aliases]
+    if unresolved:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            resolved = list(pool.map(lambda u: resolve_redirect(session, u), unresolved))
+        # Failed lookups are stored too (mapping to the link itself), so the
+        # same links aren't HEAD-requested on every refresh
+        new_aliases = dict(zip(unresolved, resolved))
+        now = int(time.time())
+        conn.executemany(
+            "INSERT OR REPLACE INTO url_aliases(alias, url, checked_at) VALUES (?, ?, ?)",
+            [(a, u, now) for a, u in new_aliases.items()],
+        )
+        aliases.update(new_aliases)
+
+    for e in entries:
+        e["link"] = e["url"]
+        e["url"] = aliases.get(e["url"]) or canonicalize_url(e["url"])
+
+    # Older rows stored the raw feed link, so check both forms
+    existing = known_urls(conn, [e["url"] for e in entries] + links)
+
+    fresh, seen = [], []
+    batch_urls: Set[str] = set()
+    for e in entries:
+        if e["url"] in existing or e["link"] in existing:
+            seen.append(e)
+        elif e["url"] not in batch_urls:
+            batch_urls.add(e["url"])
+            fresh.append(e)
+    return fresh, seen
+
 def clean_text(text: str) -> str:
     """Remove common site boilerplate / junk lines to improve embeddings + snippets."""
     if not text:
@@ -62,40 +440,216 @@ def clean_text(text: str) -> str:
 
     return "\n".join(cleaned_lines)
 
-def ingest(limit_per_feed: int = 20) -> int:
-    conn = get_conn()
-    cur = conn.cursor()
-    inserted = 0
+def collect_entries(
+    limit_per_feed: int = 20,
+    session: Optional[requests.Session] = None,
+    conn=None,
+) -> List[Dict]:
+    """
+    Fetch all feeds concurrently and return their entries in FEEDS order.
+    With `conn`, feeds are fetched with conditional GETs and unchanged feeds
+    (304 Not Modified) contribute no entries.
+    """
+    session = session or make_session()
+    validators = load_validators(conn, FEEDS) if conn is not None else {}
 
-    for feed_url in FEEDS:
-        feed = feedparser.parse(feed_url)
-        source = feed.feed.get("title", "Unknown Source")
+    with ThreadPoolExecutor(max_workers=len(FEEDS)) as pool:
+        results = list(pool.map(lambda u: conditional_get(session, u, validators.get(u)), FEEDS))
 
+    if conn is not None:
+        save_validators(conn, results)
+
+    entries = []
+    for res in results:
+        if res["status"] == 304:
+            print(f"Feed not modified: {res['url']}")
+            continue
+        if not res["body"]:
+            continue
+        feed = feedparser.parse(res["body"])
+        source = feed.feed.get("title", "Unknown Source")
         for entry in feed.entries[:limit_per_feed]:
             url = entry.get("link")
-            title = entry.get("title", "")
-            published = entry.get("published", "") or entry.get("updated", "")
-
             if not url:
                 continue
+            entries.append({
+                "url": url,
+                "title": entry.get("title", ""),
+                "source": source,
+                "published": entry.get("published", "") or entry.get("updated", ""),
+            })
+    return entries
 
-            text = clean_text(fetch_article_text(url))  # ✅ CLEANING ADDED
 
-            # skip if extraction failed / too short
-            if len(text) < 400:
-                continue
+MIN_TEXT_CHARS = 400  # shorter extractions are navigation pages / paywalls / failures
 
-            cur.execute(
-                "INSERT OR IGNORE INTO articles(url, title, source, published, text) VALUES (?, ?, ?, ?, ?)",
-                (url, title, source, published, text),
-            )
-            if cur.rowcount > 0:
-                inserted += 1
 
-    conn.commit()
-    conn.close()
-    return inserted
+class ArticleWriter:
+    """
+    Buffers new articles, near-duplicate links and text updates and writes them
+    in one transaction per flush(). New articles get explicit ids as they are
+    added, so near-duplicates later in the same flush can point at them; a
+    new article whose SimHash matches a recent one becomes a source link.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.near_dups = None
+        self.next_id = 0
+        self.collapsed_chunks = 0  # chunks that were never stored thanks to collapsing
+        self.totals = {"inserted": 0, "collapsed": 0, "updated": 0}
+        self._new_rows: List[Tuple] = []
+        self._text_rows: List[Tuple] = []
+        self._link_rows: List[Tuple] = []
+        self._text_updates: List[Tuple] = []
+        self._hash_updates: List[Tuple] = []
+        self._batch_urls: Set[str] = set()
+        self._in_tx = False
+
+    def begin(self) -> None:
+        self.conn.commit()
+        self.conn.execute("BEGIN IMMEDIATE")
+        self._in_tx = True
+        if self.near_dups is None:
+            self.near_dups = load_simhash_index(self.conn)
+        (self.next_id,) = self.conn.execute(
+            "SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'articles'), 0), "
+            "COALESCE((SELECT MAX(id) FROM articles), 0)) + 1"
+        ).fetchone()
+
+    def add_new(self, e: Dict, text: str) -> Optional[int]:
+        """Queue a new article; returns its id, or None if skipped / collapsed into a link."""
+        if not self._in_tx:
+            self.begin()
+        if len(text) < MIN_TEXT_CHARS or e["url"] in self._batch_urls:
+            return None
+        self._batch_urls.add(e["url"])
+        sig = simhash(text)
+        canonical = self.near_dups.match(sig)
+        if canonical is not None:
+            self._link_rows.append((canonical, e["url"], e["title"], e["source"], e["published"]))
+            self.collapsed_chunks += len(chunk_text(text))
+            return None
+        aid = self.next_id
+        self.next_id += 1
+        self._new_rows.append((
+            aid, e["url"], e["title"], e["source"], e["published"],
+            to_signed(sig), published_ts(e["published"]),
+        ))
+        self._text_rows.append((aid, text, aid))
+        self.near_dups.add(aid, sig)
+        return aid
+
+    def add_update(self, e: Dict, text: str) -> None:
+        """Queue a re-fetched text for an already ingested article."""
+        if not self._in_tx:
+            self.begin()
+        if len(text) < MIN_TEXT_CHARS:
+            return
+        self._text_updates.append((text, e["url"], e["link"], text))
+        self._hash_updates.append((to_signed(simhash(text)), e["url"], e["link"]))
+
+    def flush(self) -> Dict[str, int]:
+        """Write everything queued and commit; returns this flush's counts."""
+        if not self._in_tx:
+            return {"inserted": 0, "collapsed": 0, "updated": 0}
+        conn = self.conn
+        counts = {
+            "inserted": conn.executemany(
+                "INSERT OR IGNORE INTO articles(id, url, title, source, published, simhash, published_ts) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                self._new_rows,
+            ).rowcount,
+        }
+        conn.executemany(
+            "INSERT INTO article_texts(article_id, text) SELECT ?, ? WHERE EXISTS (SELECT 1 FROM articles WHERE id = ?)",
+            self._text_rows,
+        )
+        counts["collapsed"] = conn.executemany(
+            "INSERT OR IGNORE INTO article_links(article_id, url, title, source, published) VALUES (?, ?, ?, ?, ?)",
+            self._link_rows,
+        ).rowcount
+        counts["updated"] = conn.executemany(
+            "UPDATE article_texts SET text = ? "
+            "WHERE article_id IN (SELECT id FROM articles WHERE url IN (?, ?)) AND text IS NOT ?",
+            self._text_updates,
+        ).rowcount
+        conn.executemany("UPDATE articles SET simhash = ? WHERE url IN (?, ?)", self._hash_updates)
+        conn.commit()
+        self._in_tx = False
+        for rows in (self._new_rows, self._text_rows, self._link_rows, self._text_updates, self._hash_updates):
+            rows.clear()
+        for k, v in counts.items():
+            self.totals[k] += v
+        return counts
+
+
+def ingest(limit_per_feed: int = 20, max_workers: int = MAX_WORKERS, revalidate: bool = False) -> int:
+    """
+    Fetch new articles into SQLite. Already-ingested URLs are skipped before
+    download; with revalidate=True they are re-fetched with conditional GETs
+    instead and updated if their text changed. A new article whose SimHash
+    matches a recent one is stored as an extra source link of that article
+    instead of a second copy.
+    """
+    t0 = time.perf_counter()
+    session = make_session(max_workers)
+    conn = get_conn()
+
+    with metrics.timer("ingest.feeds"):
+        entries = collect_entries(limit_per_feed, session=session, conn=conn)
+    with metrics.timer("ingest.dedup_urls"):
+        fresh, seen = dedup_entries(conn, entries, session, max_workers=max_workers)
+    todo = fresh + (seen if revalidate else [])
+
+    urls = [e["url"] for e in todo]
+    with metrics.timer("ingest.fetch_all"):
+        results = fetch_all(
+            urls,
+            validators=load_validators(conn, urls),
+            max_workers=max_workers,
+            session=session,
+        )
+    save_validators(conn, results)
+    archive.record(conn, results, todo)
+    t_write = time.perf_counter()
+
+    # One write transaction for the whole run, in feed order (so ids stay
+    # stable regardless of download timing)
+    writer = ArticleWriter(conn)
+    writer.begin()
+    for i, (e, res) in enumerate(zip(todo, results)):
+        if i < len(fresh):
+            writer.add_new(e, res["text"])
+        else:
+            writer.add_update(e, res["text"])
+    counts = writer.flush()
+
+    metrics.observe("ingest.db_write", time.perf_counter() - t_write)
+    metrics.incr("ingest.entries", len(entries))
+    metrics.incr("ingest.inserted", counts["inserted"])
+    metrics.incr("ingest.updated", counts["updated"])
+    metrics.incr("ingest.collapsed", counts["collapsed"])
+    metrics.observe("ingest.total", time.perf_counter() - t0)
+    metrics.dump("ingest")
+    print(
+        f"Entries: {len(entries)} | already ingested: {len(seen)} | "
+        f"downloaded: {len(todo)} | updated: {counts['updated']} | {time.perf_counter() - t0:.1f}s"
+    )
+    if counts["collapsed"]:
+        print(
+            f"Near-duplicates collapsed into source links: {counts['collapsed']} "
+            f"(~{writer.collapsed_chunks} chunks not embedded)"
+        )
+    return counts["inserted"]
 
 if __name__ == "__main__":
-    n = ingest(limit_per_feed=20)
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Fetch new articles from FEEDS into SQLite.")
+    ap.add_argument("--limit-per-feed", type=int, default=20)
+    ap.add_argument("--revalidate", action="store_true", help="conditionally re-fetch known articles")
+    args = ap.parse_args()
+
+    n = ingest(limit_per_feed=args.limit_per_feed, revalidate=args.revalidate)
     print(f"RAGnRoll ingestion complete. Inserted {n} new articles.")
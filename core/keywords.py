@@ -0,0 +1,57 @@
+"""
+The one keyword tokenizer: lowercase alphanumeric runs of 2+ characters,
+minus stopwords. BM25 indexing and querying (core.bm25), the keyword
+precision check (core.eval) and the app's relevance@k all use it, so a word
+that counts as a match in one place counts everywhere.
+
+Words that say what kind of answer is wanted ("latest news today") rather
+than what it is about are not stopwords: they stay in the index, so an
+article about "news" or a "new" chip is still found by them. They are only
+dropped from queries (query_terms) and drive freshness detection.
+"""
+import re
+from typing import List, Set
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from", "has", "have",
+    "he", "her", "his", "how", "i", "in", "is", "it", "its", "of", "on", "or", "she",
+    "that", "the", "their", "them", "they", "this", "to", "was", "we", "were", "what",
+    "when", "where", "which", "who", "why", "will", "with", "you", "your", "about",
+    "after", "all", "also", "been", "can", "did", "do", "does", "had", "into", "more",
+    "not", "now", "our", "out", "over", "said", "says", "so", "than", "there",
+    "these", "up", "would",
+}
+
+# "today / latest" questions: restrict retrieval to recent articles (core.rag)
+FRESHNESS_WORDS = {"today", "latest", "current", "currently", "recent", "recently", "breaking"}
+FRESHNESS_PHRASES = ("right now", "this week")
+
+# Dropped from keyword queries, kept in the index
+INTENT_WORDS = FRESHNESS_WORDS | {"news", "new", "happening", "us"}
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Keyword tokens in order (repeats kept, for term frequencies)."""
+    return [t for t in _TOKEN.findall((text or "").lower()) if len(t) >= 2 and t not in STOPWORDS]
+
+
+def keyword_set(text: str) -> Set[str]:
+    return set(tokenize(text))
+
+
+def query_terms(query: str) -> List[str]:
+    """
+    Keyword tokens of a question with intent words removed ("latest news on
+    AI chips" -> ["ai", "chips"]). A question made only of intent words keeps
+    them, so it still matches something.
+    """
+    tokens = tokenize(query)
+    return [t for t in tokens if t not in INTENT_WORDS] or tokens
+
+
+def is_fresh_query(query: str) -> bool:
+    """Does the question ask for recent news ("today", "latest", "this week", ...)?"""
+    text = " ".join(_TOKEN.findall((query or "").lower()))
+    return bool(FRESHNESS_WORDS.intersection(text.split())) or any(f" {p} " in f" {text} " for p in FRESHNESS_PHRASES)
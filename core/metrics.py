@@ -0,0 +1,216 @@
+"""
+Lightweight in-process metrics: stage timings, counters, gauges and memory.
+
+    from core import metrics
+
+    with metrics.timer("retrieve.encode"):
+        ...
+    metrics.observe("llm.ttft", seconds)
+    metrics.incr("answer_cache.hit")
+
+snapshot() returns a JSON-able dict (count / mean / p50 / p95 / p99 / max per
+stage, over the last RESERVOIR_SIZE observations); prometheus_text() renders
+the same data in the Prometheus text exposition format. Batch jobs
+(core.embed, core.ingest) dump a snapshot to data/metrics/<job>.json when
+they finish.
+
+Run from the project root:
+    python -m core.metrics            # last embed / ingest runs
+"""
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Deque, Dict, Iterator, Optional
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parents[1]  # project root
+METRICS_DIR = BASE_DIR / "data" / "metrics"
+RESERVOIR_SIZE = 1024  # recent observations kept per stage for percentiles
+PREFIX = "ragnroll"
+
+
+class _Stage:
+    __slots__ = ("count", "total", "max", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent: Deque[float] = deque(maxlen=RESERVOIR_SIZE)
+
+
+_lock = threading.Lock()
+_stages: Dict[str, _Stage] = {}
+_counters: Dict[str, float] = {}
+_gauges: Dict[str, float] = {}
+_started = time.time()
+
+
+def observe(stage: str, seconds: float) -> None:
+    with _lock:
+        s = _stages.get(stage)
+        if s is None:
+            s = _stages[stage] = _Stage()
+        s.count += 1
+        s.total += seconds
+        s.max = max(s.max, seconds)
+        s.recent.append(seconds)
+
+
+@contextmanager
+def timer(stage: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - t0)
+
+
+def incr(name: str, value: float = 1.0) -> None:
+    with _lock:
+        _counters[name] = _counters.get(name, 0.0) + value
+
+
+def set_gauge(name: str, value: float) -> None:
+    with _lock:
+        _gauges[name] = float(value)
+
+
+def reset() -> None:
+    global _started
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+        _gauges.clear()
+        _started = time.time()
+
+
+def memory_rss_bytes() -> Optional[int]:
+    """Current resident set size (peak RSS where only that is available)."""
+    try:
+        import psutil  # optional
+
+        return int(psutil.Process().memory_info().rss)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        import sys
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return int(peak if sys.platform == "darwin" else peak * 1024)
+    except ImportError:
+        return None
+
+
+def snapshot() -> Dict:
+    with _lock:
+        stages = {}
+        for name, s in sorted(_stages.items()):
+            recent = np.asarray(s.recent, dtype=np.float64)
+            p50, p95, p99 = np.percentile(recent, [50, 95, 99]) if len(recent) else (0.0, 0.0, 0.0)
+            stages[name] = {
+                "count": s.count,
+                "sum_s": s.total,
+                "mean_s": s.total / s.count if s.count else 0.0,
+                "p50_s": float(p50),
+                "p95_s": float(p95),
+                "p99_s": float(p99),
+                "max_s": s.max,
+            }
+        counters = dict(sorted(_counters.items()))
+        gauges = dict(sorted(_gauges.items()))
+    return {
+        "started": _started,
+        "uptime_s": time.time() - _started,
+        "memory_rss_bytes": memory_rss_bytes(),
+        "stages": stages,
+        "counters": counters,
+        "gauges": gauges,
+    }
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(snap: Optional[Dict] = None) -> str:
+    snap = snap or snapshot()
+    lines = [
+        f"# TYPE {PREFIX}_stage_seconds summary",
+    ]
+    for stage, s in snap["stages"].items():
+        label = f'stage="{_label_value(stage)}"'
+        for q in ("50", "95", "99"):
+            lines.append(f'{PREFIX}_stage_seconds{{{label},quantile="0.{q}"}} {s[f"p{q}_s"]:.6f}')
+        lines.append(f"{PREFIX}_stage_seconds_sum{{{label}}} {s['sum_s']:.6f}")
+        lines.append(f"{PREFIX}_stage_seconds_count{{{label}}} {s['count']}")
+    for name, value in snap["counters"].items():
+        metric = f"{PREFIX}_{_metric_name(name)}_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {value:g}"]
+    for name, value in snap["gauges"].items():
+        metric = f"{PREFIX}_{_metric_name(name)}"
+        lines += [f"# TYPE {metric} gauge", f"{metric} {value:g}"]
+    if snap.get("memory_rss_bytes") is not None:
+        lines += [f"# TYPE {PREFIX}_memory_rss_bytes gauge", f"{PREFIX}_memory_rss_bytes {snap['memory_rss_bytes']}"]
+    lines += [f"# TYPE {PREFIX}_uptime_seconds gauge", f"{PREFIX}_uptime_seconds {snap['uptime_s']:.1f}"]
+    return "\n".join(lines) + "\n"
+
+
+def dump(job: str, path: Optional[Path] = None) -> Path:
+    """Write this process's snapshot to data/metrics/<job>.json (for batch jobs)."""
+    path = Path(path) if path else METRICS_DIR / f"{job}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    snap = snapshot()
+    snap["job"] = job
+    snap["finished"] = time.time()
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(snap, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+def load_dump(job: str) -> Optional[Dict]:
+    path = METRICS_DIR / f"{job}.json"
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def format_stages(snap: Dict) -> str:
+    lines = [f"{'stage':<28}{'count':>7}{'total s':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}"]
+    for name, s in snap["stages"].items():
+        lines.append(
+            f"{name:<28}{s['count']:>7}{s['sum_s']:>10.2f}{s['p50_s'] * 1000:>10.1f}"
+            f"{s['p95_s'] * 1000:>10.1f}{s['max_s'] * 1000:>10.1f}"
+        )
+    for name, value in snap["counters"].items():
+        lines.append(f"{name:<28}{value:>7g}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    for job in ("ingest", "embed"):
+        snap = load_dump(job)
+        if snap is None:
+            print(f"No metrics for {job} yet ({METRICS_DIR / (job + '.json')})")
+            continue
+        mem = snap.get("memory_rss_bytes") or 0
+        print(f"\n{job} | finished {time.ctime(snap['finished'])} | RSS {mem / 2**20:.0f} MiB")
+        print(format_stages(snap))
@@ -0,0 +1,307 @@
+"""
+Streaming refresh: ingest -> chunk + embed -> index, with the stages overlapped.
+
+`core.ingest` followed by `core.embed --incremental` leaves the CPU idle while
+pages download and the network idle while chunks are encoded. Here the stages
+run in their own threads, connected by bounded queues:
+
+    fetch   (this thread)   feeds -> fetch_iter(): download + clean_text()
+      | store_q
+    store   (thread)        ArticleWriter: SimHash collapse, SQLite write per batch
+      | embed_q
+    embed   (thread)        chunk_articles() + batched encoding into the embedding
+                            cache; every publish_every seconds (and at the end)
+                            an incremental build_index() publishes a snapshot
+
+A full queue blocks the stage feeding it (and fetch_iter() keeps only a fixed
+window of downloads in flight), so memory stays bounded when the encoder falls
+behind. The snapshot builds re-chunk the new articles and find every vector in
+the embedding cache, so publishing only costs the index/BM25/chunkstore write,
+and they reuse build_index()'s manifest, retention and chunk dedup unchanged.
+
+Run from the project root:
+    python -m core.pipeline --limit-per-feed 20 --publish-every 60
+"""
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+from core import archive, metrics
+from core.ann import INDEX_TYPES
+from core.db import get_conn
+from core.embed import CHUNKERS, EMBED_MAX_TOKENS, EMBED_MODEL_NAME, build_index, chunk_articles
+from core.embed_cache import EmbeddingCache
+from core.encoder import ENCODER_BACKEND, ENCODER_BACKENDS, cache_key, get_encoder
+from core.ingest import (
+    MAX_WORKERS,
+    MIN_TEXT_CHARS,
+    ArticleWriter,
+    collect_entries,
+    dedup_entries,
+    fetch_iter,
+    load_validators,
+    make_session,
+    save_validators,
+)
+
+QUEUE_SIZE = 64          # articles buffered between stages before the producer blocks
+STORE_BATCH = 16         # articles per SQLite transaction (at most)
+EMBED_BATCH = 8          # articles chunked + encoded together (at most)
+PUBLISH_EVERY_S = 60.0   # publish a snapshot at most this often; 0 = only at the end
+
+_DONE = object()  # end-of-stream marker
+
+
+def _put(q: "queue.Queue", item, failed: threading.Event) -> bool:
+    """Blocking put that gives up (False) once another stage has failed."""
+    while not failed.is_set():
+        try:
+            q.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _take(q: "queue.Queue", limit: int, failed: threading.Event) -> List:
+    """Wait for one item, then drain whatever else is ready (up to limit)."""
+    items: List = []
+    while not items:
+        if failed.is_set():
+            return [_DONE]
+        try:
+            items.append(q.get(timeout=0.5))
+        except queue.Empty:
+            continue
+    while len(items) < limit and items[-1] is not _DONE:
+        try:
+            items.append(q.get_nowait())
+        except queue.Empty:
+            break
+    return items
+
+
+class _Stage(threading.Thread):
+    """Daemon thread that records its exception and busy time, and signals `failed`."""
+
+    def __init__(self, name: str, target, failed: threading.Event):
+        super().__init__(name=f"ragnroll-{name}", daemon=True)
+        self._target_fn = target
+        self.failed = failed
+        self.error: Optional[BaseException] = None
+        self.busy_s = 0.0
+
+    def run(self) -> None:
+        try:
+            self._target_fn(self)
+        except BaseException as e:
+            self.error = e
+            self.failed.set()
+
+
+def run_pipeline(
+    limit_per_feed: int = 20,
+    max_workers: int = MAX_WORKERS,
+    revalidate: bool = False,
+    article_limit: int = 200,
+    publish_every: float = PUBLISH_EVERY_S,
+    chunker: str = "tokens",
+    max_tokens: int = EMBED_MAX_TOKENS,
+    encoder: str = ENCODER_BACKEND,
+    index_type: str = "auto",
+) -> Dict:
+    """
+    Fetch, store, embed and publish in one overlapped run; returns stage
+    timings and counts. Arguments mirror core.ingest.ingest() and
+    core.embed.build_index().
+    """
+    t0 = time.perf_counter()
+    failed = threading.Event()
+    store_q: "queue.Queue" = queue.Queue(maxsize=QUEUE_SIZE)
+    embed_q: "queue.Queue" = queue.Queue(maxsize=QUEUE_SIZE)
+    stats: Dict = {
+        "downloaded": 0, "inserted": 0, "updated": 0, "collapsed": 0,
+        "chunks": 0, "publishes": 0, "max_store_q": 0, "max_embed_q": 0,
+    }
+
+    # -----------------------------
+    # store: SQLite writes, one transaction per batch
+    # -----------------------------
+    def store(stage: _Stage) -> None:
+        conn = get_conn()  # thread-local connection
+        writer = ArticleWriter(conn)
+        done = False
+        while not done:
+            items = _take(store_q, STORE_BATCH, failed)
+            stats["max_store_q"] = max(stats["max_store_q"], store_q.qsize() + len(items))
+            done = items[-1] is _DONE
+            fetched = [x for x in items if x is not _DONE]
+            forward: List[str] = []  # texts to embed (new articles and changed ones)
+            t = time.perf_counter()
+            with metrics.timer("pipeline.store"):
+                writer.begin()
+                save_validators(conn, [res for _, _, res in fetched])
+                archive.record(conn, [res for _, _, res in fetched], [e for e, _, _ in fetched])
+                for e, is_new, res in fetched:
+                    if is_new:
+                        if writer.add_new(e, res["text"]) is not None:
+                            forward.append(res["text"])
+                    elif len(res["text"]) >= MIN_TEXT_CHARS:
+                        writer.add_update(e, res["text"])
+                        forward.append(res["text"])
+                writer.flush()
+            stage.busy_s += time.perf_counter() - t
+            for item in forward:
+                if not _put(embed_q, item, failed):
+                    return
+        stats.update(writer.totals)
+        stats["collapsed_chunks"] = writer.collapsed_chunks
+        _put(embed_q, _DONE, failed)
+
+    # -----------------------------
+    # embed: chunk + encode into the cache; publish snapshots
+    # -----------------------------
+    def embed(stage: _Stage) -> None:
+        cache = EmbeddingCache(cache_key(EMBED_MODEL_NAME, encoder))
+        model = None
+        pending = 0  # articles encoded since the last publish
+        last_publish = time.perf_counter()
+
+        def publish() -> None:
+            nonlocal pending, last_publish
+            with metrics.timer("pipeline.publish"):
+                build_index(
+                    article_limit=article_limit,
+                    incremental=True,
+                    index_type=index_type,
+                    chunker=chunker,
+                    max_tokens=max_tokens,
+                    encoder=encoder,
+                )
+            stats["publishes"] += 1
+            pending = 0
+            last_publish = time.perf_counter()
+
+        def encode(batch: List[str]):
+            nonlocal model
+            if model is None:
+                model = get_encoder(encoder, EMBED_MODEL_NAME)
+            return model.encode(batch, batch_size=32)
+
+        try:
+            done = False
+            while not done:
+                items = _take(embed_q, EMBED_BATCH, failed)
+                stats["max_embed_q"] = max(stats["max_embed_q"], embed_q.qsize() + len(items))
+                done = items[-1] is _DONE
+                texts = [x for x in items if x is not _DONE]
+                if texts:
+                    t = time.perf_counter()
+                    with metrics.timer("pipeline.chunk"):
+                        chunks = [c for cs in chunk_articles(texts, chunker, max_tokens=max_tokens) for c in cs]
+                    with metrics.timer("pipeline.encode"):
+                        cache.encode(chunks, encode)
+                    stage.busy_s += time.perf_counter() - t
+                    stats["chunks"] += len(chunks)
+                    pending += len(texts)
+                if failed.is_set():
+                    return
+                due = publish_every > 0 and time.perf_counter() - last_publish >= publish_every
+                if pending and (done or due):
+                    t = time.perf_counter()
+                    publish()
+                    stage.busy_s += time.perf_counter() - t
+            print(cache.format_stats())
+        finally:
+            cache.close()
+
+    store_stage = _Stage("store", store, failed)
+    embed_stage = _Stage("embed", embed, failed)
+    store_stage.start()
+    embed_stage.start()
+
+    # -----------------------------
+    # fetch (this thread): feeds -> downloads, in completion order
+    # -----------------------------
+    try:
+        session = make_session(max_workers)
+        conn = get_conn()
+        with metrics.timer("pipeline.feeds"):
+            entries = collect_entries(limit_per_feed, session=session, conn=conn)
+            fresh, seen = dedup_entries(conn, entries, session, max_workers=max_workers)
+        # Feed validators and URL aliases: commit them now, or this
+        # connection keeps the write lock the store thread needs
+        conn.commit()
+        todo = fresh + (seen if revalidate else [])
+        urls = [e["url"] for e in todo]
+        print(f"Entries: {len(entries)} | already ingested: {len(seen)} | downloading: {len(todo)}")
+
+        t_fetch = time.perf_counter()
+        results = fetch_iter(urls, validators=load_validators(conn, urls), max_workers=max_workers, session=session)
+        for i, res in results:
+            stats["downloaded"] += 1
+            if not _put(store_q, (todo[i], i < len(fresh), res), failed):
+                results.close()
+                break
+            metrics.set_gauge("pipeline.store_queue", store_q.qsize())
+            metrics.set_gauge("pipeline.embed_queue", embed_q.qsize())
+        stats["fetch_s"] = time.perf_counter() - t_fetch
+        metrics.observe("pipeline.fetch", stats["fetch_s"])
+    except BaseException:
+        failed.set()
+        raise
+    finally:
+        _put(store_q, _DONE, failed)
+        store_stage.join()
+        embed_stage.join()
+
+    for stage in (store_stage, embed_stage):
+        if stage.error is not None:
+            raise RuntimeError(f"{stage.name} failed") from stage.error
+
+    stats["store_s"] = store_stage.busy_s
+    stats["embed_s"] = embed_stage.busy_s
+    stats["total_s"] = time.perf_counter() - t0
+    metrics.incr("ingest.entries", len(entries))
+    metrics.incr("ingest.inserted", stats["inserted"])
+    metrics.incr("ingest.updated", stats["updated"])
+    metrics.incr("ingest.collapsed", stats["collapsed"])
+    metrics.observe("pipeline.total", stats["total_s"])
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Fetch, store and embed new articles in one streaming pass.")
+    ap.add_argument("--limit-per-feed", type=int, default=20)
+    ap.add_argument("--revalidate", action="store_true", help="conditionally re-fetch known articles")
+    ap.add_argument("--limit", type=int, default=200, help="retention window: newest N articles")
+    ap.add_argument("--publish-every", type=float, default=PUBLISH_EVERY_S, help="seconds between snapshots (0 = at the end)")
+    ap.add_argument("--chunker", default="tokens", choices=CHUNKERS)
+    ap.add_argument("--max-tokens", type=int, default=EMBED_MAX_TOKENS, help="token budget per chunk")
+    ap.add_argument("--encoder", default=ENCODER_BACKEND, choices=ENCODER_BACKENDS)
+    ap.add_argument("--index-type", default="auto", choices=("auto",) + INDEX_TYPES)
+    args = ap.parse_args()
+
+    s = run_pipeline(
+        limit_per_feed=args.limit_per_feed,
+        revalidate=args.revalidate,
+        article_limit=args.limit,
+        publish_every=args.publish_every,
+        chunker=args.chunker,
+        max_tokens=args.max_tokens,
+        encoder=args.encoder,
+        index_type=args.index_type,
+    )
+    print(
+        f"Downloaded: {s['downloaded']} | inserted: {s['inserted']} | updated: {s['updated']} | "
+        f"collapsed: {s['collapsed']} | chunks encoded: {s['chunks']} | snapshots: {s['publishes']}"
+    )
+    print(
+        f"fetch {s['fetch_s']:.1f}s | store {s['store_s']:.1f}s | embed {s['embed_s']:.1f}s | "
+        f"total {s['total_s']:.1f}s (sequential would be ~{s['fetch_s'] + s['store_s'] + s['embed_s']:.1f}s)"
+    )
+    print(f"Peak queue depth: store {s['max_store_q']}/{QUEUE_SIZE} | embed {s['max_embed_q']}/{QUEUE_SIZE}")
+    print(f"Metrics: {metrics.dump('pipeline')}")
@@ -1,18 +1,45 @@
 # core/rag.py
 from __future__ import annotations
 
+import json
 import os
 import subprocess
+import threading
+import time
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
-from core.retrieve import retrieve
+import numpy as np
+import requests
+
+from core import metrics
+from core.answer_cache import AnswerCache, get_answer_cache, normalize_question
+from core.context import CONTEXT_TOKEN_BUDGET, estimate_tokens, pack_context
+from core.keywords import is_fresh_query
+from core.rerank import RERANK_CANDIDATES, get_reranker
+from core.retrieve import WARMUP, Retriever, get_retriever
 
 # -----------------------------
 # CONFIG
 # -----------------------------
 OLLAMA_MODEL = "llama3.2"
 
+# Persistent local LLM server (Ollama's HTTP API). Point OLLAMA_URL at a stub in tests.
+OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434")
+OLLAMA_KEEP_ALIVE = "30m"  # keep the model loaded between questions
+
+# Retrieval: "dense" (FAISS), "lexical" (BM25) or "hybrid" (both, rank-fused)
+RETRIEVAL_MODE = "hybrid"
+
+# Re-score RERANK_CANDIDATES retrieved chunks with a cross-encoder before taking top_k
+RERANK = os.environ.get("RAGNROLL_RERANK", "1") != "0"
+
+# "today/latest" questions only search articles from this window
+FRESH_WINDOW_HOURS = 48
+
+# "http" streams from OLLAMA_URL; "cli" runs `ollama run` as a subprocess (old behaviour)
+LLM_BACKEND = os.environ.get("RAGNROLL_LLM_BACKEND", "http")
+
 # Your actual Ollama install path (confirmed by dir %LOCALAPPDATA%\Programs\Ollama)
 OLLAMA_EXE = os.environ.get(
     "OLLAMA_EXE",
@@ -33,21 +60,15 @@ Rules:
 # -----------------------------
 # HELPERS
 # -----------------------------
-def looks_like_fresh_query(q: str) -> bool:
-    q = q.lower()
-    return any(
-        w in q
-        for w in [
-            "today",
-            "latest",
-            "current",
-            "right now",
-            "this week",
-            "breaking",
-            "recent",
-            "news today",
-        ]
-    )
+def fresh_since(retriever: Retriever, hours: float = FRESH_WINDOW_HOURS) -> Optional[float]:
+    """
+    Start of the "recent" window for fresh queries. Anchored at now, or at the
+    newest ingested article when the snapshot is older than the window.
+    """
+    latest = retriever.latest_published()
+    if not latest:
+        return None
+    return min(time.time(), latest) - hours * 3600
 
 # -----------------------------
 # RAG PIPELINE
@@ -71,7 +92,7 @@ def build_prompt(question: str, docs: List[Dict]) -> str:
         f"Answer (with citations like [1], [2]):"
     )
 
-def ask_ollama(prompt: str) -> str:
+def _ask_ollama_cli(prompt: str) -> str:
     exe = Path(OLLAMA_EXE)
     if not exe.exists():
         raise FileNotFoundError(
@@ -100,12 +121,64 @@ def ask_ollama(prompt: str) -> str:
 
     return (proc.stdout or "").strip()
 
-def rag_answer(question: str, top_k: int = 5) -> Tuple[str, List[Dict]]:
-    docs = retrieve(question, top_k=top_k)
+_SESSION: Optional[requests.Session] = None
+
+def _session() -> requests.Session:
+    global _SESSION
+    if _SESSION is None:
+        _SESSION = requests.Session()  # keep-alive to the local server
+    return _SESSION
 
+class OllamaError(RuntimeError):
+    """The server answered, but not with a complete generation."""
+
+def stream_ollama(prompt: str, model: str = OLLAMA_MODEL, url: Optional[str] = None) -> Iterator[str]:
+    """
+    Yield response tokens from Ollama's /api/generate (stream=true, NDJSON lines).
+    Raises OllamaError for an error message, a malformed line or a stream
+    that ends before "done"; HTTP failures raise requests exceptions.
+    """
+    payload = {"model": model, "prompt": prompt, "stream": True, "keep_alive": OLLAMA_KEEP_ALIVE}
+    with _session().post(
+        f"{url or OLLAMA_URL}/api/generate", json=payload, stream=True, timeout=(5, 300)
+    ) as r:
+        r.raise_for_status()
+        for line in r.iter_lines():
+            if not line:
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError:
+                raise OllamaError(f"Malformed stream line: {line[:80]!r}") from None
+            if data.get("error"):
+                raise OllamaError(f"Ollama error: {data['error']}")
+            token = data.get("response")
+            if token:
+                yield token
+            if data.get("done"):
+                return
+    raise OllamaError("Stream ended before the answer was done")
+
+def stream_answer(prompt: str) -> Iterator[str]:
+    """
+    Token stream from the configured backend (the CLI backend yields one
+    chunk). Failures end the stream with an "ERROR calling Ollama" message.
+    """
+    if LLM_BACKEND == "cli":
+        yield _ask_ollama_cli(prompt)
+        return
+    try:
+        yield from stream_ollama(prompt)
+    except (requests.RequestException, OllamaError) as e:
+        yield f"ERROR calling Ollama at {OLLAMA_URL}:\n{e}"
+
+def ask_ollama(prompt: str) -> str:
+    return "".join(stream_answer(prompt)).strip()
+
+def _build_rag_prompt(question: str, docs: List[Dict]) -> str:
     # Freshness guard: if user asks for "today/latest/current" but sources have no date signals,
     # force the model to be explicit that it cannot verify "today" from these sources.
-    if looks_like_fresh_query(question):
+    if is_fresh_query(question):
         has_any_date = False
         for d in docs:
             meta = d.get("meta", {}) if isinstance(d.get("meta"), dict) else {}
@@ -114,17 +187,217 @@ def rag_answer(question: str, top_k: int = 5) -> Tuple[str, List[Dict]]:
                 break
 
         if not has_any_date:
-            prompt = build_prompt(question, docs) + "\n\n" + (
+            return build_prompt(question, docs) + "\n\n" + (
                 "Important: The provided sources do NOT include publication dates or explicit 'today' updates. "
                 "Do NOT claim this reflects today's news. Clearly say you cannot verify what's happening today from these sources, "
                 "then summarize what the sources DO contain."
             )
-            answer = ask_ollama(prompt)
-            return answer, docs
 
-    prompt = build_prompt(question, docs)
-    answer = ask_ollama(prompt)
-    return answer, docs
+    return build_prompt(question, docs)
+
+def warm_up(
+    retriever: Optional[Retriever] = None,
+    rerank: bool = RERANK,
+    background: bool = True,
+) -> Optional[threading.Thread]:
+    """
+    Load everything the first question would otherwise wait for: FAISS index,
+    chunks, query encoder and (if rerank) the cross-encoder. Runs in a daemon
+    thread unless background=False; failures are left for the first question
+    to report.
+    """
+    def run() -> None:
+        try:
+            with metrics.timer("warmup"):
+                (retriever or get_retriever()).warm_up()
+                if rerank:
+                    get_reranker().model.predict([("warm up", "warm up")], show_progress_bar=False)
+        except Exception as e:
+            print(f"Warm-up failed: {e}")
+
+    if not background:
+        run()
+        return None
+    thread = threading.Thread(target=run, name="ragnroll-warmup", daemon=True)
+    thread.start()
+    return thread
+
+def rag_answer(
+    question: str,
+    top_k: int = 5,
+    retriever: Optional[Retriever] = None,
+    use_cache: bool = True,
+    mode: str = RETRIEVAL_MODE,
+    sources: Optional[List[str]] = None,
+    since: Optional[float] = None,
+    rerank: bool = RERANK,
+    candidates: int = RERANK_CANDIDATES,
+    context_budget: Optional[int] = CONTEXT_TOKEN_BUDGET,
+) -> Tuple[str, List[Dict]]:
+    tokens, docs, _ = rag_answer_stream(
+        question,
+        top_k=top_k,
+        retriever=retriever,
+        use_cache=use_cache,
+        mode=mode,
+        sources=sources,
+        since=since,
+        rerank=rerank,
+        candidates=candidates,
+        context_budget=context_budget,
+    )
+    return "".join(tokens).strip(), docs
+
+def _timed_stream(tokens: Iterator[str], stats: Dict, t_start: float) -> Iterator[str]:
+    t_gen = time.perf_counter()
+    first = True
+    for token in tokens:
+        if first:
+            stats["ttft_s"] = time.perf_counter() - t_start  # question -> first token
+            first = False
+        yield token
+    stats["generate_s"] = time.perf_counter() - t_gen
+    stats["total_s"] = time.perf_counter() - t_start
+    _record_metrics(stats)
+
+# Per-request stats key -> metrics stage
+_STAGE_KEYS = {
+    "encode_s": "rag.encode",
+    "search_s": "rag.search",
+    "rerank_s": "rag.rerank",
+    "pack_s": "rag.pack",
+    "prompt_s": "rag.prompt_build",
+    "retrieve_s": "rag.retrieve",
+    "generate_s": "llm.generate",
+    "total_s": "rag.total",
+}
+
+def _record_metrics(stats: Dict) -> None:
+    for key, stage in _STAGE_KEYS.items():
+        if key in stats:
+            metrics.observe(stage, stats[key])
+    if "ttft_s" in stats and not stats.get("cache_hit"):
+        metrics.observe("llm.first_token", stats["ttft_s"] - stats.get("retrieve_s", 0.0))
+    metrics.incr("answer_cache.hit" if stats.get("cache_hit") else "answer_cache.miss")
+    if "prompt_tokens" in stats:
+        metrics.incr("llm.prompt_tokens", stats["prompt_tokens"])
+
+def _cache_when_done(tokens: Iterator[str], cache: AnswerCache, **entry) -> Iterator[str]:
+    parts = []
+    for token in tokens:
+        parts.append(token)
+        yield token
+    answer = "".join(parts).strip()
+    if answer and "ERROR calling Ollama" not in answer:  # failed, possibly after partial output
+        cache.store(answer=answer, **entry)
+
+def rag_answer_stream(
+    question: str,
+    top_k: int = 5,
+    retriever: Optional[Retriever] = None,
+    use_cache: bool = True,
+    mode: str = RETRIEVAL_MODE,
+    sources: Optional[List[str]] = None,
+    since: Optional[float] = None,
+    rerank: bool = RERANK,
+    candidates: int = RERANK_CANDIDATES,
+    context_budget: Optional[int] = CONTEXT_TOKEN_BUDGET,
+    q_emb: Optional[np.ndarray] = None,
+    search: Optional[Callable[..., List[List[Dict]]]] = None,
+) -> Tuple[Iterator[str], List[Dict], Dict[str, float]]:
+    """
+    Streaming variant of rag_answer. Retrieval runs eagerly; the returned token
+    iterator drives generation. The stats dict is filled in as the stream is
+    consumed: encode_s, search_s, rerank_s, pack_s, retrieve_s (everything
+    before the LLM call), prompt_tokens_before / prompt_tokens (estimated,
+    without / with context packing), ttft_s (time to first token), generate_s,
+    total_s, cache_hit (1.0 when served from the semantic answer cache).
+
+    rerank=True retrieves `candidates` chunks and keeps the top_k best by
+    cross-encoder score (core.rerank). context_budget packs the sources into
+    that many tokens (core.context); None sends the chunks as they are. The
+    returned docs are the sources as numbered in the prompt.
+
+    q_emb (1 x dim) is the precomputed embedding of
+    normalize_question(question), e.g. from a batched encode in core.api.
+    search replaces retriever.search (same signature), e.g. to batch the
+    index searches of concurrent requests.
+
+    sources / since (unix seconds) filter retrieval; fresh queries ("today",
+    "latest", ...) default `since` to the FRESH_WINDOW_HOURS window, topped up
+    with older chunks when fewer than top_k are that recent.
+    """
+    t_start = time.perf_counter()
+    retriever = retriever or get_retriever()
+    search = search or retriever.search
+
+    if q_emb is None:
+        q_emb = retriever.encode([normalize_question(question) or question])
+    encode_s = time.perf_counter() - t_start
+    version = retriever.current_version()
+    auto_since = since is None and is_fresh_query(question)
+    if auto_since:
+        since = fresh_since(retriever)
+    if since is None:
+        window = ""
+    elif auto_since:
+        window = f"fresh{FRESH_WINDOW_HOURS:g}h"
+    else:
+        window = f"since{round((time.time() - since) / 3600)}h"  # window length, to the hour
+    # Answers are only reusable under the same retrieval settings
+    scope = "|".join([
+        mode,
+        ",".join(sorted(sources or [])),
+        window,
+        f"rerank{candidates}" if rerank else "",
+        f"ctx{context_budget}" if context_budget else "",
+    ])
+
+    cache = get_answer_cache() if use_cache else None
+    if cache is not None:
+        hit = cache.lookup(question, q_emb, top_k, version, scope=scope)
+        if hit is not None:
+            stats = {"retrieve_s": 0.0, "cache_hit": 1.0, "cache_similarity": hit["similarity"]}
+            return _timed_stream(iter([hit["answer"]]), stats, t_start), hit["docs"], stats
+
+    t_search = time.perf_counter()
+    n = max(top_k, candidates) if rerank else top_k
+    docs = search(
+        q_emb, top_k=n, queries=[question], mode=mode, since=since, sources=sources
+    )[0]
+    if auto_since and len(docs) < top_k:
+        # Not enough recent articles for the implied "recent" window: top up
+        # from the rest of the corpus. An explicit `since` is a hard filter.
+        seen = {d["meta"].get("chunk_id") for d in docs}
+        older = search(q_emb, top_k=n, queries=[question], mode=mode, sources=sources)[0]
+        docs += [d for d in older if d["meta"].get("chunk_id") not in seen][: n - len(docs)]
+    stats: Dict[str, float] = {
+        "encode_s": encode_s,
+        "search_s": time.perf_counter() - t_search,
+        "cache_hit": 0.0,
+    }
+    if rerank and docs:
+        docs, rerank_stats = get_reranker().rerank(question, docs, top_k=top_k)
+        stats.update(rerank_stats)
+
+    stats["prompt_tokens_before"] = float(estimate_tokens(_build_rag_prompt(question, docs)))
+    if context_budget and docs:
+        t_pack = time.perf_counter()
+        docs, pack_stats = pack_context(docs, q_emb, retriever.encode, budget=context_budget)
+        stats.update(pack_stats)
+        stats["pack_s"] = time.perf_counter() - t_pack
+    stats["retrieve_s"] = time.perf_counter() - t_start
+
+    t_prompt = time.perf_counter()
+    prompt = _build_rag_prompt(question, docs)
+    stats["prompt_s"] = time.perf_counter() - t_prompt
+    stats["prompt_tokens"] = float(estimate_tokens(prompt))
+    tokens = _timed_stream(stream_answer(prompt), stats, t_start)
+    if cache is not None:
+        tokens = _cache_when_done(
+            tokens, cache, question=question, q_emb=q_emb, top_k=top_k, version=version, docs=docs, scope=scope
+        )
+    return tokens, docs, stats
 
 # -----------------------------
 # CLI
@@ -134,14 +407,26 @@ def format_sources(docs: List[Dict]) -> str:
     for i, d in enumerate(docs, 1):
         meta = d.get("meta", {}) if isinstance(d.get("meta"), dict) else {}
         lines.append(f"[{i}] {meta.get('title','Untitled')} — {meta.get('url','')}")
+        for link in meta.get("links") or []:
+            lines.append(f"    also: {link.get('source') or ''} — {link.get('url','')}")
     return "\n".join(lines)
 
 if __name__ == "__main__":
+    if WARMUP:
+        warm_up()  # while the question is being typed
     q = input("Ask RAG’n’Roll: ").strip()
-    answer, docs = rag_answer(q, top_k=5)
+    tokens, docs, stats = rag_answer_stream(q, top_k=5)
 
     print("\nAnswer:\n" + "-" * 60)
-    print(answer)
+    for token in tokens:
+        print(token, end="", flush=True)
+    print(f"\n\n(time to first token: {stats.get('ttft_s', 0):.2f}s | total: {stats.get('total_s', 0):.2f}s)")
+    if "search_s" in stats:
+        print(
+            f"(encode: {stats['encode_s']:.3f}s | search: {stats['search_s']:.3f}s | "
+            f"rerank: {stats.get('rerank_s', 0):.3f}s, {stats.get('rerank_scored', 0):.0f} scored)"
+        )
+        print(f"(prompt tokens: ~{stats['prompt_tokens_before']:.0f} -> ~{stats['prompt_tokens']:.0f})")
 
     print("\nSources:\n" + "-" * 60)
     print(format_sources(docs))
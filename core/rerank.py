@@ -0,0 +1,99 @@
+"""
+Cross-encoder re-ranking of retrieved candidates.
+
+The bi-encoder (FAISS) / BM25 stage returns a cheap candidate list; a local
+cross-encoder then scores each (question, chunk) pair jointly, batched on CPU,
+and the best top_k are kept.
+
+Candidates are scored in retrieval order, one batch at a time. Scoring stops
+early once the top_k scored so far beat everything in the latest batch by
+EARLY_EXIT_MARGIN: the tail of the candidate list is then very unlikely to
+contain a better source.
+"""
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core import metrics
+
+RERANK_MODEL_NAME = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+RERANK_CANDIDATES = 30     # candidates retrieved for re-ranking
+RERANK_BATCH_SIZE = 16     # pairs per cross-encoder forward pass
+EARLY_EXIT_MARGIN = 3.0    # logits; ms-marco scores span roughly -11..11
+RERANK_MAX_LENGTH = 256
+
+
+class Reranker:
+    def __init__(self, model_name: str = RERANK_MODEL_NAME, max_length: int = RERANK_MAX_LENGTH):
+        self.model_name = model_name
+        self.max_length = max_length
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+
+                    with metrics.timer("rerank.model_load"):
+                        self._model = CrossEncoder(self.model_name, max_length=self.max_length, device="cpu")
+        return self._model
+
+    def rerank(
+        self,
+        query: str,
+        docs: List[Dict],
+        top_k: int = 5,
+        batch_size: int = RERANK_BATCH_SIZE,
+        margin: Optional[float] = EARLY_EXIT_MARGIN,
+    ) -> Tuple[List[Dict], Dict[str, float]]:
+        """
+        Re-score docs (in retrieval order) and return the best top_k, each with
+        a "rerank_score", plus {"rerank_s", "rerank_scored", "rerank_candidates"}.
+        margin=None disables early exit.
+        """
+        t0 = time.perf_counter()
+        scores = np.full(len(docs), -np.inf, dtype=np.float32)
+        scored = 0
+        while scored < len(docs):
+            batch = docs[scored:scored + batch_size]
+            scores[scored:scored + len(batch)] = self.model.predict(
+                [(query, d["text"]) for d in batch], batch_size=batch_size, show_progress_bar=False
+            )
+            scored += len(batch)
+            if margin is not None and top_k <= scored - len(batch) and scored < len(docs):
+                kth_best = np.partition(scores[:scored - len(batch)], -top_k)[-top_k]
+                if kth_best - scores[scored - len(batch):scored].max() >= margin:
+                    break
+
+        order = np.argsort(-scores[:scored], kind="stable")[:top_k]
+        out = []
+        for i in order:
+            d = dict(docs[int(i)])
+            d["rerank_score"] = float(scores[i])
+            out.append(d)
+        metrics.incr("rerank.scored", scored)
+        metrics.incr("rerank.early_exits", float(scored < len(docs)))
+        return out, {
+            "rerank_s": time.perf_counter() - t0,
+            "rerank_scored": float(scored),
+            "rerank_candidates": float(len(docs)),
+        }
+
+
+_reranker: Optional[Reranker] = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> Reranker:
+    """Process-wide Reranker (the cross-encoder is loaded on first use)."""
+    global _reranker
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None:
+                _reranker = Reranker()
+    return _reranker
@@ -1,48 +1,314 @@
-import json
+import os
+import threading
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 
-import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
+
+from core import metrics, snapshots
+from core.ann import filtered_search_params, read_index
+from core.bm25 import BM25Index, reciprocal_rank_fusion
+from core.chunkstore import ChunkStore, migrate_jsonl, store_exists
+from core.encoder import ENCODER_BACKEND, get_encoder
 
 BASE_DIR = Path(__file__).resolve().parents[1]  # project root
-FAISS_PATH = BASE_DIR / "data" / "faiss.index"
-CHUNKS_PATH = BASE_DIR / "data" / "chunks.jsonl"
+STORE_DIR = BASE_DIR / "data" / "chunkstore"  # pre-snapshot layout
+CHUNKS_PATH = BASE_DIR / "data" / "chunks.jsonl"  # legacy format, migrated on first load
+
+# Memory-map FAISS indexes of published snapshots instead of reading them into RAM
+MMAP_INDEX = os.environ.get("RAGNROLL_MMAP_INDEX", "1") != "0"
 
 EMBED_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 
-def load_chunks() -> List[Dict]:
-    chunks = []
-    with CHUNKS_PATH.open("r", encoding="utf-8") as f:
-        for line in f:
-            chunks.append(json.loads(line))
-    return chunks
-
-def retrieve(query: str, top_k: int = 5) -> List[Dict]:
-    if not FAISS_PATH.exists() or not CHUNKS_PATH.exists():
-        raise FileNotFoundError("Missing FAISS index or chunks.jsonl. Run: python -m core.embed")
-
-    model = SentenceTransformer(EMBED_MODEL_NAME)
-    index = faiss.read_index(str(FAISS_PATH))
-    chunks = load_chunks()
-
-    q_emb = model.encode([query], normalize_embeddings=True).astype("float32")
-    scores, ids = index.search(q_emb, top_k)
-
-    results = []
-    for score, idx in zip(scores[0], ids[0]):
-        rec = chunks[int(idx)]
-        results.append({
-            "score": float(score),
-            "meta": rec["meta"],
-            "text": rec["text"]
-        })
-    return results
+# Preload index + encoder in the background at startup (CLIs, app, API); RAGNROLL_WARMUP=0 disables
+WARMUP = os.environ.get("RAGNROLL_WARMUP", "1") != "0"
+
+RETRIEVAL_MODES = ("dense", "lexical", "hybrid")
+# Candidates taken from each retriever before rank fusion
+HYBRID_CANDIDATES = 50
+
+def load_chunks(path: Optional[Path] = None) -> ChunkStore:
+    """Chunk store of the current snapshot (or at `path`)."""
+    path = Path(path) if path else snapshots.current().store_path
+    if not store_exists(path) and path == STORE_DIR and CHUNKS_PATH.exists():
+        print(f"Migrating {CHUNKS_PATH} -> {path}")
+        migrate_jsonl(CHUNKS_PATH, path)
+    return ChunkStore(path)
+
+def _file_version(path: Path) -> Tuple[int, int]:
+    st = path.stat()
+    return st.st_mtime_ns, st.st_size
+
+
+class Retriever:
+    """
+    Long-lived retriever: loads the embedding model, FAISS index and chunk store
+    once and keeps them in memory (the chunk store and, for published snapshots,
+    the index are memory-mapped). It follows the CURRENT snapshot pointer
+    (core.snapshots) and hot-swaps to a new snapshot as soon as
+    `python -m core.embed` publishes one. Pass `snapshot` to pin one instead.
+    """
+
+    def __init__(
+        self,
+        model_name: str = EMBED_MODEL_NAME,
+        encoder: str = ENCODER_BACKEND,
+        snapshot: Optional[snapshots.Snapshot] = None,
+        snapshots_dir: Optional[Path] = None,
+        auto_reload: bool = True,
+        mmap: bool = MMAP_INDEX,
+    ):
+        self.model_name = model_name
+        self.encoder = encoder
+        self.pinned = snapshot
+        self.snapshots_dir = Path(snapshots_dir) if snapshots_dir is not None else None
+        self.auto_reload = auto_reload
+        self.mmap = mmap
+        self.snapshot: Optional[snapshots.Snapshot] = None  # the one being served
+
+        self._lock = threading.RLock()
+        self._model = None
+        self._index = None
+        self._chunks: Optional[ChunkStore] = None
+        self._bm25: Optional[BM25Index] = None
+        self.version: Optional[Tuple] = None
+
+    @property
+    def model(self):
+        """The core.encoder backend (must match the one the index was built with)."""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    with metrics.timer("retrieve.model_load"):
+                        self._model = get_encoder(self.encoder, self.model_name)
+        return self._model
+
+    def _target(self) -> snapshots.Snapshot:
+        return self.pinned or snapshots.current(self.snapshots_dir)
+
+    @staticmethod
+    def _disk_version(snap: snapshots.Snapshot) -> Tuple:
+        if not snap.is_legacy:
+            return (snap.version,)  # published snapshots never change
+        # Pre-snapshot layout: files may be rewritten in place
+        if not snap.faiss_path.exists() or not (store_exists(snap.store_path) or CHUNKS_PATH.exists()):
+            raise FileNotFoundError("Missing FAISS index or chunk store. Run: python -m core.embed")
+        version = _file_version(snap.faiss_path)
+        if snap.params_path.exists():
+            version += _file_version(snap.params_path)
+        if snap.bm25_path.exists():
+            version += _file_version(snap.bm25_path)
+        if store_exists(snap.store_path):
+            version += _file_version(snap.store_path / "store.json")
+        return version
+
+    def reload(self) -> None:
+        """Load the current snapshot's index, chunks and BM25 index and swap them in."""
+        snap = self._target()
+        version = self._disk_version(snap)
+        with metrics.timer("retrieve.index_load"):
+            index = read_index(snap.faiss_path, snap.params_path, mmap=self.mmap and not snap.is_legacy)
+        # FAISS ids are stable chunk ids (older flat indexes: chunk_id == line number)
+        with metrics.timer("retrieve.chunks_load"):
+            chunks = load_chunks(snap.store_path)
+        with metrics.timer("retrieve.bm25_load"):
+            bm25 = BM25Index.load(snap.bm25_path) if snap.bm25_path.exists() else None
+
+        if index.ntotal != len(chunks):
+            # Legacy files mid-rewrite by an older core.embed; keep serving the old pair if we have one.
+            if self._index is not None:
+                return
+            raise RuntimeError(
+                f"FAISS index ({index.ntotal}) and chunks ({len(chunks)}) are out of sync. "
+                "Re-run: python -m core.embed"
+            )
+
+        with self._lock:
+            self._index = index
+            self._chunks = chunks
+            self._bm25 = bm25
+            self.snapshot = snap
+            self.version = version
+        metrics.incr("retrieve.reloads")
+        metrics.set_gauge("index.vectors", index.ntotal)
+
+    def _current(self):
+        with self._lock:
+            if self._index is None:
+                self.reload()
+            elif self.auto_reload and self._disk_version(self._target()) != self.version:
+                self.reload()
+            return self._index, self._chunks, self._bm25
+
+    def warm_up(self) -> None:
+        """Load the index, chunks and encoder (and run one encode) ahead of the first query."""
+        self._current()
+        self.encode(["warm up"])
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        model = self.model
+        with metrics.timer("retrieve.encode"):
+            emb = model.encode(texts, batch_size=batch_size)
+        metrics.incr("retrieve.encoded_texts", len(texts))
+        return emb
+
+    @staticmethod
+    def _to_results(scores: np.ndarray, ids: np.ndarray, chunks: ChunkStore) -> List[Dict]:
+        # Only the top-k records are read from the store
+        results = []
+        for score, rec in zip(scores, chunks.get_many(ids)):
+            if rec is None:
+                continue
+            results.append({
+                "score": float(score),
+                "meta": rec["meta"],
+                "text": rec["text"]
+            })
+        return results
+
+    def current_version(self) -> Optional[Tuple]:
+        """Version of the index being served (reloads first if the files changed)."""
+        self._current()
+        return self.version
+
+    def search(
+        self,
+        q_emb: Optional[np.ndarray],
+        top_k: int = 5,
+        queries: Optional[List[str]] = None,
+        mode: str = "dense",
+        since: Optional[float] = None,
+        sources: Optional[List[str]] = None,
+    ) -> List[List[Dict]]:
+        """
+        Search with precomputed normalized query embeddings (one row per query).
+        mode="dense": FAISS only; "lexical": BM25 only (needs `queries`, not q_emb);
+        "hybrid": both, fused with reciprocal rank fusion. Hybrid falls back to
+        dense when no BM25 index has been built yet.
+
+        since (unix seconds) / sources restrict the search itself to matching
+        chunks via a FAISS ID selector and a BM25 mask.
+        """
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode {mode!r}; expected one of {RETRIEVAL_MODES}")
+        index, chunks, bm25 = self._current()
+        with metrics.timer(f"retrieve.search.{mode}"):
+            results = self._search(index, chunks, bm25, q_emb, top_k, queries, mode, since, sources)
+        metrics.incr("retrieve.queries", len(results))
+        return results
+
+    def _search(self, index, chunks, bm25, q_emb, top_k, queries, mode, since, sources) -> List[List[Dict]]:
+        if bm25 is None and mode != "dense":
+            if q_emb is None:
+                raise FileNotFoundError("Missing BM25 index. Run: python -m core.embed")
+            mode = "dense"
+
+        n_queries = len(queries) if q_emb is None else len(q_emb)
+        search_params = None
+        lexical_mask = None
+        if since is not None or sources:
+            allowed = chunks.select(since=since, sources=sources)
+            if not len(allowed):
+                return [[] for _ in range(n_queries)]
+            search_params = filtered_search_params(index, allowed)
+            if bm25 is not None:
+                lexical_mask = np.isin(bm25.chunk_ids, allowed)
+
+        def dense_search(k: int):
+            q = np.ascontiguousarray(q_emb, dtype="float32")
+            return index.search(q, k, params=search_params) if search_params else index.search(q, k)
+
+        if mode == "dense":
+            scores, ids = dense_search(top_k)
+            return [self._to_results(s, i, chunks) for s, i in zip(scores, ids)]
+
+        n_cand = max(HYBRID_CANDIDATES, top_k)
+        lexical = [bm25.search(q, n_cand, mask=lexical_mask) for q in queries]
+        if mode == "lexical":
+            return [self._to_results(s[:top_k], i[:top_k], chunks) for s, i in lexical]
+
+        _, dense_ids = dense_search(n_cand)
+        results = []
+        for d_ids, (_, l_ids) in zip(dense_ids, lexical):
+            fused, ids = reciprocal_rank_fusion([d_ids, l_ids], top_k)
+            results.append(self._to_results(fused, ids, chunks))
+        return results
+
+    def latest_published(self) -> int:
+        """Newest publish time in the corpus (unix seconds, 0 if unknown)."""
+        _, chunks, _ = self._current()
+        return chunks.latest_published()
+
+    def sources(self) -> List[str]:
+        _, chunks, _ = self._current()
+        return [s for s in chunks.sources if s]
+
+    def retrieve(
+        self,
+        query: str,
+        top_k: int = 5,
+        mode: str = "dense",
+        since: Optional[float] = None,
+        sources: Optional[List[str]] = None,
+    ) -> List[Dict]:
+        return self.retrieve_many([query], top_k=top_k, mode=mode, since=since, sources=sources)[0]
+
+    def retrieve_many(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        batch_size: int = 64,
+        mode: str = "dense",
+        since: Optional[float] = None,
+        sources: Optional[List[str]] = None,
+    ) -> List[List[Dict]]:
+        """
+        Batched retrieval: one model.encode call for all queries and a single
+        index.search over the whole query matrix. Returns one result list per query.
+        """
+        if not queries:
+            return []
+        queries = list(queries)
+        q_emb = None if mode == "lexical" else self.encode(queries, batch_size=batch_size)
+        return self.search(q_emb, top_k, queries=queries, mode=mode, since=since, sources=sources)
+
+
+_RETRIEVER: Optional[Retriever] = None
+_RETRIEVER_LOCK = threading.Lock()
+
+def get_retriever() -> Retriever:
+    """Process-wide shared Retriever instance."""
+    global _RETRIEVER
+    if _RETRIEVER is None:
+        with _RETRIEVER_LOCK:
+            if _RETRIEVER is None:
+                _RETRIEVER = Retriever()
+    return _RETRIEVER
+
+def retrieve(
+    query: str,
+    top_k: int = 5,
+    mode: str = "dense",
+    since: Optional[float] = None,
+    sources: Optional[List[str]] = None,
+) -> List[Dict]:
+    return get_retriever().retrieve(query, top_k=top_k, mode=mode, since=since, sources=sources)
+
+def retrieve_many(
+    queries: List[str],
+    top_k: int = 5,
+    mode: str = "dense",
+    since: Optional[float] = None,
+    sources: Optional[List[str]] = None,
+) -> List[List[Dict]]:
+    return get_retriever().retrieve_many(queries, top_k=top_k, mode=mode, since=since, sources=sources)
 
 if __name__ == "__main__":
+    if WARMUP:
+        # Load the model and index while the question is being typed
+        threading.Thread(target=get_retriever().warm_up, daemon=True).start()
     q = input("Ask RAG’n’Roll a question: ").strip()
-    hits = retrieve(q, top_k=5)
+    hits = retrieve(q, top_k=5, mode="hybrid")
 
     print("\nTop evidence:\n" + "="*60)
     for i, h in enumerate(hits, 1):
@@ -0,0 +1,209 @@
+"""
+Background news refresh: `core.ingest` then `core.embed --incremental` on an
+interval, each in its own subprocess (so a refresh never blocks a query or
+holds the GIL). core.embed publishes a new index snapshot when it is done;
+running retrievers switch to it on their next query. With streaming=True
+(RAGNROLL_REFRESH_STREAMING=1) one `core.pipeline` run does both, overlapped.
+
+At most one refresh runs at a time across processes (a lock file in
+data/snapshots/), so the app and a standalone scheduler can run side by side.
+
+Run from the project root:
+    python -m core.scheduler --interval-hours 6
+    python -m core.scheduler --once --streaming
+"""
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from core import metrics, snapshots
+
+BASE_DIR = Path(__file__).resolve().parents[1]  # project root
+LOCK_PATH = snapshots.SNAPSHOTS_DIR / "refresh.lock"
+STALE_LOCK_S = 3 * 3600  # a refresh holding the lock longer than this is assumed dead
+
+# Hours between automatic refreshes; 0 = only when triggered
+REFRESH_INTERVAL_HOURS = float(os.environ.get("RAGNROLL_REFRESH_HOURS", "6"))
+
+STEPS = (
+    ("ingest", ["-m", "core.ingest"]),
+    ("embed", ["-m", "core.embed", "--incremental"]),
+)
+STREAM_STEPS = (("pipeline", ["-m", "core.pipeline"]),)
+# Refresh with the streaming pipeline instead of ingest followed by embed
+REFRESH_STREAMING = os.environ.get("RAGNROLL_REFRESH_STREAMING", "0") != "0"
+LOG_TAIL_CHARS = 4000
+
+
+def _acquire_lock(path: Path = LOCK_PATH) -> bool:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        if time.time() - path.stat().st_mtime > STALE_LOCK_S:
+            path.unlink()
+    except OSError:
+        pass
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    os.write(fd, str(os.getpid()).encode())
+    os.close(fd)
+    return True
+
+
+def _release_lock(path: Path = LOCK_PATH) -> None:
+    try:
+        path.unlink()
+    except OSError:
+        pass
+
+
+class RefreshScheduler:
+    """
+    Runs refresh() every interval_s (<= 0: only on trigger()) in a daemon
+    thread. status() is safe to call from any thread.
+    """
+
+    def __init__(self, interval_s: float = REFRESH_INTERVAL_HOURS * 3600, streaming: bool = REFRESH_STREAMING):
+        self.interval_s = interval_s
+        self.steps = STREAM_STEPS if streaming else STEPS
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._status: Dict = {
+            "running": False,
+            "last_started": None,
+            "last_finished": None,
+            "last_ok": None,
+            "last_error": None,
+            "next_run": None,
+            "logs": {},
+        }
+
+    # -----------------------------
+    # Control
+    # -----------------------------
+    def start(self) -> "RefreshScheduler":
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name="ragnroll-refresh", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def trigger(self) -> bool:
+        """Refresh now in the background; False if a refresh is already running here."""
+        if self._status["running"]:
+            return False
+        self.start()
+        self._wake.set()
+        return True
+
+    def status(self) -> Dict:
+        with self._lock:
+            out = dict(self._status)
+        out["current_version"] = snapshots.read_current()
+        return out
+
+    def _update(self, **kw) -> None:
+        with self._lock:
+            self._status.update(kw)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            timeout = self.interval_s if self.interval_s > 0 else None
+            self._update(next_run=time.time() + timeout if timeout else None)
+            self._wake.wait(timeout)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            self.refresh()
+
+    # -----------------------------
+    # One refresh
+    # -----------------------------
+    def refresh(self, steps=None) -> bool:
+        """ingest -> embed (or the pipeline) in subprocesses; True if every step succeeded."""
+        if not _acquire_lock():
+            self._update(last_error="Another refresh is already running")
+            return False
+        self._update(running=True, last_started=time.time(), last_error=None, logs={})
+        ok = True
+        error: Optional[str] = None
+        logs: Dict[str, str] = {}
+        try:
+            for name, args in steps or self.steps:
+                with metrics.timer(f"refresh.{name}"):
+                    proc = subprocess.run(
+                        [sys.executable, *args],
+                        cwd=str(BASE_DIR),
+                        capture_output=True,
+                        text=True,
+                        encoding="utf-8",
+                        errors="replace",
+                    )
+                logs[name] = ((proc.stdout or "") + "\n" + (proc.stderr or ""))[-LOG_TAIL_CHARS:]
+                self._update(logs=dict(logs))
+                if proc.returncode != 0:
+                    ok = False
+                    error = f"{name} failed (exit code {proc.returncode})"
+                    break
+        except Exception as e:
+            ok, error = False, f"{type(e).__name__}: {e}"
+        finally:
+            _release_lock()
+            metrics.incr("refresh.runs")
+            metrics.incr("refresh.failures", float(not ok))
+            self._update(running=False, last_finished=time.time(), last_ok=ok, last_error=error)
+        return ok
+
+
+def format_status(status: Dict) -> List[str]:
+    def when(ts: Optional[float]) -> str:
+        return time.strftime("%Y-%m-%d %H:%M", time.localtime(ts)) if ts else "-"
+
+    lines = [f"Index snapshot: {status.get('current_version') or 'none (data/ files)'}"]
+    if status["running"]:
+        lines.append(f"Refreshing since {when(status['last_started'])}...")
+    elif status["last_finished"]:
+        result = "ok" if status["last_ok"] else f"failed: {status['last_error']}"
+        lines.append(f"Last refresh {when(status['last_finished'])} ({result})")
+    elif status["last_error"]:
+        lines.append(status["last_error"])
+    if status.get("next_run"):
+        lines.append(f"Next refresh {when(status['next_run'])}")
+    return lines
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Refresh the news index on an interval.")
+    ap.add_argument("--interval-hours", type=float, default=REFRESH_INTERVAL_HOURS)
+    ap.add_argument("--once", action="store_true", help="refresh once and exit")
+    ap.add_argument("--streaming", action="store_true", default=REFRESH_STREAMING, help="use core.pipeline")
+    args = ap.parse_args()
+
+    scheduler = RefreshScheduler(args.interval_hours * 3600, streaming=args.streaming)
+    if args.once or args.interval_hours <= 0:
+        ok = scheduler.refresh()
+        for name, log in scheduler.status()["logs"].items():
+            print(f"--- {name} ---\n{log.strip()}")
+        print("\n".join(format_status(scheduler.status())))
+        sys.exit(0 if ok else 1)
+
+    print(f"Refreshing now and every {args.interval_hours:g}h (Ctrl+C to stop)")
+    try:
+        while True:
+            scheduler.refresh()
+            print("\n".join(format_status(scheduler.status())), flush=True)
+            time.sleep(args.interval_hours * 3600)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,208 @@
+"""
+Versioned index snapshots.
+
+Every core.embed build writes a fresh directory under data/snapshots/ and,
+once all files are on disk, switches the CURRENT pointer to it with one
+atomic rename. Readers (core.retrieve) follow CURRENT on every query, so
+they swap to a new build without a restart and never see a half-written
+index/chunk pair. Published snapshots are never modified, which also makes
+it safe to memory-map them.
+
+    data/snapshots/
+        CURRENT                      "20261017-093000-123"
+        20261017-093000-123/
+            snapshot.json            {"version", "created", ...}; written last
+            faiss.index
+            index_params.json
+            index_manifest.json
+            bm25.npz
+            chunkstore/
+
+The newest KEEP_VERSIONS snapshots are kept for rollback. Without a CURRENT
+pointer, the files directly under data/ (the pre-snapshot layout) are used.
+
+Run from the project root:
+    python -m core.snapshots list
+    python -m core.snapshots rollback [VERSION]
+    python -m core.snapshots prune --keep 3
+"""
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BASE_DIR = Path(__file__).resolve().parents[1]  # project root
+DATA_DIR = BASE_DIR / "data"
+SNAPSHOTS_DIR = DATA_DIR / "snapshots"
+CURRENT_NAME = "CURRENT"
+INFO_NAME = "snapshot.json"  # marks a complete snapshot
+
+KEEP_VERSIONS = int(os.environ.get("RAGNROLL_KEEP_VERSIONS", "3"))
+ABANDONED_AFTER_S = 6 * 3600  # unpublished build dirs older than this are removed by prune()
+LEGACY_VERSION = "legacy"
+
+
+class Snapshot:
+    """File paths of one index build."""
+
+    def __init__(self, root: Path, version: str):
+        self.root = Path(root)
+        self.version = version
+        self.faiss_path = self.root / "faiss.index"
+        self.params_path = self.root / "index_params.json"
+        self.manifest_path = self.root / "index_manifest.json"
+        self.bm25_path = self.root / "bm25.npz"
+        self.store_path = self.root / "chunkstore"
+
+    @property
+    def is_legacy(self) -> bool:
+        return self.version == LEGACY_VERSION
+
+    def info(self) -> Dict:
+        try:
+            return json.loads((self.root / INFO_NAME).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def __repr__(self) -> str:
+        return f"Snapshot({self.version!r}, {str(self.root)!r})"
+
+
+def legacy() -> Snapshot:
+    return Snapshot(DATA_DIR, LEGACY_VERSION)
+
+
+def _root(root: Optional[Path]) -> Path:
+    # Looked up per call, not bound as a default, so SNAPSHOTS_DIR can be redirected
+    return Path(root) if root is not None else SNAPSHOTS_DIR
+
+
+def read_current(root: Optional[Path] = None) -> Optional[str]:
+    try:
+        version = (_root(root) / CURRENT_NAME).read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+    return version or None
+
+
+def current(root: Optional[Path] = None) -> Snapshot:
+    """The published snapshot, or the legacy data/ files if nothing has been published yet."""
+    version = read_current(root)
+    if version is None:
+        return legacy()
+    return Snapshot(_root(root) / version, version)
+
+
+def list_versions(root: Optional[Path] = None) -> List[str]:
+    """Complete (published at some point) snapshots, oldest first."""
+    root = _root(root)
+    if not root.is_dir():
+        return []
+    return sorted(p.name for p in root.iterdir() if (p / INFO_NAME).exists())
+
+
+def begin(root: Optional[Path] = None) -> Snapshot:
+    """A new, empty snapshot directory; invisible to readers until publish()."""
+    root = _root(root)
+    root.mkdir(parents=True, exist_ok=True)
+    while True:
+        now = time.time()
+        version = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f"-{int(now * 1000) % 1000:03d}"
+        try:
+            (root / version).mkdir()
+            return Snapshot(root / version, version)
+        except FileExistsError:
+            time.sleep(0.001)
+
+
+def _set_current(root: Path, version: str) -> None:
+    tmp = Path(root) / (CURRENT_NAME + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, Path(root) / CURRENT_NAME)
+
+
+def publish(snap: Snapshot, info: Optional[Dict] = None) -> None:
+    """Mark snap complete and point CURRENT at it (atomic for readers)."""
+    meta = {"version": snap.version, "created": time.time(), **(info or {})}
+    (snap.root / INFO_NAME).write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    _set_current(snap.root.parent, snap.version)
+
+
+def rollback(version: Optional[str] = None, root: Optional[Path] = None) -> str:
+    """Point CURRENT at `version` (default: the snapshot before the current one)."""
+    versions = list_versions(root)
+    if version is None:
+        cur = read_current(root)
+        older = [v for v in versions if cur is None or v < cur]
+        if not older:
+            raise ValueError("No older snapshot to roll back to")
+        version = older[-1]
+    elif version not in versions:
+        raise ValueError(f"Unknown snapshot {version!r}; available: {versions}")
+    _set_current(_root(root), version)
+    return version
+
+
+def prune(keep: int = KEEP_VERSIONS, root: Optional[Path] = None) -> List[str]:
+    """
+    Delete all but the newest `keep` snapshots (the current one is always kept)
+    and abandoned build directories. Returns the removed versions.
+    """
+    root = _root(root)
+    if not root.is_dir():
+        return []
+    cur = read_current(root)
+    versions = list_versions(root)
+    keep_set = set(versions[-keep:] if keep > 0 else []) | {cur}
+    removed = []
+    for p in root.iterdir():
+        if not p.is_dir() or p.name in keep_set:
+            continue
+        if p.name not in versions and time.time() - p.stat().st_mtime < ABANDONED_AFTER_S:
+            continue  # possibly a build in progress
+        # A reader may still have files of an old snapshot mapped; on Windows the
+        # delete then fails and is retried by the next prune.
+        shutil.rmtree(p, ignore_errors=True)
+        if not p.exists():
+            removed.append(p.name)
+    return removed
+
+
+def _dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="List, roll back or prune index snapshots.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list")
+    rb = sub.add_parser("rollback", help="switch CURRENT to an older snapshot")
+    rb.add_argument("version", nargs="?", default=None, help="default: the one before the current")
+    pr = sub.add_parser("prune")
+    pr.add_argument("--keep", type=int, default=KEEP_VERSIONS)
+    args = ap.parse_args()
+
+    if args.cmd == "list":
+        cur = read_current()
+        versions = list_versions()
+        if not versions:
+            print(f"No snapshots in {SNAPSHOTS_DIR} (serving the files in {DATA_DIR})")
+        for v in versions:
+            snap = Snapshot(SNAPSHOTS_DIR / v, v)
+            info = snap.info()
+            print(
+                f"{'*' if v == cur else ' '} {v}  chunks={info.get('chunks', '?'):<7} "
+                f"articles={info.get('articles', '?'):<6} {_dir_size(snap.root) / 2**20:7.1f} MiB"
+            )
+    elif args.cmd == "rollback":
+        print(f"CURRENT -> {rollback(args.version)}")
+    else:
+        removed = prune(args.keep)
+        print(f"Removed {len(removed)} snapshot(s): {', '.join(removed) or '-'}")
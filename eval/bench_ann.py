@@ -0,0 +1,129 @@
+"""
+Benchmark: recall vs latency of approximate indexes against the exact flat index.
+
+By default uses a synthetic clustered corpus (normalized 384-d vectors, like
+MiniLM embeddings) so large sizes can be tested without embedding anything.
+--real uses the vectors of the current index snapshot (flat indexes only).
+
+Run from the project root:
+    python -m eval.bench_ann --n 100000 --queries 500
+"""
+import argparse
+import time
+from typing import Dict, List
+
+import faiss
+import numpy as np
+
+from core import snapshots
+from core.ann import apply_search_params, filtered_search_params, make_index, train_index
+
+
+def synthetic_corpus(n: int, dim: int, n_clusters: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype("float32")
+    x = centers[rng.integers(0, n_clusters, n)] + 0.6 * rng.standard_normal((n, dim)).astype("float32")
+    faiss.normalize_L2(x)
+    return x
+
+
+def real_corpus() -> np.ndarray:
+    index = faiss.read_index(str(snapshots.current().faiss_path))
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if not isinstance(inner, faiss.IndexFlat):
+        raise SystemExit("--real needs a flat index (python -m core.embed --index-type flat)")
+    return inner.reconstruct_n(0, inner.ntotal)
+
+
+def make_queries(x: np.ndarray, n: int, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    q = x[rng.integers(0, len(x), n)] + 0.3 * rng.standard_normal((n, x.shape[1])).astype("float32")
+    faiss.normalize_L2(q)
+    return q
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def timed_search(index, q: np.ndarray, k: int, params=None):
+    # one query at a time, like interactive serving
+    t0 = time.perf_counter()
+    if params is None:
+        ids = np.vstack([index.search(q[i:i + 1], k)[1] for i in range(len(q))])
+    else:
+        ids = np.vstack([index.search(q[i:i + 1], k, params=params)[1] for i in range(len(q))])
+    return ids, (time.perf_counter() - t0) * 1000 / len(q)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=100_000, help="synthetic corpus size")
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--real", action="store_true", help="use vectors from the current index")
+    ap.add_argument("--threads", type=int, default=1, help="faiss OpenMP threads")
+    ap.add_argument("--filter-frac", type=float, default=0.05, help="slice kept by the filtered search (e.g. recent days)")
+    args = ap.parse_args()
+
+    faiss.omp_set_num_threads(args.threads)
+    x = real_corpus() if args.real else synthetic_corpus(args.n, args.dim, n_clusters=max(10, args.n // 500))
+    q = make_queries(x, args.queries)
+    ids = np.arange(len(x), dtype="int64")
+    print(f"Corpus: {len(x)} x {x.shape[1]} | queries: {len(q)} | k: {args.k}")
+
+    rows: List[Dict] = []
+    filtered: List[Dict] = []
+    truth = None
+    # The newest slice of the corpus, like a since= filter on a time-ordered corpus
+    allowed = ids[-max(1, int(len(ids) * args.filter_frac)):]
+    for index_type, sweep in (
+        ("flat", [{}]),
+        ("ivf_flat", [{"nprobe": p} for p in (1, 4, 8, 16, 32, 64)]),
+        ("ivf_pq", [{"nprobe": p} for p in (4, 16, 64)]),
+        ("hnsw", [{"efSearch": e} for e in (16, 32, 64, 128)]),
+    ):
+        t0 = time.perf_counter()
+        index, params = make_index(index_type, x.shape[1], len(x))
+        train_index(index, x)
+        index.add_with_ids(x, ids)
+        build_s = time.perf_counter() - t0
+
+        for overrides in sweep:
+            if "nprobe" in overrides and overrides["nprobe"] > params.get("nlist", 0):
+                continue
+            apply_search_params(index, {**params, **overrides})
+            found, ms = timed_search(index, q, args.k)
+            if truth is None:
+                truth = found
+            rows.append({
+                "type": params["type"],
+                "setting": ", ".join(f"{k}={v}" for k, v in overrides.items()) or "-",
+                "build_s": build_s,
+                "recall": recall_at_k(found, truth),
+                "ms": ms,
+            })
+
+        apply_search_params(index, params)
+        _, full_ms = timed_search(index, q, args.k)
+        _, sel_ms = timed_search(index, q, args.k, params=filtered_search_params(index, allowed))
+        filtered.append({"type": params["type"], "full_ms": full_ms, "filtered_ms": sel_ms})
+
+    base_ms = rows[0]["ms"]
+    print(f"\n{'index':<10} {'setting':<14} {'build s':>8} {f'recall@{args.k}':>10} {'ms/query':>9} {'speedup':>8}")
+    for r in rows:
+        print(
+            f"{r['type']:<10} {r['setting']:<14} {r['build_s']:>8.2f} {r['recall']:>10.3f} "
+            f"{r['ms']:>9.3f} {base_ms / r['ms']:>7.1f}x"
+        )
+
+    print(f"\nFiltered search over the newest {args.filter_frac:.0%} (ID selector, default params):")
+    print(f"{'index':<10} {'all ms':>9} {'filtered ms':>12}")
+    for r in filtered:
+        print(f"{r['type']:<10} {r['full_ms']:>9.3f} {r['filtered_ms']:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
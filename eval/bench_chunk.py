@@ -0,0 +1,101 @@
+"""
+Benchmark: character chunker vs sentence/token-aware chunker on the stored
+articles. Reports chunk counts, index size, tokens the encoder actually sees
+vs silently truncates, and chunking time (batched vs per-article
+tokenization). --embed also times encoding both chunk sets.
+
+Run from the project root:
+    python -m eval.bench_chunk --limit 200 --embed
+"""
+import argparse
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from core.chunk import chunk_corpus_by_tokens, chunk_text, load_tokenizer
+from core.db import get_conn
+
+EMBED_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+EMBED_MAX_TOKENS = 256
+EMBED_DIM = 384
+
+
+def load_texts(limit: int) -> List[str]:
+    rows = get_conn().execute(
+        "SELECT text FROM article_texts ORDER BY article_id DESC LIMIT ?", (limit,)
+    ).fetchall()
+    return [r[0] or "" for r in rows]
+
+
+def token_report(tokenizer, chunks: List[str], max_tokens: int) -> Dict[str, float]:
+    lengths = np.asarray(
+        [len(x) + 2 for x in tokenizer(chunks, add_special_tokens=False)["input_ids"]], dtype=np.int64
+    )
+    seen = np.minimum(lengths, max_tokens)
+    return {
+        "chunks": len(chunks),
+        "tokens_in": int(lengths.sum()),
+        "tokens_seen": int(seen.sum()),
+        "truncated": int((lengths - seen).sum()),
+        "truncated_chunks": int((lengths > max_tokens).sum()),
+        "index_kib": len(chunks) * EMBED_DIM * 4 / 1024,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--limit", type=int, default=200, help="newest N articles")
+    ap.add_argument("--max-tokens", type=int, default=EMBED_MAX_TOKENS)
+    ap.add_argument("--embed", action="store_true", help="also time encoding both chunk sets")
+    args = ap.parse_args()
+
+    texts = load_texts(args.limit)
+    tokenizer = load_tokenizer(EMBED_MODEL_NAME)
+    print(f"Articles: {len(texts)} | token budget: {args.max_tokens}")
+
+    t0 = time.perf_counter()
+    char_chunks = [c for t in texts for c in chunk_text(t)]
+    t_chars = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    looped = [c for t in texts for c in chunk_corpus_by_tokens([t], tokenizer, args.max_tokens)[0]]
+    t_looped = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    token_chunks = [c for doc in chunk_corpus_by_tokens(texts, tokenizer, args.max_tokens) for c in doc]
+    t_tokens = time.perf_counter() - t0
+    assert looped == token_chunks
+
+    rows = {
+        "chars (1200/200)": (token_report(tokenizer, char_chunks, args.max_tokens), t_chars),
+        "tokens (sentences)": (token_report(tokenizer, token_chunks, args.max_tokens), t_tokens),
+    }
+    print(f"\n{'chunker':<20}{'chunks':>8}{'index KiB':>11}{'tokens in':>11}{'encoded':>10}{'truncated':>11}{'chunk s':>9}")
+    for name, (r, secs) in rows.items():
+        print(
+            f"{name:<20}{r['chunks']:>8}{r['index_kib']:>11.0f}{r['tokens_in']:>11}"
+            f"{r['tokens_seen']:>10}{r['truncated']:>11}{secs:>9.3f}"
+        )
+    chars, tokens = rows["chars (1200/200)"][0], rows["tokens (sentences)"][0]
+    print(
+        f"\nCharacter chunks cut off by the encoder: {chars['truncated_chunks']}/{chars['chunks']} "
+        f"({chars['truncated'] / max(chars['tokens_in'], 1):.0%} of their tokens never embedded)"
+    )
+    print(f"Token-aware chunks cut off: {tokens['truncated_chunks']}/{tokens['chunks']}")
+    print(f"Tokenization: batched {t_tokens:.3f}s vs per-article {t_looped:.3f}s ({t_looped / max(t_tokens, 1e-9):.1f}x)")
+
+    if args.embed:
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(EMBED_MODEL_NAME)
+        model.encode(char_chunks[:32], batch_size=32)  # warm-up
+        for name, chunks in (("chars", char_chunks), ("tokens", token_chunks)):
+            t0 = time.perf_counter()
+            model.encode(chunks, batch_size=32, normalize_embeddings=True)
+            secs = time.perf_counter() - t0
+            print(f"Encode {name:<7}: {secs:.2f}s for {len(chunks)} chunks ({len(chunks) / secs:.1f} chunks/sec)")
+
+
+if __name__ == "__main__":
+    main()
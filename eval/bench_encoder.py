@@ -0,0 +1,104 @@
+"""
+Benchmark: encoder backends (torch / onnx / onnx-int8) on the indexed chunks.
+
+Parity is measured against the PyTorch model: per-text cosine between the
+two embeddings, and how many of each query's top-k chunk neighbours survive
+(the number that matters for retrieval). Throughput is chunks/sec and
+queries/sec per backend and intra-op thread count.
+
+Run from the project root (after `python -m core.encoder export --int8`):
+    python -m eval.bench_encoder --limit 2000 --threads 1 4
+"""
+import argparse
+import json
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from core.encoder import EMBED_MODEL_NAME, ENCODER_BACKENDS, get_encoder
+from core.retrieve import load_chunks
+
+QUERIES_PATH = "eval/queries.jsonl"
+
+
+def load_corpus(limit: int) -> List[str]:
+    store = load_chunks()
+    texts = []
+    for rec in store.records():
+        texts.append(rec["text"])
+        if len(texts) >= limit:
+            break
+    return texts
+
+
+def load_query_texts() -> List[str]:
+    with open(QUERIES_PATH, "r", encoding="utf-8") as f:
+        return [json.loads(line)["query"] for line in f if line.strip()]
+
+
+def parity(ref: np.ndarray, emb: np.ndarray, ref_q: np.ndarray, emb_q: np.ndarray, k: int) -> Dict[str, float]:
+    cos = (ref * emb).sum(axis=1)
+    top_ref = np.argsort(-(ref_q @ ref.T), axis=1)[:, :k]
+    top_new = np.argsort(-(emb_q @ emb.T), axis=1)[:, :k]
+    overlap = [len(set(a) & set(b)) / k for a, b in zip(top_ref, top_new)]
+    return {
+        "cos_mean": float(cos.mean()),
+        "cos_min": float(cos.min()),
+        f"top{k}_overlap": float(np.mean(overlap)),
+    }
+
+
+def timed(encoder, texts: List[str], batch_size: int) -> float:
+    t0 = time.perf_counter()
+    encoder.encode(texts, batch_size=batch_size)
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--limit", type=int, default=2000, help="chunks to encode")
+    ap.add_argument("--backends", nargs="*", default=list(ENCODER_BACKENDS), choices=ENCODER_BACKENDS)
+    ap.add_argument("--threads", nargs="*", type=int, default=[0], help="intra-op threads (0 = library default)")
+    ap.add_argument("--batch-size", type=int, default=32)
+    ap.add_argument("--k", type=int, default=10)
+    args = ap.parse_args()
+
+    corpus = load_corpus(args.limit)
+    queries = load_query_texts()
+    print(f"Chunks: {len(corpus)} | queries: {len(queries)} | model: {EMBED_MODEL_NAME}")
+
+    ref = get_encoder("torch")
+    ref_emb = ref.encode(corpus, batch_size=args.batch_size)
+    ref_q = ref.encode(queries, batch_size=args.batch_size)
+
+    print(
+        f"\n{'backend':<11}{'threads':>8}{'load s':>8}{'chunks/s':>10}{'queries/s':>11}"
+        f"{'cos mean':>10}{'cos min':>9}{f'top{args.k} same':>11}"
+    )
+    for backend in args.backends:
+        for threads in args.threads:
+            t0 = time.perf_counter()
+            enc = get_encoder(backend, threads=threads or None)
+            load_s = time.perf_counter() - t0
+            enc.encode(corpus[:args.batch_size], batch_size=args.batch_size)  # warm-up
+
+            corpus_s = timed(enc, corpus, args.batch_size)
+            t0 = time.perf_counter()
+            for q in queries:
+                enc.encode([q])  # one at a time, like interactive questions
+            query_s = time.perf_counter() - t0
+
+            p = parity(
+                ref_emb, enc.encode(corpus, batch_size=args.batch_size),
+                ref_q, enc.encode(queries, batch_size=args.batch_size), args.k,
+            )
+            print(
+                f"{backend:<11}{threads or '-':>8}{load_s:>8.2f}{len(corpus) / corpus_s:>10.1f}"
+                f"{len(queries) / query_s:>11.1f}{p['cos_mean']:>10.4f}{p['cos_min']:>9.4f}"
+                f"{p[f'top{args.k}_overlap']:>11.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
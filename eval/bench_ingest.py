@@ -0,0 +1,85 @@
+"""
+Benchmark: sequential vs concurrent article fetching against a local HTTP
+stand-in server (no network needed). Each page sleeps `--delay` seconds before
+responding to simulate publisher latency.
+
+Run from the project root:
+    python -m eval.bench_ingest --n 40 --delay 0.2
+"""
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.ingest import clean_text, fetch_article_text, fetch_many
+
+PARAGRAPH = (
+    "Researchers released a new open model for on-device assistants this week, "
+    "claiming lower latency and better battery life than previous releases. "
+)
+
+
+def make_handler(delay: float):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            n = self.path.rstrip("/").split("/")[-1]
+            paras = "".join(f"<p>Article {n}. {PARAGRAPH * 3}</p>" for _ in range(4))
+            body = (
+                f"<html><head><title>Article {n}</title></head>"
+                f"<body><article><h1>Article {n}</h1>{paras}</article></body></html>"
+            ).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=40, help="number of articles")
+    ap.add_argument("--delay", type=float, default=0.2, help="server latency per request (s)")
+    ap.add_argument("--hosts", type=int, default=2, help="distinct host names (per-host limit applies)")
+    ap.add_argument("--workers", type=int, default=16)
+    ap.add_argument("--per-host", type=int, default=4)
+    args = ap.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.delay))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    # 127.0.0.1 / localhost / ... resolve to the same server but count as distinct hosts
+    host_names = ["127.0.0.1", "localhost"][: max(1, args.hosts)]
+    urls = [
+        f"http://{host_names[i % len(host_names)]}:{port}/article/{i}"
+        for i in range(args.n)
+    ]
+
+    t0 = time.perf_counter()
+    seq = [clean_text(fetch_article_text(u)) for u in urls]
+    t_seq = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    conc = fetch_many(urls, max_workers=args.workers, per_host=args.per_host)
+    t_conc = time.perf_counter() - t0
+
+    server.shutdown()
+
+    in_order = all(f"Article {i}." in text for i, text in enumerate(conc))
+    ok = sum(1 for t in conc if t)
+
+    print(f"Articles: {args.n} | server delay: {args.delay:.2f}s | hosts: {len(host_names)}")
+    print(f"sequential : {t_seq:6.2f}s | {args.n / t_seq:6.1f} articles/sec")
+    print(f"concurrent : {t_conc:6.2f}s | {args.n / t_conc:6.1f} articles/sec")
+    print(f"Speedup: {t_seq / t_conc:.1f}x | extracted: {ok}/{args.n} | order preserved: {in_order}")
+    print(f"Same text as sequential: {sum(a == b for a, b in zip(seq, conc))}/{args.n}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark: looping over retrieve() vs one batched retrieve_many() call, plus
+per-query latency of each retrieval mode (dense / lexical / hybrid).
+
+Run from the project root:
+    python -m eval.bench_retrieve --n 200 --top-k 5 --mode hybrid
+"""
+import argparse
+import time
+from typing import List
+
+from core.retrieve import RETRIEVAL_MODES, get_retriever, load_chunks
+
+SEED_QUESTIONS = [
+    "What is happening in technology news today?",
+    "What did Google announce?",
+    "Latest news about AI models",
+    "Which companies are building new chips?",
+    "What is new with smartphones?",
+    "Any news about electric vehicles?",
+    "What happened with social media regulation?",
+    "Who is investing in data centers?",
+]
+
+
+def build_queries(n: int) -> List[str]:
+    """Seed questions plus chunk titles, repeated up to n queries."""
+    store = load_chunks()
+    pool = SEED_QUESTIONS + sorted({a.get("title", "") for a in store.articles.values()} - {""})
+    return [pool[i % len(pool)] for i in range(n)]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200, help="number of queries")
+    ap.add_argument("--top-k", type=int, default=5)
+    ap.add_argument("--mode", default="dense", choices=RETRIEVAL_MODES)
+    args = ap.parse_args()
+
+    retriever = get_retriever()
+    queries = build_queries(args.n)
+
+    # Warm up: model + index load, first encode
+    retriever.retrieve(queries[0], top_k=args.top_k, mode=args.mode)
+
+    t0 = time.perf_counter()
+    looped = [retriever.retrieve(q, top_k=args.top_k, mode=args.mode) for q in queries]
+    t_loop = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    batched = retriever.retrieve_many(queries, top_k=args.top_k, mode=args.mode)
+    t_batch = time.perf_counter() - t0
+
+    same = sum(
+        [h["meta"].get("chunk_id") for h in a] == [h["meta"].get("chunk_id") for h in b]
+        for a, b in zip(looped, batched)
+    )
+
+    print(f"Queries: {len(queries)} | top_k: {args.top_k} | mode: {args.mode}")
+    print(f"retrieve() loop : {t_loop:.3f}s | {len(queries) / t_loop:8.1f} queries/sec")
+    print(f"retrieve_many() : {t_batch:.3f}s | {len(queries) / t_batch:8.1f} queries/sec")
+    print(f"Speedup: {t_loop / t_batch:.1f}x | identical top-k: {same}/{len(queries)}")
+
+    print("\nPer-query latency by mode (retrieve() loop):")
+    base = None
+    for mode in RETRIEVAL_MODES:
+        t0 = time.perf_counter()
+        for q in queries:
+            retriever.retrieve(q, top_k=args.top_k, mode=mode)
+        ms = (time.perf_counter() - t0) * 1000 / len(queries)
+        base = base or ms
+        print(f"  {mode:<8} {ms:8.2f} ms/query | {ms / base:4.1f}x dense")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark: cold start of the app and the CLIs, each in a fresh interpreter.
+
+    import     wall time of `import core.rag` / `import core.retrieve`, the
+               heaviest packages from `python -X importtime`, and numpy's
+               share (the one heavy package still imported eagerly)
+    app        `python app/app.py` in Streamlit bare mode (script runs top to
+               bottom once, like the first render)
+    CLIs       `python -m core.retrieve` / `python -m core.rag`: time until the
+               question prompt appears, then, after --think seconds of "typing",
+               time until the results print, with and without background warm-up
+
+Run from the project root:
+    python -m eval.bench_startup --repeat 3 --think 5
+"""
+import argparse
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+QUESTION = "What is happening in technology news today?"
+
+# module -> text printed once retrieval has finished
+CLIS = {
+    "core.retrieve": "Top evidence",
+    "core.rag": "Answer:",
+}
+
+
+def _env(**extra: str) -> Dict[str, str]:
+    env = dict(os.environ, PYTHONUNBUFFERED="1", **extra)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")]))
+    return env
+
+
+def import_profile(args: List[str]) -> Tuple[float, Dict[str, float]]:
+    """Wall seconds and import seconds per top-level package (self time, summed over submodules)."""
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        env=_env(), capture_output=True, text=True, encoding="utf-8", errors="replace",
+    )
+    wall = time.perf_counter() - t0
+    if proc.returncode != 0:
+        errors = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(errors[-1] if errors else f"exit code {proc.returncode}")
+    packages: Dict[str, float] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(self_us) / 1e6
+    return wall, packages
+
+
+class _Reader:
+    """Collects a process's stdout in a thread so we can wait for markers with a timeout."""
+
+    def __init__(self, proc: subprocess.Popen):
+        self.text = ""
+        self._chunks: "queue.Queue[str]" = queue.Queue()
+        threading.Thread(target=self._pump, args=(proc.stdout,), daemon=True).start()
+
+    def _pump(self, stream) -> None:
+        for ch in iter(lambda: stream.read(1), ""):
+            self._chunks.put(ch)
+
+    def wait_for(self, marker: str, timeout: float) -> bool:
+        deadline = time.perf_counter() + timeout
+        while marker not in self.text:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return False
+            try:
+                self.text += self._chunks.get(timeout=remaining)
+            except queue.Empty:
+                return False
+        return True
+
+
+def cli_timing(module: str, marker: str, think: float, warm_up: bool, timeout: float) -> Tuple[float, float]:
+    """(seconds to the prompt, seconds from entering the question to `marker`)."""
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", module],
+        env=_env(RAGNROLL_WARMUP="1" if warm_up else "0"),
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        text=True, encoding="utf-8", errors="replace",
+    )
+    try:
+        reader = _Reader(proc)
+        if not reader.wait_for("Ask", timeout):
+            raise RuntimeError(f"{module}: no prompt within {timeout}s")
+        prompt_s = time.perf_counter() - t0
+        time.sleep(think)
+        t1 = time.perf_counter()
+        proc.stdin.write(QUESTION + "\n")
+        proc.stdin.flush()
+        if not reader.wait_for(marker, timeout):
+            raise RuntimeError(f"{module}: no results within {timeout}s:\n{reader.text[-500:]}")
+        return prompt_s, time.perf_counter() - t1
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--think", type=float, default=5.0, help="seconds between prompt and question")
+    ap.add_argument("--timeout", type=float, default=300.0)
+    ap.add_argument("--top", type=int, default=8, help="heaviest packages to list")
+    args = ap.parse_args()
+
+    print(f"Python {sys.version.split()[0]} | median of {args.repeat} runs\n")
+    for target, argv in (
+        ("import core.retrieve", ["-c", "import core.retrieve"]),
+        ("import core.rag", ["-c", "import core.rag"]),
+        ("app/app.py (bare)", ["app/app.py"]),
+    ):
+        try:
+            runs = [import_profile(argv) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"{target:<22} failed: {e}")
+            continue
+        wall = float(np.median([w for w, _ in runs]))
+        print(f"{target:<22} {wall:6.2f}s")
+        heaviest = sorted(runs[-1][1].items(), key=lambda kv: -kv[1])[:args.top]
+        print("    " + ", ".join(f"{name} {secs:.2f}s" for name, secs in heaviest))
+        numpy_s = float(np.median([packages.get("numpy", 0.0) for _, packages in runs]))
+        print(f"    numpy {numpy_s:.2f}s ({numpy_s / wall:.0%} of the import)")
+
+    print(f"\n{'CLI':<16}{'warm-up':>9}{'to prompt s':>13}{'answer s':>10}  (question sent after {args.think:g}s)")
+    for module, marker in CLIS.items():
+        for warm in (False, True):
+            runs = [cli_timing(module, marker, args.think, warm, args.timeout) for _ in range(args.repeat)]
+            prompt_s = float(np.median([p for p, _ in runs]))
+            answer_s = float(np.median([a for _, a in runs]))
+            print(f"{module:<16}{'on' if warm else 'off':>9}{prompt_s:>13.2f}{answer_s:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+Retrieval evaluation harness: quality (recall@k, MRR, nDCG@k) and speed
+(p50/p95/p99 latency, batch throughput) for each retrieval configuration,
+written to a JSON report that can be compared against a baseline.
+
+Query set (JSON lines), relevance is judged per article:
+    {"query": "...", "relevant_urls": ["https://..."]}
+    {"query": "...", "relevant_article_ids": [12, 40]}
+
+Run from the project root:
+    python -m eval.harness make-queries --n 100            # pseudo-labels from the index
+    python -m eval.harness run --out eval/reports/today.json
+    python -m eval.harness compare eval/reports/base.json eval/reports/today.json
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from core.chunk import split_sentences
+from core.rerank import RERANK_CANDIDATES
+from core.retrieve import Retriever, get_retriever, load_chunks
+
+QUERIES_PATH = Path("eval/queries.jsonl")
+REPORTS_DIR = Path("eval/reports")
+
+# name -> retrieval settings
+CONFIGS: Dict[str, Dict] = {
+    "dense": {"mode": "dense", "rerank": False},
+    "lexical": {"mode": "lexical", "rerank": False},
+    "hybrid": {"mode": "hybrid", "rerank": False},
+    "hybrid+rerank": {"mode": "hybrid", "rerank": True},
+}
+
+# Regression thresholds for `compare`
+QUALITY_TOLERANCE = 0.02   # absolute drop in recall / MRR / nDCG
+LATENCY_TOLERANCE = 0.25   # relative rise in p95 latency
+
+
+# -----------------------------
+# Query sets
+# -----------------------------
+def load_queries(path: Path = QUERIES_PATH) -> List[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def make_queries(n: int = 100, seed: int = 0, words: int = 12) -> List[Dict]:
+    """
+    Pseudo-labeled queries from the indexed articles: each article contributes
+    its title and a sentence from its body (first `words` words), both labeled
+    with the article's URL.
+    """
+    rng = random.Random(seed)
+    store = load_chunks()
+    sentences: Dict[int, List[str]] = {}
+    for rec in store.records():
+        aid = rec["meta"]["article_id"]
+        sentences.setdefault(aid, []).extend(
+            s for s in split_sentences(rec["text"]) if len(s.split()) >= 8
+        )
+
+    queries = []
+    for aid_str, meta in store.articles.items():
+        url = meta.get("url")
+        if not url:
+            continue
+        if meta.get("title"):
+            queries.append({"query": meta["title"], "relevant_urls": [url], "kind": "title"})
+        body = sentences.get(int(aid_str)) or []
+        if len(body) > 1:
+            sentence = rng.choice(body[1:])  # skip the lead, which often restates the title
+            queries.append({"query": " ".join(sentence.split()[:words]), "relevant_urls": [url], "kind": "sentence"})
+    rng.shuffle(queries)
+    return queries[:n]
+
+
+# -----------------------------
+# Metrics
+# -----------------------------
+def _article_key(doc: Dict) -> str:
+    meta = doc.get("meta", {})
+    return meta.get("url") or str(meta.get("article_id"))
+
+
+def ranked_articles(docs: List[Dict]) -> List[Dict]:
+    """Chunks -> articles in order of their best chunk (several chunks of one article count once)."""
+    seen = set()
+    out = []
+    for d in docs:
+        key = _article_key(d)
+        if key not in seen:
+            seen.add(key)
+            out.append(d)
+    return out
+
+
+def is_relevant(doc: Dict, q: Dict) -> bool:
+    meta = doc.get("meta", {})
+    return meta.get("url") in q.get("relevant_urls", ()) or meta.get("article_id") in q.get("relevant_article_ids", ())
+
+
+def score_query(docs: List[Dict], q: Dict, k: int) -> Dict[str, float]:
+    ranked = ranked_articles(docs)[:k]
+    rel = np.asarray([is_relevant(d, q) for d in ranked], dtype=np.float64)
+    n_rel = len(q.get("relevant_urls", ())) + len(q.get("relevant_article_ids", ()))
+    if not n_rel:
+        return {"recall": 0.0, "mrr": 0.0, "ndcg": 0.0}
+    hits = np.flatnonzero(rel)
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    ideal = discounts[: min(n_rel, k)].sum()  # over k positions, even when fewer came back
+    return {
+        "recall": float(rel.sum() / n_rel),
+        "mrr": float(1.0 / (hits[0] + 1)) if len(hits) else 0.0,
+        "ndcg": float((rel * discounts[: len(rel)]).sum() / ideal),
+    }
+
+
+def percentiles_ms(seconds: List[float]) -> Dict[str, float]:
+    ms = np.asarray(seconds, dtype=np.float64) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {"mean": float(ms.mean()), "p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+
+# -----------------------------
+# Running configurations
+# -----------------------------
+def _searcher(retriever: Retriever, cfg: Dict, k: int) -> Callable[[str], List[Dict]]:
+    # Fetch extra chunks so k distinct articles survive article-level de-duplication
+    n = max(k * 3, RERANK_CANDIDATES if cfg["rerank"] else 0)
+
+    def run(query: str) -> List[Dict]:
+        docs = retriever.retrieve(query, top_k=n, mode=cfg["mode"])
+        if cfg["rerank"]:
+            from core.rerank import get_reranker
+
+            docs, _ = get_reranker().rerank(query, docs, top_k=k * 3)
+        return docs
+
+    return run
+
+
+def evaluate(
+    queries: List[Dict],
+    configs: Dict[str, Dict] = CONFIGS,
+    k: int = 5,
+    retriever: Optional[Retriever] = None,
+) -> Dict:
+    retriever = retriever or get_retriever()
+    texts = [q["query"] for q in queries]
+    report = {
+        "created": time.time(),
+        "k": k,
+        "queries": len(queries),
+        "index_version": list(retriever.current_version() or []),
+        "configs": {},
+    }
+
+    for name, cfg in configs.items():
+        search = _searcher(retriever, cfg, k)
+        search(texts[0])  # warm-up: model loads, caches
+
+        latencies = []
+        scores = []
+        for q in queries:
+            t0 = time.perf_counter()
+            docs = search(q["query"])
+            latencies.append(time.perf_counter() - t0)
+            scores.append(score_query(docs, q, k))
+
+        throughput = None
+        if not cfg["rerank"]:
+            t0 = time.perf_counter()
+            retriever.retrieve_many(texts, top_k=k * 3, mode=cfg["mode"])
+            throughput = len(texts) / (time.perf_counter() - t0)
+
+        report["configs"][name] = {
+            **cfg,
+            f"recall@{k}": float(np.mean([s["recall"] for s in scores])),
+            "mrr": float(np.mean([s["mrr"] for s in scores])),
+            f"ndcg@{k}": float(np.mean([s["ndcg"] for s in scores])),
+            "latency_ms": percentiles_ms(latencies),
+            "throughput_qps": throughput,
+        }
+    return report
+
+
+def format_report(report: Dict) -> str:
+    k = report["k"]
+    lines = [
+        f"Queries: {report['queries']} | k: {k}",
+        f"{'config':<16}{'recall@' + str(k):>10}{'MRR':>8}{'nDCG@' + str(k):>9}"
+        f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'batch q/s':>11}",
+    ]
+    for name, c in report["configs"].items():
+        lat = c["latency_ms"]
+        qps = f"{c['throughput_qps']:.1f}" if c.get("throughput_qps") else "-"
+        lines.append(
+            f"{name:<16}{c[f'recall@{k}']:>10.3f}{c['mrr']:>8.3f}{c[f'ndcg@{k}']:>9.3f}"
+            f"{lat['p50']:>9.2f}{lat['p95']:>9.2f}{lat['p99']:>9.2f}{qps:>11}"
+        )
+    return "\n".join(lines)
+
+
+def compare(
+    base: Dict,
+    new: Dict,
+    quality_tol: float = QUALITY_TOLERANCE,
+    latency_tol: float = LATENCY_TOLERANCE,
+) -> List[str]:
+    """Regressions of `new` against `base` (empty list = none)."""
+    k = new["k"]
+    problems = []
+    for name, c in new["configs"].items():
+        b = base["configs"].get(name)
+        if b is None:
+            continue
+        for metric in (f"recall@{k}", "mrr", f"ndcg@{k}"):
+            if metric in b and c[metric] < b[metric] - quality_tol:
+                problems.append(f"{name}: {metric} {b[metric]:.3f} -> {c[metric]:.3f}")
+        p95_base, p95_new = b["latency_ms"]["p95"], c["latency_ms"]["p95"]
+        if p95_new > p95_base * (1 + latency_tol):
+            problems.append(f"{name}: p95 latency {p95_base:.2f} ms -> {p95_new:.2f} ms")
+    return problems
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Retrieval quality + latency harness.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    mq = sub.add_parser("make-queries", help="write pseudo-labeled queries from the index")
+    mq.add_argument("--n", type=int, default=100)
+    mq.add_argument("--seed", type=int, default=0)
+    mq.add_argument("--out", type=Path, default=QUERIES_PATH)
+
+    run = sub.add_parser("run", help="evaluate every configuration")
+    run.add_argument("--queries", type=Path, default=QUERIES_PATH)
+    run.add_argument("--k", type=int, default=5)
+    run.add_argument("--configs", nargs="*", default=list(CONFIGS), choices=list(CONFIGS))
+    run.add_argument("--out", type=Path, default=None, help="report path (default eval/reports/<time>.json)")
+    run.add_argument("--baseline", type=Path, default=None, help="fail on regressions against this report")
+
+    cmp_ = sub.add_parser("compare", help="compare two reports")
+    cmp_.add_argument("base", type=Path)
+    cmp_.add_argument("new", type=Path)
+
+    args = ap.parse_args()
+
+    if args.cmd == "make-queries":
+        queries = make_queries(args.n, seed=args.seed)
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            for q in queries:
+                f.write(json.dumps(q, ensure_ascii=False) + "\n")
+        print(f"Wrote {len(queries)} pseudo-labeled queries to {args.out}")
+        return
+
+    if args.cmd == "compare":
+        base = json.loads(args.base.read_text(encoding="utf-8"))
+        new = json.loads(args.new.read_text(encoding="utf-8"))
+        print("Base:\n" + format_report(base) + "\n\nNew:\n" + format_report(new))
+        problems = compare(base, new)
+        print("\n" + ("\n".join("REGRESSION " + p for p in problems) if problems else "No regressions."))
+        sys.exit(1 if problems else 0)
+
+    queries = load_queries(args.queries)
+    report = evaluate(queries, {name: CONFIGS[name] for name in args.configs}, k=args.k)
+    out = args.out or REPORTS_DIR / time.strftime("%Y%m%d-%H%M%S.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(format_report(report))
+    print(f"\nReport: {out}")
+
+    if args.baseline:
+        problems = compare(json.loads(args.baseline.read_text(encoding="utf-8")), report)
+        for p in problems:
+            print("REGRESSION " + p)
+        sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,20 @@
-import json
-import numpy as np
+import argparse
 
-# Simple keyword-based relevance heuristic
-def is_relevant(question: str, chunk_text: str) -> bool:
-    keywords = question.lower().split()
-    text = chunk_text.lower()
-    return any(k in text for k in keywords)
+from core.eval import keyword_precision_at_k, precision_at_k
+from core.retrieve import RETRIEVAL_MODES, retrieve
 
-def precision_at_k(question, retrieved_chunks, k=5):
-    top_k = retrieved_chunks[:k]
-    relevant = sum(is_relevant(question, c["text"]) for c in top_k)
-    return relevant / k
+# Keyword-overlap Precision@k of what retrieval actually returns for a question.
+# For labeled recall / MRR / nDCG and latency, see eval/harness.py.
 
 if __name__ == "__main__":
-    question = "technology news today"
+    ap = argparse.ArgumentParser()
+    ap.add_argument("question", nargs="?", default="technology news today")
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--mode", default="hybrid", choices=RETRIEVAL_MODES)
+    args = ap.parse_args()
 
-    with open("data/chunks.jsonl", "r", encoding="utf-8") as f:
-        chunks = [json.loads(line) for line in f]
-
-    score = precision_at_k(question, chunks, k=5)
-    print(f"Precision@5: {score:.2f}")
+    docs = retrieve(args.question, top_k=args.k, mode=args.mode)
+    score = precision_at_k(args.question, docs, k=args.k)
+    print(f"Precision@{args.k}: {score:.2f}")
+    score = keyword_precision_at_k(args.question, docs, k=args.k)
+    print(f"Keyword precision@{args.k} (whole keywords, as BM25 sees them): {score:.2f}")
@@ -0,0 +1,202 @@
+"""
+Shared fixtures: a local HTTP stand-in for publishers and feeds (no network
+needed), a throwaway SQLite database / data directory per test, and a
+deterministic stand-in for the sentence encoder.
+"""
+import hashlib
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+WORDS = (
+    "model chip startup launch release privacy battery device network cloud server "
+    "researchers company engineers regulators market users update software hardware "
+    "security data training inference latency open source assistant phone laptop "
+    "announced reported expected quarter revenue growth policy court lawsuit deal"
+).split()
+
+FEED_ETAG = '"feed-v1"'
+FEED_LAST_MODIFIED = formatdate(usegmt=True)
+
+
+def article_paragraphs(n: int, k: int = 5):
+    rng = random.Random(n)
+    return [f"Article {n}. " + " ".join(rng.choices(WORDS, k=70)) + "." for _ in range(k)]
+
+
+def article_text(n: int) -> str:
+    """Cleaned text of article_html(n)."""
+    return "\n".join(article_paragraphs(n))
+
+
+def article_html(n: int, byline: str = "") -> str:
+    """A distinct article per n (so SimHash never collapses two of them)."""
+    paras = "".join(f"<p>{p}</p>" for p in article_paragraphs(n))
+    if byline:
+        paras += f"<p>{byline}</p>"
+    return (
+        f"<html><head><title>Article {n}</title></head>"
+        f"<body><article><h1>Article {n}</h1>{paras}</article></body></html>"
+    )
+
+
+class StandIn:
+    """
+    Serves /article/<n>[?delay=s] and /feed.xml (RSS with an ETag and
+    Last-Modified; 304 when the client sends the ETag back). /wire.xml is a
+    second feed syndicating the same stories as /wire/<n>, with a byline
+    added. Records the peak number of in-flight requests per Host header.
+    """
+
+    def __init__(self, delay: float = 0.0, feed_items: int = 5):
+        self.delay = delay
+        self.feed_items = feed_items
+        self.lock = threading.Lock()
+        self.active = defaultdict(int)
+        self.peak = defaultdict(int)
+        self.hits = defaultdict(int)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.port = self.server.server_address[1]
+
+    def url(self, path: str, host: str = "127.0.0.1") -> str:
+        return f"http://{host}:{self.port}{path}"
+
+    def _feed(self, prefix: str = "/article/", title: str = "Stand-in News") -> bytes:
+        items = "".join(
+            f"<item><title>Article {i}</title><link>{self.url(f'{prefix}{i}')}</link>"
+            f"<pubDate>{FEED_LAST_MODIFIED}</pubDate></item>"
+            for i in range(self.feed_items)
+        )
+        return (
+            f'<?xml version="1.0"?><rss version="2.0"><channel><title>{title}</title>'
+            f"{items}</channel></rss>"
+        ).encode("utf-8")
+
+    def _handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                host = self.headers.get("Host", "")
+                parts = urlsplit(self.path)
+                with stand_in.lock:
+                    stand_in.active[host] += 1
+                    stand_in.peak[host] = max(stand_in.peak[host], stand_in.active[host])
+                    stand_in.hits[parts.path] += 1
+                try:
+                    delay = float(parse_qs(parts.query).get("delay", [stand_in.delay])[0])
+                    time.sleep(delay)
+                    if parts.path in ("/feed.xml", "/wire.xml"):
+                        if self.headers.get("If-None-Match") == FEED_ETAG:
+                            self.send_response(304)
+                            self.end_headers()
+                            return
+                        if parts.path == "/wire.xml":
+                            feed = stand_in._feed("/wire/", "Stand-in Wire")
+                        else:
+                            feed = stand_in._feed()
+                        self._send(feed, "application/rss+xml", {
+                            "ETag": FEED_ETAG, "Last-Modified": FEED_LAST_MODIFIED,
+                        })
+                    elif parts.path.rstrip("/").split("/")[-1].isdigit():
+                        n = int(parts.path.rstrip("/").split("/")[-1])
+                        byline = "Distributed by Stand-in Wire." if parts.path.startswith("/wire/") else ""
+                        self._send(article_html(n, byline).encode("utf-8"), "text/html; charset=utf-8")
+                    else:
+                        self.send_error(404)
+                finally:
+                    with stand_in.lock:
+                        stand_in.active[host] -= 1
+
+            def _send(self, body: bytes, content_type: str, headers=None):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def stand_in():
+    server = StandIn()
+    threading.Thread(target=server.server.serve_forever, daemon=True).start()
+    yield server
+    server.server.shutdown()
+    server.server.server_close()
+
+
+@pytest.fixture
+def tmp_data(tmp_path, monkeypatch):
+    """Run in an empty project dir with its own SQLite database, caches, archive and metrics."""
+    from core import archive, db, embed_cache, metrics
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "data" / "ragnroll.db")
+    monkeypatch.setattr(embed_cache, "CACHE_PATH", tmp_path / "data" / "embed_cache.db")
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", tmp_path / "data" / "raw")
+    monkeypatch.setattr(metrics, "METRICS_DIR", tmp_path / "data" / "metrics")
+    return tmp_path
+
+
+class HashEncoder:
+    """Stands in for the sentence encoder: a fixed random unit vector per distinct text."""
+
+    dim = 16
+
+    def __init__(self):
+        self.calls = 0
+        self.texts = []  # everything encoded so far
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        self.calls += 1
+        self.texts.extend(texts)
+        out = np.empty((len(texts), self.dim), dtype="float32")
+        for i, text in enumerate(texts):
+            seed = int(hashlib.sha1(text.encode("utf-8")).hexdigest()[:8], 16)
+            out[i] = np.random.default_rng(seed).standard_normal(self.dim)
+        return out / np.linalg.norm(out, axis=1, keepdims=True)
+
+
+def store_article(conn, aid: int, text: str, published_ts: int = 0, source: str = "Stand-in News") -> None:
+    """Insert one article (metadata + text) directly, bypassing ingest."""
+    conn.execute(
+        "INSERT OR REPLACE INTO articles(id, url, title, source, published, published_ts) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (aid, f"https://example.com/{aid}", f"Article {aid}", source,
+         formatdate(published_ts or 1.7e9, usegmt=True), published_ts or int(1.7e9) + aid),
+    )
+    conn.execute("INSERT OR REPLACE INTO article_texts(article_id, text) VALUES (?, ?)", (aid, text))
+    conn.commit()
+
+
+@pytest.fixture
+def index_env(tmp_data, monkeypatch):
+    """tmp_data plus snapshots and the encoder kept inside it."""
+    from core import embed, retrieve, snapshots
+
+    encoder = HashEncoder()
+    monkeypatch.setattr(snapshots, "DATA_DIR", tmp_data / "data")
+    monkeypatch.setattr(snapshots, "SNAPSHOTS_DIR", tmp_data / "data" / "snapshots")
+    monkeypatch.setattr(embed, "get_encoder", lambda *a, **k: encoder)
+    monkeypatch.setattr(retrieve, "get_encoder", lambda *a, **k: encoder)
+    return encoder
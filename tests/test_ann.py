@@ -0,0 +1,66 @@
+"""FAISS index type selection and persisted search params (core.ann)."""
+import faiss
+import numpy as np
+import pytest
+
+from core import ann
+
+
+def test_auto_type_follows_corpus_size():
+    assert ann.resolve_index_type("auto", 10) == "flat"
+    assert ann.resolve_index_type("auto", ann.FLAT_MAX - 1) == "flat"
+    assert ann.resolve_index_type("auto", ann.FLAT_MAX) == "ivf_flat"
+    assert ann.resolve_index_type("auto", ann.IVF_FLAT_MAX) == "ivf_pq"
+    # PQ codebooks can't be trained on tiny corpora
+    assert ann.resolve_index_type("ivf_pq", ann.PQ_MIN_TRAIN - 1) == "ivf_flat"
+    assert ann.resolve_index_type("hnsw", 10) == "hnsw"
+    with pytest.raises(ValueError):
+        ann.resolve_index_type("lsh", 10)
+
+
+def test_fits_decides_when_to_rebuild():
+    flat = {"type": "flat"}
+    assert ann.fits(flat, "auto", 1_000)
+    assert not ann.fits(flat, "auto", ann.FLAT_MAX)  # grew into IVF territory
+    assert not ann.fits(flat, "hnsw", 1_000)  # a different type was asked for
+
+    ivf = {"type": "ivf_flat", "nlist": 400, "trained_on": 30_000}
+    assert ann.fits(ivf, "auto", 4 * 30_000)
+    assert not ann.fits(ivf, "auto", 4 * 30_000 + 1)  # centroids trained on a much smaller corpus
+    assert ann.fits({"type": "hnsw", "M": 32}, "hnsw", 10 ** 6)
+
+
+@pytest.mark.parametrize("index_type, n, inner", [
+    ("auto", 500, faiss.IndexFlatIP),
+    ("auto", ann.FLAT_MAX, faiss.IndexIVFFlat),
+    ("auto", ann.IVF_FLAT_MAX, faiss.IndexIVFPQ),
+    ("hnsw", 500, faiss.IndexHNSWFlat),
+])
+def test_make_index_builds_the_chosen_type(index_type, n, inner):
+    index, params = ann.make_index(index_type, 64, n)
+    assert params["type"] == ann.resolve_index_type(index_type, n) and params["dim"] == 64
+    base = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    assert isinstance(base, inner)
+    if "nlist" in params:
+        assert 1 <= params["nprobe"] <= params["nlist"] <= n // 39
+        assert base.nlist == params["nlist"]
+    if params["type"] == "ivf_pq":
+        assert 64 % params["pq_m"] == 0
+
+
+def test_search_params_survive_a_save_and_load(tmp_path):
+    rng = np.random.default_rng(0)
+    emb = rng.normal(size=(2_000, 16)).astype("float32")
+    emb /= np.linalg.norm(emb, axis=1, keepdims=True)
+    index, params = ann.make_index("ivf_flat", 16, 2_000)
+    ann.train_index(index, emb)
+    index.add_with_ids(emb, np.arange(2_000, dtype="int64") * 10)
+    params["nprobe"] = 5
+    faiss.write_index(index, str(tmp_path / "faiss.index"))
+    ann.save_params(tmp_path / "index_params.json", params)
+
+    loaded = ann.read_index(tmp_path / "faiss.index", tmp_path / "index_params.json", mmap=True)
+    assert faiss.extract_index_ivf(loaded).nprobe == 5
+    _, ids = loaded.search(emb[:3], 1)
+    assert ids[:, 0].tolist() == [0, 10, 20]
+    assert ann.load_params(tmp_path / "missing.json") == {"type": "flat"}
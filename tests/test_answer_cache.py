@@ -0,0 +1,77 @@
+"""Semantic answer cache (core.answer_cache)."""
+import numpy as np
+
+from core import answer_cache
+from core.answer_cache import MAX_ENTRIES, SIMILARITY_THRESHOLD, AnswerCache
+
+V1 = ("v1",)
+
+
+def unit(cos: float) -> np.ndarray:
+    """A unit vector whose cosine with [1, 0] is `cos`."""
+    return np.array([cos, np.sqrt(1 - cos ** 2)], dtype="float32")
+
+
+def put(cache, question, emb=None, version=V1, **kw):
+    cache.store(question, unit(1.0) if emb is None else emb, 5, version, f"answer: {question}", [], **kw)
+
+
+def get(cache, question, emb=None, version=V1, **kw):
+    hit = cache.lookup(question, unit(1.0) if emb is None else emb, 5, version, **kw)
+    return hit and hit["answer"]
+
+
+def test_exact_questions_match_after_normalization():
+    cache = AnswerCache()
+    put(cache, "What is new with AI chips?")
+    assert get(cache, "  what is new with   AI chips ", emb=unit(0.0)) == "answer: What is new with AI chips?"
+    assert get(cache, "What is new with AI chips?", scope="lexical") is None  # other retrieval settings
+    assert cache.lookup("What is new with AI chips?", unit(1.0), 3, V1) is None  # other top_k
+
+
+def test_similar_questions_match_at_the_threshold():
+    assert SIMILARITY_THRESHOLD == 0.95
+    cache = AnswerCache()
+    put(cache, "latest ai chips")
+    hit = cache.lookup("newest ai chips", unit(0.951), 5, V1)
+    assert hit["answer"] == "answer: latest ai chips"
+    assert abs(hit["similarity"] - 0.951) < 1e-4
+    assert get(cache, "newest gpus", emb=unit(0.949)) is None
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, "time", lambda: now[0])
+    cache = AnswerCache(ttl_seconds=60)
+    put(cache, "q")
+    now[0] += 59
+    assert get(cache, "q") == "answer: q"
+    now[0] += 2
+    assert get(cache, "q") is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = AnswerCache()
+    assert cache.max_entries == MAX_ENTRIES == 256
+    emb = np.eye(300, dtype="float32")  # unrelated questions: no semantic matches
+    for i in range(256):
+        put(cache, f"q{i}", emb=emb[i])
+    assert get(cache, "q0", emb=emb[0]) == "answer: q0"  # now the most recently used
+    put(cache, "q256", emb=emb[256])
+    assert len(cache) == 256
+    assert get(cache, "q1", emb=emb[1]) is None  # the oldest untouched entry went
+    assert get(cache, "q0", emb=emb[0]) == "answer: q0"
+    assert get(cache, "q256", emb=emb[256]) == "answer: q256"
+
+
+def test_new_index_version_clears_the_cache():
+    cache = AnswerCache()
+    put(cache, "q1")
+    put(cache, "q2", emb=unit(0.0))
+    assert get(cache, "q1", version=("v2",)) is None
+    assert len(cache) == 0
+    put(cache, "q1", version=("v2",))
+    assert get(cache, "q1", version=("v2",)) == "answer: q1"
+    assert get(cache, "q1", version=V1) is None  # rolled back: cleared again
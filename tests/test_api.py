@@ -0,0 +1,116 @@
+"""Micro-batching in core.api (no models or index needed)."""
+import asyncio
+
+import numpy as np
+import pytest
+
+from core import api
+
+
+class FakeRetriever:
+    def __init__(self):
+        self.calls = []
+
+    def search(self, q_emb, top_k=5, queries=None, mode="dense", since=None, sources=None):
+        self.calls.append((len(q_emb), top_k, since))
+        return [[{"text": q, "score": float(e[0])}] for q, e in zip(queries, q_emb)]
+
+
+def run_batch(fn, items, window_s=0.05):
+    async def main():
+        batcher = api.MicroBatcher("test", fn, window_s=window_s)
+        batcher.start()
+        try:
+            return await asyncio.gather(*(batcher.submit(x) for x in items), return_exceptions=True), batcher
+        finally:
+            await batcher.stop()
+
+    return asyncio.run(main())
+
+
+def test_batch_failure_only_fails_the_bad_item():
+    calls = []
+
+    def fn(items):
+        calls.append(list(items))
+        if "bad" in items:
+            raise ValueError("bad item")
+        return [x.upper() for x in items]
+
+    results, _ = run_batch(fn, ["a", "bad", "c"])
+    assert results[0] == "A" and results[2] == "C"
+    assert isinstance(results[1], ValueError)
+    assert calls[0] == ["a", "bad", "c"]  # one batch, then one retry per item
+    assert sorted(map(tuple, calls[1:])) == [("a",), ("bad",), ("c",)]
+
+
+def test_ask_searches_share_one_index_call(monkeypatch):
+    retriever = FakeRetriever()
+    monkeypatch.setattr(api, "get_retriever", lambda: retriever)
+    items = [
+        api._Search(np.full(4, i, dtype="float32"), f"q{i}", 30, "dense", None, ())
+        for i in range(6)
+    ]
+    items.append(api._Search(np.zeros(4, dtype="float32"), "q-since", 30, "dense", 1.0, ()))
+
+    results, batcher = run_batch(api._search_batch, items)
+    assert batcher.batches == 1
+    assert sorted(retriever.calls) == [(1, 30, 1.0), (6, 30, None)]  # one call per filter set
+    for item, docs in zip(items, results):
+        assert docs[0]["text"] == item.query
+        assert docs[0]["score"] == float(item.q_emb[0])
+
+
+def test_rag_answer_stream_searches_through_the_given_callable(monkeypatch):
+    from core import rag
+
+    monkeypatch.setattr(rag, "get_answer_cache", lambda: None)
+    seen = []
+
+    class Retriever:
+        def current_version(self):
+            return ("v1",)
+
+        def search(self, *args, **kwargs):
+            pytest.fail("search= should replace retriever.search")
+
+    def search(q_emb, top_k=5, queries=None, mode="dense", since=None, sources=None):
+        seen.append(queries)
+        return [[{"meta": {"chunk_id": 1}, "text": "chunk"}]]
+
+    _, docs, _ = rag.rag_answer_stream(
+        "who makes chips", retriever=Retriever(), q_emb=np.ones((1, 4), dtype="float32"),
+        rerank=False, context_budget=None, search=search,
+    )
+    assert seen == [["who makes chips"]] and docs[0]["text"] == "chunk"
+
+
+def test_many_concurrent_asks_do_not_starve_the_batcher(monkeypatch):
+    # More /ask requests than default-pool threads, each blocking on search_batcher
+    from core import rag
+
+    class Retriever(FakeRetriever):
+        def encode(self, texts):
+            return np.ones((len(texts), 4), dtype="float32")
+
+        def current_version(self):
+            return ("v1",)
+
+    retriever = Retriever()
+    monkeypatch.setattr(api, "get_retriever", lambda: retriever)
+    monkeypatch.setattr(rag, "get_retriever", lambda: retriever)
+    monkeypatch.setattr(rag, "get_answer_cache", lambda: None)
+
+    async def main():
+        for b in (api.encode_batcher, api.search_batcher):
+            b.start()
+        try:
+            reqs = [api.AskRequest(question=f"q{i}", rerank=False, context_budget=None) for i in range(40)]
+            return await asyncio.wait_for(asyncio.gather(*(api._prepare(r) for r in reqs)), 30)
+        finally:
+            for b in (api.encode_batcher, api.search_batcher):
+                await b.stop()
+
+    out = asyncio.run(main())
+    assert [docs[0]["text"] for _, docs, _ in out] == [f"q{i}" for i in range(40)]
+    assert len(retriever.calls) < 40  # searches were batched
@@ -0,0 +1,43 @@
+"""Raw page archive (core.archive): re-extraction of archived pages."""
+import time
+
+from core import archive
+from core.db import get_conn
+
+from conftest import article_html
+
+URL = "https://example.com/story"
+ENTRY = {"url": URL, "title": "A story", "source": "Example News", "published": ""}
+
+
+def archive_page(conn, url, html, entry):
+    sha = archive.put(html)
+    res = {"url": url, "sha256": sha, "fetched_at": time.time(), "size": len(html)}
+    archive.record(conn, [res], [entry])
+    conn.commit()
+
+
+def test_reprocess_stores_pages_that_were_archived_but_never_stored(tmp_data):
+    # e.g. the extractor of the day returned too little text, so ingest skipped it
+    conn = get_conn()
+    archive_page(conn, URL, article_html(3), ENTRY)
+    archive_page(conn, "https://example.com/short", "<html><body><p>Sign in</p></body></html>",
+                 dict(ENTRY, url="https://example.com/short"))
+    assert [e["url"] for e, _ in archive.unstored_pages(conn)] == [URL, "https://example.com/short"]
+
+    counts = archive.reprocess(workers=1, dry_run=True)
+    assert counts["unstored"] == 2 and counts["inserted"] == 1
+    assert conn.execute("SELECT COUNT(*) FROM articles").fetchone() == (0,)
+
+    counts = archive.reprocess(workers=1)
+    assert counts["inserted"] == 1
+    title, source, text = conn.execute(
+        "SELECT a.title, a.source, t.text FROM articles a JOIN article_texts t ON t.article_id = a.id"
+    ).fetchone()
+    assert (title, source) == ("A story", "Example News")
+    assert "Article 3." in text
+
+    # Now it is an ordinary article; the too-short page stays pending
+    assert [e["url"] for e, _ in archive.unstored_pages(conn)] == ["https://example.com/short"]
+    counts = archive.reprocess(workers=1)
+    assert counts["articles"] == 1 and counts["unchanged"] == 1 and counts["inserted"] == 0
@@ -0,0 +1,90 @@
+"""Token-aware chunking helpers (core.chunk, core.embed.chunk_articles)."""
+import sys
+import types
+
+from core import chunk
+from core.embed import chunk_articles
+
+
+class FakeTokenizer:
+    def __call__(self, texts, add_special_tokens=False):
+        return {"input_ids": [t.split() for t in texts]}
+
+
+def test_tokenizer_is_loaded_once(monkeypatch):
+    loads = []
+
+    class AutoTokenizer:
+        @staticmethod
+        def from_pretrained(name):
+            loads.append(name)
+            return FakeTokenizer()
+
+    monkeypatch.setitem(sys.modules, "transformers", types.SimpleNamespace(AutoTokenizer=AutoTokenizer))
+    chunk.load_tokenizer.cache_clear()
+    try:
+        text = "Chips are getting faster. Models are getting smaller. " * 20
+        for _ in range(5):  # e.g. one call per streaming batch
+            assert chunk_articles([text, text], max_tokens=32)
+        assert len(loads) == 1
+    finally:
+        chunk.load_tokenizer.cache_clear()
+
+
+class PieceTokenizer:
+    """One token per 3 characters of each word, so long words cost many tokens."""
+
+    def __call__(self, texts, add_special_tokens=False):
+        return {"input_ids": [[0] * sum(-(-len(w) // 3) for w in t.split()) for t in texts]}
+
+    def count(self, text):
+        return len(self([text])["input_ids"][0])
+
+
+def sentence(tag, n_words):
+    return " ".join(f"{tag}{i}" for i in range(n_words)).capitalize() + "."
+
+
+def test_every_chunk_fits_the_token_budget():
+    tok = PieceTokenizer()
+    run_on = " ".join(["a"] * 10 + ["x" * 60] * 10) + "."  # word runs of equal length are uneven in tokens
+    giant_word = "Y" + "y" * 400 + "."
+    text = " ".join([sentence("w", 5), run_on, giant_word, sentence("v", 40)])
+    for overlap in (0, 1):
+        [chunks] = chunk.chunk_corpus_by_tokens([text], tok, max_tokens=32, overlap_sentences=overlap)
+        assert chunks
+        assert all(tok.count(c) <= 30 for c in chunks)  # 32 minus [CLS]/[SEP]
+    # Without overlap the pieces tile the text: nothing dropped, nothing repeated
+    [tiled] = chunk.chunk_corpus_by_tokens([text], tok, max_tokens=32, overlap_sentences=0)
+    assert "".join(tiled).replace(" ", "") == text.replace(" ", "")
+
+
+def test_overlap_sentences_are_repeated_between_chunks():
+    tok = FakeTokenizer()
+    sents = [sentence(f"s{k}w", 9) for k in range(8)]  # 9 tokens each: 3 fit in 30
+    text = " ".join(sents)
+
+    [chunks] = chunk.chunk_corpus_by_tokens([text], tok, max_tokens=32, overlap_sentences=1)
+    assert chunks[0] == " ".join(sents[0:3])
+    for prev, cur in zip(chunks, chunks[1:]):
+        assert cur.startswith(prev.split(". ")[-1].rstrip(".") + ".")
+    assert chunks[-1].endswith(sents[-1])
+
+    [plain] = chunk.chunk_corpus_by_tokens([text], tok, max_tokens=32, overlap_sentences=0)
+    assert plain == [" ".join(sents[i:i + 3]) for i in range(0, 8, 3)]
+    assert len(chunks) > len(plain)
+
+
+def test_batched_documents_keep_their_own_chunks():
+    tok = PieceTokenizer()
+    docs = [
+        " ".join(sentence(f"a{k}w", 12) for k in range(6)),
+        "",
+        " ".join(sentence(f"b{k}w", 30) for k in range(3)) + " " + "B" + "b" * 200 + ".",
+        sentence("c", 4),
+    ]
+    together = chunk.chunk_corpus_by_tokens(docs, tok, max_tokens=32)
+    assert together == [chunk.chunk_corpus_by_tokens([d], tok, max_tokens=32)[0] for d in docs]
+    assert [len(c) > 0 for c in together] == [True, False, True, True]
+    for prefix, chunks in zip("abc", [together[0], together[2], together[3]]):
+        assert all(w[0].lower() == prefix for c in chunks for w in c.split())
@@ -0,0 +1,81 @@
+"""Memory-mapped chunk store (core.chunkstore) and the chunks.jsonl migration."""
+import json
+
+import numpy as np
+
+from core import retrieve, snapshots
+from core.chunkstore import ChunkStore, parse_published, write_store
+
+
+def record(aid, idx, text, published="", source="Stand-in News"):
+    meta = {
+        "article_id": aid, "chunk_idx": idx, "chunk_id": aid * 10000 + idx,
+        "title": f"Article {aid}", "url": f"https://example.test/{aid}",
+        "source": source, "published": published,
+    }
+    return {"meta": meta, "text": text}
+
+
+RECORDS = [
+    record(2, 1, "second chunk of two — «ünïcode»", "Tue, 02 Jan 2024 10:00:00 GMT", "Wire"),
+    record(1, 0, "first chunk of one", "2024-01-01T08:00:00Z"),
+    record(2, 0, "first chunk of two", "Tue, 02 Jan 2024 10:00:00 GMT", "Wire"),
+    record(3, 0, "", "not a date"),
+]
+
+
+def test_round_trip_preserves_text_and_meta(tmp_path):
+    assert write_store(RECORDS, tmp_path / "store") == 4
+    store = ChunkStore(tmp_path / "store")
+    assert isinstance(store.chunk_ids, np.memmap)
+
+    by_id = {r["meta"]["chunk_id"]: r for r in RECORDS}
+    assert list(store.chunk_ids) == sorted(by_id)
+    assert [r["meta"]["chunk_id"] for r in store.records()] == sorted(by_id)
+    for rec in store.records():
+        assert rec == by_id[rec["meta"]["chunk_id"]]
+    assert store.get(20001) == by_id[20001]
+    assert store.get_many([30000, 99, 10000]) == [by_id[30000], None, by_id[10000]]
+
+
+def test_published_and_source_filters(tmp_path):
+    write_store(RECORDS, tmp_path / "store")
+    store = ChunkStore(tmp_path / "store")
+    jan2 = parse_published("Tue, 02 Jan 2024 10:00:00 GMT")
+    assert store.latest_published() == jan2
+
+    assert list(store.select()) == [10000, 20000, 20001, 30000]
+    assert list(store.select(since=jan2)) == [20000, 20001]
+    assert list(store.select(since=parse_published("2024-01-01T08:00:00Z"))) == [10000, 20000, 20001]
+    assert list(store.select(sources=["Wire"])) == [20000, 20001]
+    assert list(store.select(since=jan2, sources=["Stand-in News"])) == []
+    assert list(store.select(sources=["Nobody"])) == []
+
+
+def test_rewrite_replaces_the_store_in_place(tmp_path):
+    write_store(RECORDS, tmp_path / "store")
+    write_store(RECORDS[:1], tmp_path / "store")
+    assert len(ChunkStore(tmp_path / "store")) == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["store"]
+
+
+def test_load_chunks_migrates_legacy_jsonl(tmp_path, monkeypatch):
+    legacy = tmp_path / "chunks.jsonl"
+    with legacy.open("w", encoding="utf-8") as f:
+        for rec in RECORDS:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        f.write(json.dumps({"meta": {"title": "no ids"}, "text": "very old line"}) + "\n")
+    monkeypatch.setattr(retrieve, "CHUNKS_PATH", legacy)
+    monkeypatch.setattr(retrieve, "STORE_DIR", tmp_path / "chunkstore")
+    monkeypatch.setattr(snapshots, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(snapshots, "SNAPSHOTS_DIR", tmp_path / "snapshots")
+
+    store = retrieve.load_chunks()  # no snapshot published yet: the legacy layout
+    assert store.path == tmp_path / "chunkstore"
+    assert len(store) == len(RECORDS) + 1
+    assert store.get(20001)["text"] == RECORDS[0]["text"]
+    assert store.get(4) == {"meta": {"title": "no ids", "chunk_id": 4, "article_id": -1, "chunk_idx": 0},
+                            "text": "very old line"}  # chunk_id defaults to the line number
+
+    legacy.unlink()
+    assert len(retrieve.load_chunks()) == len(RECORDS) + 1  # migrated once, then read directly
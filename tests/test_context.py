@@ -0,0 +1,63 @@
+"""Prompt context packing (core.context)."""
+import numpy as np
+
+from core.context import HEADER_TOKENS, estimate_tokens, merge_by_article, pack_context
+
+Q = np.array([[1.0, 0.0]], dtype="float32")
+
+
+def encode(texts):
+    """On-topic sentences (mentioning chips) point at the question, the rest away."""
+    return np.array([[1.0, 0.0] if "chips" in t else [0.0, 1.0] for t in texts], dtype="float32")
+
+
+def chunk(aid, idx, text):
+    return {"meta": {"article_id": aid, "chunk_idx": idx, "title": f"Article {aid}"}, "text": text}
+
+
+def sentences(aid, n, topic="chips"):
+    return [f"Article {aid} sentence {i} is about {topic if i % 2 == 0 else 'weather'}." for i in range(n)]
+
+
+def split(text):
+    return [s + "." for s in text.rstrip(".").split(". ")] if text else []
+
+
+def test_chunks_of_an_article_merge_in_chunk_order():
+    a = sentences(1, 5)
+    docs = [
+        chunk(1, 2, " ".join(a[3:5])),
+        chunk(2, 0, "Another story entirely."),
+        chunk(1, 0, " ".join(a[0:2])),
+        chunk(1, 1, " ".join(a[1:4])),  # overlaps both neighbours by one sentence
+    ]
+    merged = merge_by_article(docs)
+    assert [m["meta"]["article_id"] for m in merged] == [1, 2]  # order of best-ranked chunk
+    assert merged[0]["sentences"] == a
+    assert merged[0]["text"] == " ".join(a)
+    assert merged[0]["merged_chunks"] == 3
+    assert merged[0]["meta"]["chunk_idx"] == 2  # header/meta of the best-ranked chunk
+    assert merged[1]["merged_chunks"] == 1
+
+
+def test_packing_respects_the_token_budget():
+    docs = [chunk(aid, i, " ".join(sentences(aid, 30)[i * 10:(i + 1) * 10])) for aid in range(4) for i in range(3)]
+    full = sum(estimate_tokens(d["text"]) for d in docs)
+    for budget in (200, 400, 800):
+        for q_emb, encode_fn in ((Q, encode), (None, None)):
+            sources, stats = pack_context(docs, q_emb, encode_fn, budget=budget)
+            used = HEADER_TOKENS * len(sources) + sum(estimate_tokens(s["text"]) for s in sources)
+            assert used <= budget < full
+            assert stats["sources"] == 4 and 4 <= stats["sentences_kept"] < stats["sentences_total"] == 120
+            for s in sources:  # what's kept stays in article order
+                aid = s["meta"]["article_id"]
+                kept = split(s["text"])
+                assert kept == [x for x in sentences(aid, 30) if x in kept]
+
+
+def test_off_topic_sentences_are_dropped_but_every_source_keeps_one():
+    docs = [chunk(1, 0, " ".join(sentences(1, 6))), chunk(2, 0, " ".join(sentences(2, 3, topic="rain")))]
+    sources, stats = pack_context(docs, Q, encode, budget=10_000)
+    assert split(sources[0]["text"]) == [s for s in sentences(1, 6) if "chips" in s]
+    assert len(split(sources[1]["text"])) == 1  # nothing relevant, but its citation survives
+    assert stats["sentences_kept"] == 4
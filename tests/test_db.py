@@ -0,0 +1,79 @@
+"""SQLite article store (core.db): migrations and full-text search."""
+import sqlite3
+
+from core import db
+from core.db import get_conn, load_texts, search_text
+
+# articles as created by the first release: bodies inline, no simhash/published_ts
+BASELINE_SCHEMA = """
+CREATE TABLE articles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT UNIQUE,
+    title TEXT,
+    source TEXT,
+    published TEXT,
+    text TEXT,
+    added_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE url_aliases (alias TEXT PRIMARY KEY, url TEXT);
+"""
+
+
+def make_baseline_db(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.executemany(
+        "INSERT INTO articles(url, title, source, published, text, added_at) VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            ("https://a.test/1", "Chip fab", "Wire", "Tue, 02 Jan 2024 10:00:00 GMT",
+             "A new chip fabrication plant opens in Arizona.", "2024-01-02 11:00:00"),
+            ("https://a.test/2", "Undated", "Wire", "", "Quantum startup raises funding.", "2024-01-03 09:00:00"),
+        ],
+    )
+    conn.execute("INSERT INTO url_aliases VALUES ('https://news.test/x', 'https://a.test/1')")
+    conn.commit()
+    conn.close()
+
+
+def test_baseline_database_is_migrated(tmp_data):
+    make_baseline_db(db.DB_PATH)
+    conn = get_conn()
+
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(articles)")}
+    if sqlite3.sqlite_version_info >= (3, 35):
+        assert "text" not in columns
+    else:
+        assert conn.execute("SELECT COUNT(*) FROM articles WHERE text IS NOT NULL").fetchone() == (0,)
+    assert {"simhash", "published_ts"} <= columns
+    assert "checked_at" in {row[1] for row in conn.execute("PRAGMA table_info(url_aliases)")}
+
+    assert load_texts(conn, [1, 2]) == {
+        1: "A new chip fabrication plant opens in Arizona.",
+        2: "Quantum startup raises funding.",
+    }
+    assert conn.execute("SELECT id, published_ts FROM articles ORDER BY id").fetchall() == [
+        (1, 1704189600),  # feed date
+        (2, 1704272400),  # no feed date: ingest time
+    ]
+    triggers = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    assert triggers == {"article_texts_ai", "article_texts_ad", "article_texts_au"}
+
+    # Migrated bodies are indexed, and the triggers keep the index in sync
+    assert [row[:2] for row in search_text(conn, "chip")] == [(1, "Chip fab")]
+    conn.execute("UPDATE article_texts SET text = 'Chip shortage eases.' WHERE article_id = 2")
+    conn.execute("DELETE FROM article_texts WHERE article_id = 1")
+    conn.commit()
+    assert [row[0] for row in search_text(conn, "chip")] == [2]
+    assert search_text(conn, "quantum") == []
+
+
+def test_search_text_ranks_better_matches_first(tmp_data):
+    from conftest import store_article
+
+    conn = get_conn()
+    store_article(conn, 1, "Chips are mentioned once among many other unrelated words here.")
+    store_article(conn, 2, "Chips chips chips: chip makers ship more chips.")
+    rows = search_text(conn, "chips", limit=5)
+    assert [row[0] for row in rows] == [2, 1]
+    assert rows[0][2] <= rows[1][2]  # bm25(): lower is better
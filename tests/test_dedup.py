@@ -0,0 +1,49 @@
+"""Near-duplicate chunk detection (core.dedup)."""
+import faiss
+import numpy as np
+
+from core.dedup import CHUNK_DUP_THRESHOLD, near_duplicate_matches
+
+
+def _reference(emb: np.ndarray, threshold: float) -> np.ndarray:
+    """The old dense n x n greedy pass: keep a row unless it matches an earlier kept row."""
+    sims = emb @ emb.T
+    match = np.full(len(emb), -1)
+    kept = []
+    for i in range(len(emb)):
+        hits = [j for j in kept if sims[i, j] >= threshold]
+        if hits:
+            match[i] = hits[int(np.argmax(sims[i, hits]))]
+        else:
+            kept.append(i)
+    return match
+
+
+def _corpus(n_base: int = 60, copies: int = 3, dim: int = 32, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    base = rng.normal(size=(n_base, dim))
+    rows = [base] + [base + rng.normal(scale=0.05, size=base.shape) for _ in range(copies)]
+    emb = np.concatenate(rows)[rng.permutation(n_base * (copies + 1))].astype("float32")
+    return emb / np.linalg.norm(emb, axis=1, keepdims=True)
+
+
+def test_blocked_matches_dense_greedy():
+    emb = _corpus()
+    expected = _reference(emb, CHUNK_DUP_THRESHOLD)
+    assert (expected >= 0).sum() > 0
+    for block in (7, 64, 1024):
+        assert np.array_equal(near_duplicate_matches(emb, block=block), expected)
+
+
+def test_matches_report_ids_of_indexed_vectors():
+    emb = _corpus(n_base=20, copies=1)
+    existing = faiss.IndexIDMap(faiss.IndexFlatIP(emb.shape[1]))
+    existing.add_with_ids(emb[:10], np.arange(1000, 1010, dtype="int64"))
+
+    match = near_duplicate_matches(emb[:10], existing, ids=np.arange(10))
+    assert list(match) == list(range(1000, 1010))
+
+    ids = np.arange(500, 500 + len(emb))
+    match = near_duplicate_matches(emb, ids=ids, block=5)
+    kept = set(ids[match < 0])
+    assert all(m in kept for m in match[match >= 0])
@@ -0,0 +1,123 @@
+"""Incremental index updates (core.embed.build_index) on a temporary data dir."""
+import json
+
+import faiss
+
+from core import snapshots
+from core.chunk import chunk_text
+from core.chunkstore import ChunkStore
+from core.db import get_conn
+from core.embed import MAX_CHUNKS_PER_ARTICLE, build_index
+
+from conftest import article_text, store_article
+
+
+def build(**kw):
+    build_index(chunker="chars", use_cache=False, **kw)
+
+
+def chunks_of(text):
+    return chunk_text(text, 1200, 200)
+
+
+def index_state():
+    """(chunk id -> text, manifest, index params type) of the published snapshot."""
+    snap = snapshots.current()
+    index = faiss.read_index(str(snap.faiss_path))
+    store = ChunkStore(snap.store_path)
+    ids = sorted(int(i) for i in faiss.vector_to_array(index.id_map))
+    assert ids == [int(i) for i in store.chunk_ids]  # index and store agree
+    texts = {r["meta"]["chunk_id"]: r["text"] for r in store.records()}
+    for cid, rec in zip(ids, store.records()):
+        assert cid == rec["meta"]["article_id"] * MAX_CHUNKS_PER_ARTICLE + rec["meta"]["chunk_idx"]
+    manifest = json.loads(snap.manifest_path.read_text(encoding="utf-8"))
+    params = json.loads(snap.params_path.read_text(encoding="utf-8"))
+    return texts, manifest, params["type"]
+
+
+def articles_in(texts):
+    return {cid // MAX_CHUNKS_PER_ARTICLE for cid in texts}
+
+
+def test_incremental_embeds_new_and_changed_and_evicts_old(index_env):
+    conn = get_conn()
+    for aid in (1, 2, 3):
+        store_article(conn, aid, article_text(aid))
+    build(article_limit=3)
+    before, manifest, _ = index_state()
+    assert articles_in(before) == {1, 2, 3}
+    assert set(manifest["articles"]) == {"1", "2", "3"}
+
+    store_article(conn, 4, article_text(4))   # newest: pushes article 1 out of the window
+    store_article(conn, 2, article_text(20))  # changed text
+    index_env.texts.clear()
+    build(article_limit=3, incremental=True)
+
+    after, manifest, _ = index_state()
+    assert articles_in(after) == {2, 3, 4}
+    assert sorted(index_env.texts) == sorted(chunks_of(article_text(20)) + chunks_of(article_text(4)))
+    assert {c: t for c, t in after.items() if c // MAX_CHUNKS_PER_ARTICLE == 3} == {
+        c: t for c, t in before.items() if c // MAX_CHUNKS_PER_ARTICLE == 3
+    }
+    assert [t for c, t in sorted(after.items()) if c // MAX_CHUNKS_PER_ARTICLE == 2] == chunks_of(article_text(20))
+    assert set(manifest["articles"]) == {"2", "3", "4"}
+    assert set(manifest["chunk_counts"]) == {"2", "3", "4"}
+
+
+def test_chunk_ids_stay_stable_across_incremental_runs(index_env):
+    conn = get_conn()
+    store_article(conn, 1, article_text(1))
+    build()
+    first, _, _ = index_state()
+
+    for aid in (2, 3):
+        store_article(conn, aid, article_text(aid))
+        index_env.texts.clear()
+        build(incremental=True)
+        assert sorted(index_env.texts) == sorted(chunks_of(article_text(aid)))  # only the new article
+        now, _, _ = index_state()
+        assert {c: t for c, t in now.items() if c in first} == first
+    assert articles_in(now) == {1, 2, 3}
+
+
+def test_hnsw_falls_back_to_a_full_rebuild_when_evicting(index_env, capsys):
+    conn = get_conn()
+    for aid in (1, 2):
+        store_article(conn, aid, article_text(aid))
+    build(index_type="hnsw")
+
+    # New articles only: HNSW can take them incrementally
+    store_article(conn, 3, article_text(3))
+    index_env.texts.clear()
+    build(index_type="hnsw", incremental=True)
+    assert sorted(index_env.texts) == sorted(chunks_of(article_text(3)))
+
+    # A changed article needs its old vectors removed, which HNSW can't do
+    store_article(conn, 1, article_text(10))
+    index_env.texts.clear()
+    capsys.readouterr()
+    build(index_type="hnsw", incremental=True)
+    assert "cannot evict vectors; doing a full rebuild" in capsys.readouterr().out
+    expected = chunks_of(article_text(10)) + chunks_of(article_text(2)) + chunks_of(article_text(3))
+    assert sorted(index_env.texts) == sorted(expected)
+    texts, manifest, index_type = index_state()
+    assert index_type == "hnsw"
+    assert sorted(texts.values()) == sorted(expected)
+
+
+def test_duplicate_chunks_come_back_when_their_canonical_article_goes(index_env):
+    conn = get_conn()
+    store_article(conn, 1, article_text(1))
+    build()
+    store_article(conn, 2, article_text(1))  # syndicated copy that ingest didn't collapse
+    build(incremental=True)
+    texts, manifest, _ = index_state()
+    assert articles_in(texts) == {1}  # every chunk of 2 duplicated one of 1
+    assert manifest["duplicate_of"] == {"2": [1]}
+
+    # Article 1 leaves the window: 2 is re-embedded, so the story stays searchable
+    build(incremental=True, article_limit=1)
+    texts, manifest, _ = index_state()
+    assert articles_in(texts) == {2}
+    assert sorted(texts.values()) == sorted(chunks_of(article_text(1)))
+    assert manifest["duplicate_of"] == {}
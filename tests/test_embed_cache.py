@@ -0,0 +1,70 @@
+"""Persistent embedding cache (core.embed_cache)."""
+import itertools
+
+import numpy as np
+import pytest
+
+from core import embed_cache
+from core.embed_cache import EmbeddingCache, text_hash
+
+from conftest import HashEncoder
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Strictly increasing time.time(), so LRU order never ties."""
+    ticks = itertools.count(1_000_000)
+    monkeypatch.setattr(embed_cache.time, "time", lambda: float(next(ticks)))
+
+
+def test_only_misses_are_encoded(tmp_path):
+    enc = HashEncoder()
+    cache = EmbeddingCache("model-a", path=tmp_path / "cache.db")
+    first = cache.encode(["alpha chip", "beta chip", "alpha chip"], enc.encode)
+    assert enc.texts == ["alpha chip", "beta chip"]  # repeats within a call encoded once
+    assert np.array_equal(first[0], first[2])
+
+    again = cache.encode(["beta  chip\n", "gamma chip", "alpha chip"], enc.encode)
+    assert enc.texts[2:] == ["gamma chip"]  # whitespace-normalized hits
+    assert np.allclose(again[[0, 2]], first[[1, 0]])
+    assert cache.encode([], enc.encode).shape[0] == 0
+
+    s = cache.stats()
+    assert (s["hits"], s["misses"], s["entries"]) == (3, 3, 3)
+    assert s["hit_rate"] == 0.5
+    cache.close()
+
+
+def test_stats_persist_per_model(tmp_path):
+    enc = HashEncoder()
+    cache = EmbeddingCache("model-a", path=tmp_path / "cache.db")
+    cache.encode(["one", "two"], enc.encode)
+    cache.encode(["one"], enc.encode)
+    cache.close()
+
+    reopened = EmbeddingCache("model-a", path=tmp_path / "cache.db")
+    s = reopened.stats()
+    assert (s["hits"], s["misses"]) == (0, 0)  # this run
+    assert (s["total_hits"], s["total_misses"], s["entries"]) == (1, 2, 2)
+    assert s["total_hit_rate"] == pytest.approx(1 / 3)
+
+    other = EmbeddingCache("model-a@onnx-int8", path=tmp_path / "cache.db")
+    other.encode(["one"], enc.encode)  # vectors of another backend are never reused
+    assert enc.texts == ["one", "two", "one"]
+    assert other.stats()["entries"] == 1 and other.stats()["total_hits"] == 0
+    reopened.close()
+    other.close()
+
+
+def test_least_recently_used_vectors_are_evicted(tmp_path, clock):
+    enc = HashEncoder()
+    cache = EmbeddingCache("model-a", path=tmp_path / "cache.db", max_entries=3)
+    cache.encode(["a"], enc.encode)
+    cache.encode(["b"], enc.encode)
+    cache.encode(["c"], enc.encode)
+    cache.encode(["a"], enc.encode)  # touch: a is now the most recent
+    cache.encode(["d"], enc.encode)
+
+    assert cache.stats()["entries"] == 3
+    assert set(cache.get_many([text_hash(t) for t in "abcd"])) == {text_hash(t) for t in "acd"}
+    cache.close()
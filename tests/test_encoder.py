@@ -0,0 +1,73 @@
+"""Encoder backends (core.encoder) without onnxruntime or model downloads."""
+import numpy as np
+import pytest
+
+from core import encoder
+from core.encoder import EMBED_MODEL_NAME, ENCODER_BACKENDS, OnnxEncoder, cache_key
+
+VOCAB = 64
+DIM = 8
+
+
+class FakeTokenizer:
+    def __call__(self, texts, truncation=True, max_length=None):
+        return {"input_ids": [[1 + sum(map(ord, w)) % (VOCAB - 1) for w in t.split()][:max_length] for t in texts]}
+
+
+class FakeSession:
+    """Token embeddings from a fixed table; padded positions get garbage."""
+
+    def __init__(self):
+        self.table = np.random.default_rng(0).normal(size=(VOCAB, DIM)).astype("float32")
+        self.widths = []
+
+    def run(self, outputs, feeds):
+        ids = feeds["input_ids"]
+        self.widths.append(ids.shape)
+        hidden = self.table[ids]
+        hidden[feeds["attention_mask"] == 0] = 1e6
+        return [hidden]
+
+
+def fake_onnx_encoder(token_budget=64):
+    enc = OnnxEncoder.__new__(OnnxEncoder)  # skip loading onnxruntime and the export
+    enc.backend, enc.model_name, enc.dim = "onnx", EMBED_MODEL_NAME, DIM
+    enc.token_budget = token_budget
+    enc.tokenizer, enc.session = FakeTokenizer(), FakeSession()
+    enc._inputs = {"input_ids", "attention_mask"}
+    return enc
+
+
+def test_batches_cover_every_item_within_the_token_budget():
+    enc = fake_onnx_encoder(token_budget=64)
+    lengths = np.random.default_rng(1).integers(1, 40, size=200)
+    batches = enc._batches(lengths, max_batch=16)
+    assert sorted(np.concatenate(batches).tolist()) == list(range(200))
+    for b in batches:
+        assert len(b) <= 16
+        assert len(b) == 1 or len(b) * lengths[b].max() <= 64
+    padded = [lengths[b].max() for b in batches]
+    assert padded == sorted(padded)  # length-sorted: short texts batch together
+
+
+def test_encode_restores_input_order():
+    enc = fake_onnx_encoder(token_budget=32)
+    rng = np.random.default_rng(2)
+    texts = [" ".join(f"w{rng.integers(100)}" for _ in range(rng.integers(1, 20))) for _ in range(40)]
+    together = enc.encode(texts, batch_size=4)
+    assert len(enc.session.widths) > 1  # several length buckets
+    alone = np.vstack([enc.encode([t]) for t in texts])
+    assert np.allclose(together, alone, atol=1e-5)  # same vector per text, in input order
+    assert np.allclose(np.linalg.norm(together, axis=1), 1.0, atol=1e-5)
+    assert enc.encode([]).shape == (0, DIM)
+
+
+def test_cache_keys_differ_per_backend():
+    keys = {cache_key(EMBED_MODEL_NAME, b) for b in ENCODER_BACKENDS}
+    assert len(keys) == len(ENCODER_BACKENDS)
+    assert cache_key(EMBED_MODEL_NAME, "torch") == EMBED_MODEL_NAME  # existing caches stay valid
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        encoder.get_encoder("tensorrt")
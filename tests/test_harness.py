@@ -0,0 +1,67 @@
+"""Retrieval scoring and regression checks in eval.harness."""
+import math
+
+import pytest
+
+from eval import harness
+
+
+def doc(aid, chunk=0):
+    return {"meta": {"article_id": aid, "chunk_id": aid * 10000 + chunk, "url": f"https://x.test/{aid}"}}
+
+
+def urls(*aids):
+    return [f"https://x.test/{a}" for a in aids]
+
+
+def test_ranked_articles_keeps_best_chunk_of_each_article():
+    docs = [doc(1), doc(2), doc(1, 1), doc(3), doc(2, 1)]
+    assert [d["meta"]["chunk_id"] for d in harness.ranked_articles(docs)] == [10000, 20000, 30000]
+
+
+def test_perfect_ranking_scores_one():
+    s = harness.score_query([doc(1), doc(2), doc(3)], {"relevant_urls": urls(1, 2)}, k=5)
+    assert s == {"recall": 1.0, "mrr": 1.0, "ndcg": pytest.approx(1.0)}
+
+
+def test_relevant_at_rank_three():
+    # several chunks of article 7 count as one rank
+    docs = [doc(7), doc(7, 1), doc(8), doc(1)]
+    s = harness.score_query(docs, {"relevant_urls": urls(1)}, k=5)
+    assert s["recall"] == 1.0
+    assert s["mrr"] == pytest.approx(1 / 3)
+    assert s["ndcg"] == pytest.approx(1 / math.log2(4))
+
+
+def test_partial_recall_and_ids():
+    docs = [doc(5), doc(1), doc(6)]
+    s = harness.score_query(docs, {"relevant_article_ids": [1, 2]}, k=5)
+    assert s["recall"] == 0.5
+    assert s["mrr"] == 0.5
+    ideal = 1 + 1 / math.log2(3)
+    assert s["ndcg"] == pytest.approx((1 / math.log2(3)) / ideal)
+
+
+def test_short_result_list_is_not_rewarded():
+    # one relevant hit of two relevant articles, and nothing else came back
+    s = harness.score_query([doc(1)], {"relevant_urls": urls(1, 2)}, k=5)
+    assert s["recall"] == 0.5
+    assert s["ndcg"] == pytest.approx(1 / (1 + 1 / math.log2(3)))
+
+
+def test_hits_beyond_k_do_not_count():
+    docs = [doc(a) for a in (10, 11, 12, 1)]
+    assert harness.score_query(docs, {"relevant_urls": urls(1)}, k=3) == {"recall": 0.0, "mrr": 0.0, "ndcg": 0.0}
+    assert harness.score_query([], {"relevant_urls": urls(1)}, k=3)["ndcg"] == 0.0
+    assert harness.score_query([doc(1)], {}, k=3) == {"recall": 0.0, "mrr": 0.0, "ndcg": 0.0}
+
+
+def report(recall, p95):
+    return {"k": 5, "configs": {"dense": {"recall@5": recall, "mrr": 0.5, "ndcg@5": 0.5, "latency_ms": {"p95": p95}}}}
+
+
+def test_compare_flags_quality_and_latency_regressions():
+    assert harness.compare(report(0.80, 10.0), report(0.79, 12.0)) == []
+    problems = harness.compare(report(0.80, 10.0), report(0.70, 13.0))
+    assert len(problems) == 2
+    assert problems[0].startswith("dense: recall@5") and "p95 latency" in problems[1]
@@ -0,0 +1,145 @@
+"""Concurrent fetching (core.ingest) against the local HTTP stand-in."""
+import time
+
+from core import ingest
+from core.ingest import canonicalize_url, clean_text, fetch_all, fetch_article_text, fetch_many
+
+HOSTS = ("127.0.0.1", "localhost")  # same server, counted as two hosts
+
+
+def test_results_keep_input_order(stand_in):
+    # Earlier URLs answer later, so completion order is the reverse of input order
+    urls = [stand_in.url(f"/article/{i}?delay={0.05 * (8 - i):.2f}", HOSTS[i % 2]) for i in range(8)]
+    texts = fetch_many(urls, max_workers=8, per_host=4)
+    assert len(texts) == len(urls)
+    for i, text in enumerate(texts):
+        assert f"Article {i}." in text, text[:40]
+
+
+def test_concurrent_beats_sequential(stand_in):
+    stand_in.delay = 0.2
+    urls = [stand_in.url(f"/article/{i}", HOSTS[i % 2]) for i in range(16)]
+
+    t0 = time.perf_counter()
+    seq = [clean_text(fetch_article_text(u)) for u in urls]
+    t_seq = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    conc = fetch_many(urls, max_workers=16, per_host=4)
+    t_conc = time.perf_counter() - t0
+
+    assert conc == seq
+    # 16 x 0.2s sequentially vs 2 rounds of 8 (4 per host); allow for pool start-up
+    assert t_seq / t_conc > 2.5, f"sequential {t_seq:.2f}s vs concurrent {t_conc:.2f}s"
+
+
+def test_per_host_limit(stand_in):
+    stand_in.delay = 0.1
+    urls = [stand_in.url(f"/article/{i}", HOSTS[i % 2]) for i in range(16)]
+    fetch_all(urls, max_workers=16, per_host=3, archive_raw=False)
+    assert stand_in.peak
+    assert max(stand_in.peak.values()) <= 3
+
+
+def test_failed_downloads_yield_empty_text(stand_in):
+    urls = [stand_in.url("/article/1"), f"http://127.0.0.1:{stand_in.port}/missing"]
+    results = fetch_all(urls, max_workers=2, archive_raw=False)
+    assert "Article 1." in results[0]["text"]
+    assert results[1]["text"] == "" and results[1]["status"] == 0
+
+
+def test_slow_extraction_does_not_hold_up_downloads(stand_in, monkeypatch):
+    # One download thread and one extractor: the remaining pages should be
+    # downloaded while the first one is still being extracted.
+    extract_clean = ingest.extract_clean
+    seen = []
+
+    def slow_extract(html):
+        time.sleep(0.3)
+        with stand_in.lock:
+            seen.append(sum(stand_in.hits.values()))
+        return extract_clean(html)
+
+    monkeypatch.setattr(ingest, "extract_clean", slow_extract)
+    urls = [stand_in.url(f"/article/{i}") for i in range(4)]
+    results = dict(ingest.fetch_iter(urls, max_workers=1, extract_workers=1, max_pending=4, archive_raw=False))
+    assert all(f"Article {i}." in results[i]["text"] for i in range(4))
+    assert seen[0] == 4
+
+
+def test_canonicalize_url_drops_tracking_and_fragments():
+    assert (
+        canonicalize_url("HTTPS://Example.com:443/a/story?utm_source=rss&id=7&fbclid=x#comments")
+        == "https://example.com/a/story?id=7"
+    )
+    assert canonicalize_url("https://www.google.com/url?q=https://example.com/b%3Futm_medium%3Dx") == (
+        "https://example.com/b"
+    )
+
+
+def test_repeat_ingest_downloads_nothing(stand_in, tmp_data, monkeypatch):
+    from core import ingest
+    from core.db import get_conn
+
+    monkeypatch.setattr(ingest, "FEEDS", [stand_in.url("/feed.xml")])
+    assert ingest.ingest(limit_per_feed=5) == 5
+    downloads = sum(v for k, v in stand_in.hits.items() if k.startswith("/article/"))
+    assert downloads == 5
+
+    # Unchanged feed: 304, so no entries and no downloads
+    assert ingest.ingest(limit_per_feed=5) == 0
+    assert stand_in.hits["/feed.xml"] == 2
+    assert sum(v for k, v in stand_in.hits.items() if k.startswith("/article/")) == downloads
+
+    # Known URLs (even with tracking params) are dropped before download
+    conn = get_conn()
+    entries = [{"url": stand_in.url("/article/1") + "?utm_source=rss"}, {"url": stand_in.url("/article/9")}]
+    fresh, seen = ingest.dedup_entries(conn, entries, session=None)
+    conn.close()
+    assert [e["url"] for e in seen] == [stand_in.url("/article/1")]
+    assert [e["url"] for e in fresh] == [stand_in.url("/article/9")]
+
+
+def test_unresolved_google_news_links_are_cached(tmp_data, monkeypatch):
+    from core import ingest
+    from core.db import get_conn
+
+    calls = []
+
+    def resolve(session, url):
+        calls.append(url)
+        return ingest.canonicalize_url(url)  # what resolve_redirect returns on failure
+
+    monkeypatch.setattr(ingest, "resolve_redirect", resolve)
+    conn = get_conn()
+    link = "https://news.google.com/rss/articles/CBMiabc?oc=5"
+
+    def run():
+        fresh, _ = ingest.dedup_entries(conn, [{"url": link}], session=None)
+        conn.commit()
+        return fresh
+
+    assert run()[0]["url"] == ingest.canonicalize_url(link)
+    run()
+    assert len(calls) == 1  # the failed lookup was remembered
+
+    conn.execute("UPDATE url_aliases SET checked_at = ?", (int(time.time() - ingest.ALIAS_RETRY_S - 1),))
+    conn.commit()
+    run()
+    assert len(calls) == 2  # and retried once it expired
+
+
+def test_syndicated_copies_become_source_links(stand_in, tmp_data, monkeypatch):
+    from core import ingest
+    from core.db import get_conn
+
+    monkeypatch.setattr(ingest, "FEEDS", [stand_in.url("/feed.xml"), stand_in.url("/wire.xml")])
+    assert ingest.ingest(limit_per_feed=3) == 3  # the wire copies are not stored
+
+    conn = get_conn()
+    ids = dict(conn.execute("SELECT url, id FROM articles"))
+    assert sorted(ids) == [stand_in.url(f"/article/{i}") for i in range(3)]
+    assert conn.execute("SELECT COUNT(*) FROM article_texts").fetchone() == (3,)
+    links = conn.execute("SELECT article_id, url, source FROM article_links ORDER BY url").fetchall()
+    assert links == [(ids[stand_in.url(f"/article/{i}")], stand_in.url(f"/wire/{i}"), "Stand-in Wire") for i in range(3)]
+    conn.close()
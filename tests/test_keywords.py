@@ -0,0 +1,44 @@
+"""One keyword tokenizer for BM25, the eval keyword check and the app."""
+from core import bm25, eval as keyword_eval
+from core.keywords import is_fresh_query, keyword_set, query_terms, tokenize
+
+
+def test_bm25_uses_shared_tokenizer():
+    assert bm25.tokenize is tokenize
+    assert tokenize("What is the latest on AI chips? Nvidia's H100") == ["latest", "ai", "chips", "nvidia", "h100"]
+
+
+def test_intent_words_are_indexed_but_not_queried():
+    assert keyword_set("Apple news: a new US fab") == {"apple", "news", "new", "us", "fab"}
+    assert query_terms("What's the latest news on AI chips today?") == ["ai", "chips"]
+    assert query_terms("latest news") == ["latest", "news"]  # nothing else to search for
+
+    index = bm25.BM25Index.build(
+        [10, 11, 12], ["Google News redesigns its app", "New chips from Intel", "Weather today"]
+    )
+    assert list(index.search("google news", top_n=3)[1]) == [10]
+    assert list(index.search("latest news", top_n=3)[1]) == [10]
+    assert list(index.search("what's new with chips today", top_n=3)[1]) == [11]
+
+
+def test_fresh_query_detection():
+    assert is_fresh_query("What is happening in tech news today?")
+    assert is_fresh_query("Latest on OpenAI") and is_fresh_query("AI chips right now")
+    assert is_fresh_query("Anything recently announced this week?")
+    assert not is_fresh_query("How do transformers work?")
+    assert not is_fresh_query("Who was right nowhere near the launch?")
+
+
+def test_precision_keeps_substring_semantics():
+    docs = [{"text": "He said the chipmakers were off."}, {"text": "New AI chips ship next quarter."}]
+    # 3+ character keywords, matched as substrings: "chip" hits "chipmakers"
+    assert keyword_eval.precision_at_k("chip supply", docs, k=2) == 1.0
+    assert keyword_eval.precision_at_k("AI", docs, k=2) == 0.0  # too short to count
+
+
+def test_keyword_precision_matches_whole_keywords_only():
+    docs = [{"text": "He said the deal was off."}, {"text": "New AI chips ship next quarter."}]
+    # "ai" is a substring of "said" but not one of its keywords
+    assert keyword_eval.keyword_precision_at_k("AI chips", docs[:1], k=1) == 0.0
+    assert keyword_eval.keyword_precision_at_k("latest AI news", docs, k=2) == 0.5
+    assert keyword_eval.keyword_precision_at_k("today", docs, k=2) == 0.0
@@ -0,0 +1,79 @@
+"""Prometheus text exposition from core.metrics."""
+import re
+
+import pytest
+
+from core import metrics
+
+TYPE_LINE = re.compile(r"^# TYPE ([a-zA-Z_:][a-zA-Z0-9_:]*) (counter|gauge|summary)$")
+SAMPLE_LINE = re.compile(
+    r'^([a-zA-Z_:][a-zA-Z0-9_:]*)'
+    r'(?:\{((?:[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*",?)+)\})?'
+    r" (\S+)$"
+)
+LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+@pytest.fixture
+def recorded():
+    metrics.reset()
+    for s in (0.01, 0.02, 0.03, 0.5):
+        metrics.observe("retrieve.encode", s)
+    metrics.observe('odd "stage"\\name', 0.1)
+    metrics.incr("api.requests", 3)
+    metrics.incr("cache-hits")
+    metrics.set_gauge("index.chunks", 1234)
+    yield metrics.prometheus_text()
+    metrics.reset()
+
+
+def parse(text):
+    """Return ({family: type}, [(name, labels, value)]), asserting every line is valid."""
+    types, samples = {}, []
+    for line in text.splitlines():
+        m = TYPE_LINE.match(line)
+        if m:
+            assert m.group(1) not in types, f"family declared twice: {line}"
+            types[m.group(1)] = m.group(2)
+            continue
+        m = SAMPLE_LINE.match(line)
+        assert m, f"malformed line: {line!r}"
+        name, labels, value = m.groups()
+        family = re.sub(r"_(sum|count)$", "", name) if name not in types else name
+        assert family in types, f"sample before its # TYPE: {line}"
+        samples.append((name, dict(LABEL.findall(labels or "")), float(value)))
+    return types, samples
+
+
+def test_every_line_is_valid_exposition(recorded):
+    assert recorded.endswith("\n")
+    types, samples = parse(recorded)
+    assert types == {
+        "ragnroll_stage_seconds": "summary",
+        "ragnroll_api_requests_total": "counter",
+        "ragnroll_cache_hits_total": "counter",
+        "ragnroll_index_chunks": "gauge",
+        "ragnroll_uptime_seconds": "gauge",
+        **({"ragnroll_memory_rss_bytes": "gauge"} if "ragnroll_memory_rss_bytes" in types else {}),
+    }
+    values = {name: v for name, labels, v in samples if not labels}
+    assert values["ragnroll_api_requests_total"] == 3
+    assert values["ragnroll_cache_hits_total"] == 1
+    assert values["ragnroll_index_chunks"] == 1234
+
+
+def test_summary_quantiles_sum_and_count(recorded):
+    _, samples = parse(recorded)
+    stage = [(n, l, v) for n, l, v in samples if l.get("stage") == "retrieve.encode"]
+    quantiles = [v for n, l, v in stage if "quantile" in l]
+    assert [l["quantile"] for n, l, v in stage if "quantile" in l] == ["0.50", "0.95", "0.99"]
+    assert quantiles == sorted(quantiles) and 0.01 <= quantiles[0] <= quantiles[-1] <= 0.5
+    by_name = {n: v for n, l, v in stage if "quantile" not in l}
+    assert by_name["ragnroll_stage_seconds_count"] == 4
+    assert by_name["ragnroll_stage_seconds_sum"] == pytest.approx(0.56)
+
+
+def test_label_values_are_escaped(recorded):
+    assert 'stage="odd \\"stage\\"\\\\name"' in recorded
+    _, samples = parse(recorded)
+    assert sum(1 for _, l, _ in samples if l.get("stage", "").startswith("odd")) == 5
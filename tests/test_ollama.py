@@ -0,0 +1,119 @@
+"""Streaming from Ollama's HTTP API (core.rag.stream_ollama) against a stub server."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from core import rag
+
+
+class StubOllama:
+    """Answers POST /api/generate with `lines` (NDJSON), then closes the connection."""
+
+    def __init__(self):
+        self.status = 200
+        self.lines = []
+        self.requests = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.0"  # body ends when the connection closes
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                stub.requests.append((self.path, json.loads(body)))
+                self.send_response(stub.status)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                for line in stub.lines:
+                    self.wfile.write(line.encode("utf-8") + b"\n")
+                    self.wfile.flush()
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def ollama(monkeypatch):
+    stub = StubOllama()
+    threading.Thread(target=stub.server.serve_forever, args=(0.05,), daemon=True).start()
+    monkeypatch.setattr(rag, "OLLAMA_URL", stub.url)
+    monkeypatch.setattr(rag, "LLM_BACKEND", "http")
+    yield stub
+    stub.server.shutdown()
+    stub.server.server_close()
+
+
+def ndjson(*messages):
+    return [json.dumps(m) for m in messages]
+
+
+def test_tokens_stream_until_done(ollama):
+    ollama.lines = ndjson(
+        {"response": "Chips", "done": False},
+        {"response": " are", "done": False},
+        {"response": "", "done": False},
+        {"response": " fast.", "done": True},
+        {"response": " (ignored)", "done": False},
+    )
+    assert list(rag.stream_ollama("prompt text")) == ["Chips", " are", " fast."]
+    path, payload = ollama.requests[0]
+    assert path == "/api/generate"
+    assert payload == dict(payload, model=rag.OLLAMA_MODEL, prompt="prompt text", stream=True)
+
+
+def test_http_error_status(ollama):
+    ollama.status = 404
+    ollama.lines = ndjson({"error": "model 'llama3.2' not found"})
+    with pytest.raises(requests.HTTPError):
+        list(rag.stream_ollama("p"))
+    answer = "".join(rag.stream_answer("p"))
+    assert answer.startswith(f"ERROR calling Ollama at {ollama.url}") and "404" in answer
+
+
+def test_stream_cut_off_before_done(ollama):
+    ollama.lines = ndjson({"response": "Chips", "done": False}) + ['{"response": " ar']
+    with pytest.raises(rag.OllamaError, match="Malformed"):
+        list(rag.stream_ollama("p"))
+
+    ollama.lines = ndjson({"response": "Chips", "done": False})
+    tokens = rag.stream_ollama("p")
+    assert next(tokens) == "Chips"
+    with pytest.raises(rag.OllamaError, match="before the answer was done"):
+        next(tokens)
+    answer = "".join(rag.stream_answer("p"))
+    assert answer.startswith("Chips") and "ERROR calling Ollama" in answer
+
+
+def test_error_in_the_done_message(ollama):
+    ollama.lines = ndjson(
+        {"response": "Chips", "done": False},
+        {"done": True, "error": "out of memory"},
+    )
+    with pytest.raises(rag.OllamaError, match="out of memory"):
+        list(rag.stream_ollama("p"))
+
+
+def test_failed_answers_are_not_cached(ollama):
+    stored = []
+
+    class Cache:
+        def store(self, **entry):
+            stored.append(entry["answer"])
+
+    ollama.lines = ndjson({"response": "Half an answer", "done": False})
+    tokens = rag._cache_when_done(rag.stream_answer("p"), Cache())
+    assert "ERROR calling Ollama" in "".join(tokens)
+    assert stored == []
+
+    ollama.lines = ndjson({"response": "A whole answer.", "done": True})
+    assert "".join(rag._cache_when_done(rag.stream_answer("p"), Cache())) == "A whole answer."
+    assert stored == ["A whole answer."]
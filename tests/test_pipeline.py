@@ -0,0 +1,49 @@
+"""Streaming refresh (core.pipeline) against the local HTTP stand-in."""
+import numpy as np
+import pytest
+
+from core import ingest, pipeline
+from core.db import get_conn
+
+from conftest import FEED_ETAG
+
+
+class FakeEncoder:
+    def encode(self, texts, batch_size=32):
+        rng = np.random.default_rng(len(texts))
+        emb = rng.standard_normal((len(texts), 8)).astype("float32")
+        return emb / np.linalg.norm(emb, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def publishes(stand_in, tmp_data, monkeypatch):
+    """Pipeline wired to the stand-in feed, a fake encoder and a recording build_index."""
+    calls = []
+    monkeypatch.setattr(ingest, "FEEDS", [stand_in.url("/feed.xml")])
+    monkeypatch.setattr(pipeline, "get_encoder", lambda *a, **k: FakeEncoder())
+    monkeypatch.setattr(pipeline, "build_index", lambda **kw: calls.append(kw))
+    return calls
+
+
+def run(**kw):
+    return pipeline.run_pipeline(limit_per_feed=5, publish_every=0, chunker="chars", **kw)
+
+
+def test_store_stage_can_write_and_feed_validators_persist(stand_in, publishes):
+    # The feed sends an ETag, so collecting it leaves a write on the fetch
+    # thread's connection; the store thread must still get its write lock.
+    stats = run()
+    assert stats["inserted"] == 5
+    assert stats["chunks"] > 0 and len(publishes) == 1
+
+    conn = get_conn()
+    (etag,) = conn.execute("SELECT etag FROM http_cache WHERE url = ?", (stand_in.url("/feed.xml"),)).fetchone()
+    assert etag == FEED_ETAG
+    (n,) = conn.execute("SELECT COUNT(*) FROM articles").fetchone()
+    assert n == 5
+
+    # Second run: the feed answers 304 and nothing is downloaded again
+    article_hits = sum(v for k, v in stand_in.hits.items() if k.startswith("/article/"))
+    stats = run()
+    assert stats["downloaded"] == 0 and stats["inserted"] == 0
+    assert sum(v for k, v in stand_in.hits.items() if k.startswith("/article/")) == article_hits
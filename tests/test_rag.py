@@ -0,0 +1,79 @@
+"""Time-window handling in core.rag.rag_answer_stream (no models or LLM needed)."""
+import time
+
+import numpy as np
+import pytest
+
+from core import rag
+
+NOW = time.time()
+
+
+class FakeRetriever:
+    """Returns `recent` chunks when filtered by `since`, 10 otherwise."""
+
+    def __init__(self, recent: int):
+        self.recent = recent
+        self.searches = []
+
+    def encode(self, texts):
+        return np.ones((len(texts), 4), dtype="float32")
+
+    def current_version(self):
+        return ("v1",)
+
+    def latest_published(self):
+        return NOW
+
+    def search(self, q_emb, top_k, queries, mode, since=None, sources=None):
+        self.searches.append(since)
+        n = self.recent if since is not None else 10
+        return [[{"meta": {"chunk_id": i}, "text": f"chunk {i}"} for i in range(min(n, top_k))]]
+
+
+class ScopeRecorder:
+    def __init__(self):
+        self.scopes = []
+
+    def lookup(self, question, q_emb, top_k, version, scope=""):
+        self.scopes.append(scope)
+        return None
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    recorder = ScopeRecorder()
+    monkeypatch.setattr(rag, "get_answer_cache", lambda: recorder)
+    return recorder
+
+
+def ask(retriever, question, since=None):
+    _, docs, _ = rag.rag_answer_stream(
+        question, top_k=5, retriever=retriever, since=since, rerank=False, context_budget=None
+    )
+    return docs
+
+
+def test_explicit_window_is_a_hard_filter(cache):
+    r = FakeRetriever(recent=2)
+    docs = ask(r, "chip export rules", since=NOW - 86400)
+    assert len(docs) == 2
+    assert len(r.searches) == 1
+
+
+def test_fresh_query_tops_up_only_when_short(cache):
+    r = FakeRetriever(recent=5)
+    assert len(ask(r, "latest chip news")) == 5
+    assert len(r.searches) == 1  # enough recent chunks: no second search
+
+    r = FakeRetriever(recent=2)
+    assert len(ask(r, "latest chip news")) == 5
+    assert r.searches[1] is None  # topped up without the filter
+
+
+def test_cache_scope_includes_window(cache):
+    r = FakeRetriever(recent=5)
+    ask(r, "chip export rules", since=NOW - 86400)
+    ask(r, "chip export rules", since=NOW - 30 * 86400)
+    ask(r, "latest chip news")
+    assert len(set(cache.scopes)) == 3
@@ -0,0 +1,100 @@
+"""Cross-encoder re-ranking (core.rerank) with a stubbed model."""
+import numpy as np
+import pytest
+
+from core import rag
+from core.rerank import Reranker
+
+
+class FakeCrossEncoder:
+    """Scores a pair by the number in its chunk text ("chunk 7 score 2.5" -> 2.5)."""
+
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=True):
+        self.batches.append(len(pairs))
+        return np.array([float(text.split()[-1]) for _, text in pairs], dtype="float32")
+
+
+def docs_with(scores):
+    return [{"meta": {"chunk_id": i}, "text": f"chunk {i} score {s}"} for i, s in enumerate(scores)]
+
+
+@pytest.fixture
+def reranker():
+    r = Reranker()
+    r._model = FakeCrossEncoder()
+    return r
+
+
+def test_keeps_the_best_top_k(reranker):
+    docs = docs_with([1, 5, -2, 5, 3, 0, 4])
+    out, stats = reranker.rerank("q", docs, top_k=3, batch_size=2, margin=None)
+    assert [d["meta"]["chunk_id"] for d in out] == [1, 3, 6]  # ties keep retrieval order
+    assert [d["rerank_score"] for d in out] == [5.0, 5.0, 4.0]
+    assert "rerank_score" not in docs[1]  # inputs are not modified
+    assert stats["rerank_scored"] == stats["rerank_candidates"] == 7
+    assert reranker.model.batches == [2, 2, 2, 1]
+
+
+def test_stops_once_the_tail_cannot_compete(reranker):
+    docs = docs_with([9, 8, 7, 6] + [2, 1, 0, 1] + [11] * 22)
+    out, stats = reranker.rerank("q", docs, top_k=3, batch_size=4, margin=3.0)
+    # After two batches the 3rd best (7) beats the latest batch's best (2) by 5 >= 3
+    assert stats == dict(stats, rerank_scored=8.0, rerank_candidates=30.0)
+    assert [d["rerank_score"] for d in out] == [9.0, 8.0, 7.0]
+
+    out, stats = reranker.rerank("q", docs, top_k=3, batch_size=4, margin=6.0)
+    assert stats["rerank_scored"] == 30  # margin not reached: everything scored
+    assert [d["rerank_score"] for d in out] == [11.0] * 3
+
+
+def test_no_early_exit_before_top_k_are_scored(reranker):
+    docs = docs_with([9, 0, 0, 0, 0, 0, 0, 0])
+    _, stats = reranker.rerank("q", docs, top_k=3, batch_size=2, margin=0.0)
+    # Batches before the latest must hold top_k scores before it can be compared
+    assert stats["rerank_scored"] == 6
+
+
+class FakeRetriever:
+    def __init__(self, n):
+        self.n = n
+        self.searches = []
+
+    def encode(self, texts):
+        return np.ones((len(texts), 4), dtype="float32")
+
+    def current_version(self):
+        return ("v1",)
+
+    def search(self, q_emb, top_k, queries, mode, since=None, sources=None):
+        self.searches.append(top_k)
+        return [docs_with(range(min(self.n, top_k)))]
+
+    def warm_up(self):
+        pass
+
+
+def test_rag_retrieves_the_candidate_budget_for_reranking(reranker, monkeypatch):
+    monkeypatch.setattr(rag, "get_reranker", lambda: reranker)
+    monkeypatch.setattr(rag, "get_answer_cache", lambda: None)
+    retriever = FakeRetriever(n=100)
+
+    _, docs, stats = rag.rag_answer_stream(
+        "chips", top_k=3, retriever=retriever, rerank=True, candidates=12, context_budget=None
+    )
+    assert retriever.searches == [12]
+    assert stats["rerank_candidates"] == 12
+    assert [d["rerank_score"] for d in docs] == [11.0, 10.0, 9.0]
+
+    rag.rag_answer_stream("chips", top_k=3, retriever=retriever, rerank=False, context_budget=None)
+    assert retriever.searches[-1] == 3
+
+
+def test_warm_up_loads_the_cross_encoder(reranker, monkeypatch):
+    monkeypatch.setattr(rag, "get_reranker", lambda: reranker)
+    rag.warm_up(FakeRetriever(n=0), rerank=True, background=False)
+    assert reranker.model.batches == [1]
+    rag.warm_up(FakeRetriever(n=0), rerank=False, background=False)
+    assert reranker.model.batches == [1]
@@ -0,0 +1,85 @@
+"""Long-lived retrieval (core.retrieve.Retriever) over a small built index."""
+import pytest
+
+from core import retrieve
+from core.chunk import chunk_text
+from core.db import get_conn
+from core.embed import build_index
+
+from conftest import article_paragraphs, article_text, store_article
+
+
+def build(**kw):
+    build_index(chunker="chars", use_cache=False, **kw)
+
+
+@pytest.fixture
+def corpus(index_env):
+    conn = get_conn()
+    for aid in range(1, 7):
+        store_article(conn, aid, article_text(aid), source="Wire" if aid % 2 else "Stand-in News")
+    build()
+    return index_env
+
+
+def queries():
+    return [article_paragraphs(aid)[k][:200] for aid in range(1, 7) for k in (0, 3)]
+
+
+def test_index_chunks_and_model_load_once(corpus, monkeypatch):
+    reads, encoders = [], []
+    read_index = retrieve.read_index
+    monkeypatch.setattr(retrieve, "read_index", lambda *a, **k: reads.append(a) or read_index(*a, **k))
+    monkeypatch.setattr(retrieve, "get_encoder", lambda *a, **k: encoders.append(a) or corpus)
+
+    r = retrieve.Retriever()
+    for q in queries():
+        assert r.retrieve(q, top_k=3)
+    assert len(reads) == 1 and len(encoders) == 1
+
+    store_article(get_conn(), 7, article_text(7))
+    build(incremental=True)  # a new snapshot: swapped in on the next query, model kept
+    assert r.retrieve(article_paragraphs(7)[0][:200], top_k=1)[0]["meta"]["article_id"] == 7
+    assert len(reads) == 2 and len(encoders) == 1
+
+
+def test_module_level_retriever_is_shared(monkeypatch):
+    monkeypatch.setattr(retrieve, "_RETRIEVER", None)
+    assert retrieve.get_retriever() is retrieve.get_retriever()
+
+
+@pytest.mark.parametrize("mode", ["dense", "lexical", "hybrid"])
+def test_retrieve_many_matches_looped_retrieve(corpus, mode):
+    r = retrieve.Retriever()
+    qs = queries()
+    looped = [r.retrieve(q, top_k=4, mode=mode) for q in qs]
+    corpus.calls = 0
+    batched = r.retrieve_many(qs, top_k=4, batch_size=5, mode=mode)
+    assert corpus.calls == (0 if mode == "lexical" else 1)  # one encode call for all queries
+    assert [[d["meta"]["chunk_id"] for d in hits] for hits in batched] == [
+        [d["meta"]["chunk_id"] for d in hits] for hits in looped
+    ]
+    for b, l in zip(batched, looped):
+        assert [d["score"] for d in b] == pytest.approx([d["score"] for d in l], abs=1e-5)
+    assert r.retrieve_many([], mode=mode) == []
+
+
+def test_filters_reach_the_index_search(index_env, monkeypatch):
+    conn = get_conn()
+    day = 86400
+    for aid in range(1, 7):
+        store_article(conn, aid, article_text(aid), published_ts=int(1.7e9) + aid * day,
+                      source="Wire" if aid % 2 else "Stand-in News")
+    build()
+    monkeypatch.setattr(retrieve, "_RETRIEVER", retrieve.Retriever())
+
+    q = chunk_text(article_text(1))[0]  # the same text, so also the same HashEncoder vector
+    assert retrieve.retrieve(q, top_k=1)[0]["meta"]["article_id"] == 1
+    since = int(1.7e9) + 4 * day
+    for mode in ("dense", "lexical", "hybrid"):
+        hits = retrieve.retrieve(q, top_k=10, mode=mode, since=since)
+        assert hits and {h["meta"]["article_id"] for h in hits} <= {4, 5, 6}
+        [hits] = retrieve.retrieve_many([q], top_k=10, mode=mode, sources=["Wire"])
+        assert hits and {h["meta"]["article_id"] for h in hits} <= {1, 3, 5}
+        [hits] = retrieve.retrieve_many([q], top_k=10, mode=mode, since=since, sources=["Wire"])
+        assert hits and {h["meta"]["article_id"] for h in hits} == {5}
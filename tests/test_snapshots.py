@@ -0,0 +1,129 @@
+"""Versioned index snapshots (core.snapshots) and Retriever hot-swapping."""
+import os
+
+import pytest
+
+from core import snapshots
+from core.db import get_conn
+from core.embed import build_index
+from core.retrieve import Retriever
+
+from conftest import article_text, store_article
+
+
+def build(**kw):
+    build_index(chunker="chars", use_cache=False, **kw)
+
+
+def publish_empty(root):
+    snap = snapshots.begin(root)
+    snapshots.publish(snap, {"chunks": 0})
+    return snap.version
+
+
+def test_publish_switches_current_and_rollback_goes_back(tmp_path):
+    assert snapshots.read_current(tmp_path) is None
+    assert snapshots.current(tmp_path).is_legacy
+
+    v1 = publish_empty(tmp_path)
+    v2 = publish_empty(tmp_path)
+    assert v1 < v2
+    assert snapshots.read_current(tmp_path) == v2
+    assert snapshots.list_versions(tmp_path) == [v1, v2]
+    assert not (tmp_path / "CURRENT.tmp").exists()
+
+    assert snapshots.rollback(root=tmp_path) == v1
+    assert snapshots.current(tmp_path).version == v1
+    with pytest.raises(ValueError):
+        snapshots.rollback(root=tmp_path)  # nothing older than v1
+    assert snapshots.rollback(v2, root=tmp_path) == v2
+    with pytest.raises(ValueError):
+        snapshots.rollback("19990101-000000-000", root=tmp_path)
+
+
+def test_unpublished_build_is_invisible(tmp_path):
+    v1 = publish_empty(tmp_path)
+    building = snapshots.begin(tmp_path)
+    assert snapshots.read_current(tmp_path) == v1
+    assert building.version not in snapshots.list_versions(tmp_path)
+
+
+def test_prune_keeps_newest_and_current(tmp_path):
+    versions = [publish_empty(tmp_path) for _ in range(5)]
+    snapshots.rollback(versions[0], root=tmp_path)
+    building = snapshots.begin(tmp_path)
+
+    removed = snapshots.prune(keep=2, root=tmp_path)
+    assert sorted(removed) == versions[1:3]
+    assert snapshots.list_versions(tmp_path) == [versions[0], *versions[3:]]
+    assert building.root.exists()  # may still be in progress
+
+    old = building.root.stat().st_mtime - snapshots.ABANDONED_AFTER_S - 1
+    os.utime(building.root, (old, old))
+    assert snapshots.prune(keep=2, root=tmp_path) == [building.version]
+
+
+def test_module_dirs_can_be_redirected(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshots, "SNAPSHOTS_DIR", tmp_path / "snaps")
+    v = publish_empty(None)
+    assert (tmp_path / "snaps" / v).is_dir()
+    assert snapshots.current().version == v
+
+
+def test_retriever_hot_swaps_after_publish(index_env):
+    conn = get_conn()
+    store_article(conn, 1, article_text(1))
+    build()
+    retriever = Retriever()
+    v1 = retriever.current_version()
+    assert {d["meta"]["article_id"] for d in retriever.retrieve(article_text(1)[:200], top_k=3)} == {1}
+
+    store_article(conn, 2, article_text(2))
+    build(incremental=True)
+    assert retriever.current_version() != v1  # picked up without a restart
+    hits = retriever.retrieve_many([article_text(1)[:200], article_text(2)[:200]], top_k=1)
+    assert [h[0]["meta"]["article_id"] for h in hits] == [1, 2]
+
+    snapshots.rollback()
+    assert retriever.current_version() == v1
+    assert retriever.retrieve(article_text(2)[:200], top_k=1)[0]["meta"]["article_id"] == 1
+
+
+def test_interrupted_publish_keeps_serving_the_old_snapshot(index_env, monkeypatch):
+    conn = get_conn()
+    store_article(conn, 1, article_text(1))
+    build()
+    retriever = Retriever()
+    v1 = retriever.current_version()
+
+    def crash(root, version):
+        raise KeyboardInterrupt  # killed before CURRENT is rewritten
+
+    store_article(conn, 2, article_text(2))
+    set_current = snapshots._set_current
+    monkeypatch.setattr(snapshots, "_set_current", crash)
+    with pytest.raises(KeyboardInterrupt):
+        build(incremental=True)
+    assert retriever.current_version() == v1
+    assert snapshots.read_current() == v1[0]
+    assert {d["meta"]["article_id"] for d in retriever.retrieve(article_text(2)[:200], top_k=10)} == {1}
+
+    monkeypatch.setattr(snapshots, "_set_current", set_current)
+    build(incremental=True)  # the next run publishes normally
+    assert retriever.retrieve(article_text(2)[:200], top_k=1)[0]["meta"]["article_id"] == 2
+
+
+def test_failed_build_leaves_no_snapshot_dir(index_env, monkeypatch):
+    conn = get_conn()
+    store_article(conn, 1, article_text(1))
+    build()
+    before = sorted(p.name for p in snapshots.SNAPSHOTS_DIR.iterdir())
+
+    def disk_full(*args, **kwargs):
+        raise OSError("disk full")
+
+    store_article(conn, 2, article_text(2))
+    monkeypatch.setattr("core.embed.write_store", disk_full)
+    with pytest.raises(OSError):
+        build(incremental=True)
+    assert sorted(p.name for p in snapshots.SNAPSHOTS_DIR.iterdir()) == before